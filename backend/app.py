@@ -1,7 +1,9 @@
 from application import create_app
 from config import Config
 
-app = create_app()
-
 if __name__ == '__main__':
+    # 只在直接运行时创建应用：算法进程池与隔离执行的子进程用 spawn 启动，会重新导入 __main__，
+    # 放在模块顶层会让每个子进程都执行一次 create_app（审计清理/健康检查线程、模型预热等）。
+    # 需要模块级 app 的场景可用工厂方式启动，如 flask --app app run / gunicorn "app:create_app()"。
+    app = create_app()
     app.run(host='0.0.0.0', port=5001, debug=Config.DEBUG)
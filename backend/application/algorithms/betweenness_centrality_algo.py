@@ -1,8 +1,90 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from .registry import IsCancelled, ProgressCallback
+from .registry import AlgorithmResult, IsCancelled, ProgressCallback
+
+
+def _opt_float(v: Any) -> Optional[float]:
+    if v is None or v == '':
+        return None
+    return float(v)
+
+
+def _opt_int(v: Any) -> Optional[int]:
+    if v is None or v == '':
+        return None
+    return int(v)
+
+
+def _run_approx(
+    abs_path: str,
+    params: Dict[str, Any],
+    normalized: bool,
+    progress_cb: ProgressCallback,
+    is_cancelled: IsCancelled,
+) -> Dict[str, Any]:
+    """抽样近似：给 k 时用源点抽样（Brandes–Pich），给 epsilon 时用 RK 路径抽样。"""
+    from application.algorithms import brandes, parallel
+    from application.algorithms.utils import load_csr_graph
+
+    workers = parallel.resolve_workers(params.get('workers'))
+    chunk_size = _opt_int(params.get('chunk_size'))
+    k = _opt_int(params.get('k'))
+    epsilon = _opt_float(params.get('epsilon'))
+    delta = _opt_float(params.get('delta'))
+    seed = _opt_int(params.get('seed'))
+    if delta is None:
+        delta = 0.1
+    if not (0.0 < delta < 1.0):
+        raise ValueError('delta 必须在 (0, 1) 区间内')
+    if epsilon is not None and not (0.0 < epsilon < 1.0):
+        raise ValueError('epsilon 必须在 (0, 1) 区间内')
+    if k is not None and k <= 0:
+        raise ValueError('k 必须为正整数')
+    if k is None and epsilon is None:
+        epsilon = 0.01
+
+    progress_cb(5, 'loading', '读取边列表并构建 CSR 图')
+    G = load_csr_graph(abs_path)
+    if is_cancelled():
+        return {}
+
+    n = G.number_of_nodes()
+    m = G.number_of_edges()
+    if n == 0:
+        progress_cb(100, 'done', '空图，无需计算')
+        return {}
+
+    def on_progress(done: int, total: int):
+        progress_cb(30 + int(60 * done / max(total, 1)), 'computing', f'抽样进度 {done}/{total}')
+
+    if k is not None:
+        progress_cb(30, 'computing', f'源点抽样近似介数（节点={n}，边={m}，k={k}）')
+        out = brandes.source_sampling(
+            G, k, seed=seed, normalized=normalized, delta=delta,
+            workers=workers, chunk_size=chunk_size, progress=on_progress, is_cancelled=is_cancelled,
+        )
+    else:
+        progress_cb(30, 'computing', f'RK 路径抽样近似介数（节点={n}，边={m}，epsilon={epsilon}）')
+        out = brandes.rk_sampling(
+            G, epsilon, delta=delta, seed=seed, normalized=normalized,
+            max_samples=_opt_int(params.get('max_samples')),
+            progress=on_progress, is_cancelled=is_cancelled,
+        )
+
+    if out is None or is_cancelled():
+        return {}
+
+    values, meta = out
+    progress_cb(90, 'finalizing', '格式化结果')
+    ids = G.node_ids.tolist()
+    result = AlgorithmResult(
+        {str(node_id): float(v) for node_id, v in zip(ids, values.tolist())},
+        meta=dict(meta, approx=True, normalized=normalized),
+    )
+    progress_cb(100, 'done', '计算完成')
+    return result
 
 
 def run(
@@ -15,43 +97,48 @@ def run(
 
     normalized = bool(params.get('normalized', True))
 
+    # approx=true：抽样近似（大图上精确 Brandes 的 O(nm) 不可接受）
+    if params.get('approx') in (True, 1, '1', 'true', 'True'):
+        return _run_approx(abs_path, params, normalized, progress_cb, is_cancelled)
+
     progress_cb(5, 'loading', '读取边列表并构建图')
     if is_cancelled():
         return {}
 
-    from application.algorithms.utils import load_graph
+    from application.algorithms import brandes, parallel
+    from application.algorithms.utils import load_csr_graph
 
-    G = load_graph(abs_path)
+    G = load_csr_graph(abs_path)
 
     if is_cancelled():
         return {}
 
     n = G.number_of_nodes()
     m = G.number_of_edges()
-    progress_cb(30, 'computing', f'开始计算介数中心性（节点={n}，边={m}）')
+    workers = parallel.resolve_workers(params.get('workers'))
+    chunk_size = _opt_int(params.get('chunk_size'))
+    progress_cb(30, 'computing', f'开始计算介数中心性（节点={n}，边={m}，workers={workers}）')
 
     if n == 0:
         progress_cb(100, 'done', '空图，无需计算')
         return {}
 
-    # networkx 内置 Brandes 算法
-    # endpoints=False 对应常见的 betweenness 定义；normalized 默认 True
-    import networkx as nx
+    # Brandes 算法按源点分块并行：各块的依赖向量在主进程累加
+    # endpoints=False 对应常见的 betweenness 定义；normalized 默认 True（口径同 networkx）
+    def on_progress(done: int, total: int):
+        progress_cb(30 + int(60 * done / max(total, 1)), 'computing', f'已完成源点块 {done}/{total}')
 
-    if is_cancelled():
-        return {}
+    bc = brandes.exact(G, normalized=normalized, workers=workers, chunk_size=chunk_size,
+                       progress=on_progress, is_cancelled=is_cancelled)
 
-    bc = nx.betweenness_centrality(G, normalized=normalized, endpoints=False)
-
-    if is_cancelled():
+    if bc is None or is_cancelled():
         return {}
 
     progress_cb(90, 'finalizing', '格式化结果')
 
     out: Dict[str, Any] = {}
-    for node_id, value in bc.items():
+    for node_id, value in zip(G.node_ids.tolist(), bc.tolist()):
         out[str(node_id)] = float(value)
 
     progress_cb(100, 'done', '计算完成')
     return out
-
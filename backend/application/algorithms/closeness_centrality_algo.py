@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
-from .registry import IsCancelled, ProgressCallback
+from .registry import AlgorithmResult, IsCancelled, ProgressCallback
+
+MODES = ('exact', 'sample', 'hyperball')
 
 
 def run(
@@ -13,41 +15,80 @@ def run(
 ) -> Dict[str, Any]:
     params = params or {}
 
-    progress_cb(5, 'loading', '读取边列表并构建图')
+    # mode: exact（默认，位并行多源 BFS）| sample（Eppstein–Wang 枢纽点抽样）| hyperball（HyperLogLog 调和接近中心性）
+    mode = str(params.get('mode') or 'exact').strip().lower()
+    if mode not in MODES:
+        raise ValueError(f'不支持的 mode: {mode}（可选 {", ".join(MODES)}）')
+
+    # top_k：报告/传播只用前 top_n/prop_k 个节点，剪枝 BFS 只保证前 k 名精确（仅 exact 模式）
+    top_k = params.get('top_k')
+    top_k = int(top_k) if top_k not in (None, '') else None
+    if top_k is not None and top_k <= 0:
+        raise ValueError('top_k 必须为正整数')
+    if top_k is not None and mode != 'exact':
+        raise ValueError('top_k 仅支持 mode=exact')
+
+    # k：sample 模式的枢纽点数
+    k = params.get('k')
+    k = int(k) if k not in (None, '') else 256
+    if k <= 0:
+        raise ValueError('k 必须为正整数')
+
+    progress_cb(5, 'loading', '读取边列表并构建 CSR 图')
     if is_cancelled():
         return {}
 
-    from application.algorithms.utils import load_graph
+    from application.algorithms import closeness, parallel
+    from application.algorithms.utils import load_csr_graph
 
-    G = load_graph(abs_path)
+    G = load_csr_graph(abs_path)
 
     if is_cancelled():
         return {}
 
     n = G.number_of_nodes()
     m = G.number_of_edges()
-    progress_cb(30, 'computing', f'开始计算接近中心性（节点={n}，边={m}）')
+    progress_cb(30, 'computing', f'开始计算接近中心性（节点={n}，边={m}，mode={mode}）')
 
     if n == 0:
         progress_cb(100, 'done', '空图，无需计算')
         return {}
 
-    import networkx as nx
-
-    if is_cancelled():
-        return {}
-
-    cc = nx.closeness_centrality(G)
-
-    if is_cancelled():
+    workers = parallel.resolve_workers(params.get('workers'))
+    batch_size = int(params.get('batch_size') or 64)
+    seed = params.get('seed')
+    seed = int(seed) if seed not in (None, '') else None
+
+    def on_progress(done: int, total: int):
+        progress_cb(30 + int(60 * done / max(total, 1)), 'computing', f'BFS 批次 {done}/{total}')
+
+    def on_node_progress(done: int, total: int):
+        progress_cb(30 + int(60 * done / max(total, 1)), 'computing', f'已处理节点 {done}/{total}')
+
+    meta: Dict[str, Any] = {'mode': mode}
+    if mode == 'exact' and top_k is not None:
+        out = closeness.top_k(G, top_k, progress=on_node_progress, is_cancelled=is_cancelled)
+        values, meta = out if out is not None else (None, meta)
+    elif mode == 'exact':
+        values = closeness.exact(G, workers=workers, batch_size=batch_size, progress=on_progress, is_cancelled=is_cancelled)
+    elif mode == 'sample':
+        out = closeness.sample(G, k, seed=seed, workers=workers, batch_size=batch_size,
+                               progress=on_progress, is_cancelled=is_cancelled)
+        values, meta = out if out is not None else (None, meta)
+    else:
+        out = closeness.hyperball(G, log2m=int(params.get('log2m') or 7), seed=seed,
+                                  max_iter=params.get('max_iter'), progress=on_progress, is_cancelled=is_cancelled)
+        values, meta = out if out is not None else (None, meta)
+
+    if values is None or is_cancelled():
         return {}
 
     progress_cb(90, 'finalizing', '格式化结果')
 
-    out: Dict[str, Any] = {}
-    for node_id, value in cc.items():
-        out[str(node_id)] = float(value)
+    out_map = AlgorithmResult(
+        {str(node_id): float(v) for node_id, v in zip(G.node_ids.tolist(), values.tolist())},
+        meta=meta,
+    )
 
     progress_cb(100, 'done', '计算完成')
-    return out
-
+    return out_map
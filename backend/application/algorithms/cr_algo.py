@@ -25,8 +25,24 @@ def run(abs_path: str, params: Dict[str, Any], progress_cb: ProgressCallback, is
     # 假设你的算法函数名为 `my_existing_algorithm`，它接收一个 networkx.Graph 对象
     # 并返回 {node_id: node_value}
     from application.algorithms.my_algo_module import cr # 导入你的算法模块
+    from application.algorithms import parallel
     # 或者，如果你的算法代码直接写在这个文件里，直接调用函数
-    result_dict = cr.compute_cycle_ratio(G)
+    params = params or {}
+
+    def on_progress(done: int, total: int):
+        progress_cb(30 + int(60 * done / max(total, 1)), 'computing', f'最短环搜索：节点 {done}/{total}')
+
+    # 核数走按上传内容缓存的特征库（hgc 等算法共用），不可用时由 cr 现场计算
+    from application.algorithms.feature_store import open_store
+    store = open_store(abs_path)
+
+    result_dict = cr.compute_cycle_ratio(
+        G,
+        is_cancelled=is_cancelled,
+        progress_cb=on_progress,
+        workers=parallel.resolve_workers(params.get('workers')),
+        core_number=store.as_dict('core_number') if store is not None else None,
+    )
 
     # 5. 检查取消和进度
     if is_cancelled():
@@ -0,0 +1,181 @@
+"""紧凑 CSR 图表示（NumPy 实现）。
+
+用于替代逐边构建 networkx.Graph 的加载方式：
+- 节点按原始 id 升序编号为 0..n-1（int32 下标），node_ids[i] 为下标 i 对应的原始 id；
+- 无向图以对称 CSR 存储：indices[indptr[i]:indptr[i+1]] 为节点 i 的邻居（升序、去重）；
+- CSR 图是简单图：去掉自环与重边；仅出现在自环中的节点保留为孤立点；
+  自环另记在 self_loops（每个节点 0/1，重复自环只记一次），需要与 networkx 度数口径一致时使用；
+- 多层网络的每一层都是一个 CSRGraph，并共享同一张全局节点表。
+
+需要 networkx 的旧代码可通过 to_networkx() 转换。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+
+
+class CSRGraph:
+    """无向简单图的 CSR 表示。"""
+
+    __slots__ = ('node_ids', 'indptr', 'indices', 'weights', 'self_loops')
+
+    def __init__(self, node_ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray, weights: Optional[np.ndarray] = None,
+                 self_loops: Optional[np.ndarray] = None):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.self_loops = self_loops if self_loops is not None else np.zeros(len(node_ids), dtype=np.int8)
+
+    # ---------- 构建 ----------
+
+    @classmethod
+    def from_edges(
+        cls,
+        src: np.ndarray,
+        dst: np.ndarray,
+        node_ids: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+    ) -> 'CSRGraph':
+        """由原始 id 的边数组构建。
+
+        node_ids 为空时取 src/dst 的并集；传入时 src/dst 中的 id 必须都在 node_ids 中
+        （多层网络用它让各层共享全局节点表）。重边保留首次出现的权重。
+        """
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        if node_ids is None:
+            node_ids = np.unique(np.concatenate([src, dst]))
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        u = np.searchsorted(node_ids, src).astype(np.int32)
+        v = np.searchsorted(node_ids, dst).astype(np.int32)
+        return cls.from_index_edges(u, v, len(node_ids), node_ids=node_ids, weights=weights)
+
+    @classmethod
+    def from_index_edges(
+        cls,
+        u: np.ndarray,
+        v: np.ndarray,
+        n: int,
+        node_ids: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+    ) -> 'CSRGraph':
+        """由 0..n-1 下标的边数组构建对称 CSR。"""
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        keep = u != v
+        self_loops = np.zeros(n, dtype=np.int8)
+        self_loops[u[~keep]] = 1
+        u, v = u[keep], v[keep]
+        w = None
+        if weights is not None:
+            w = np.asarray(weights, dtype=np.float32)[keep]
+
+        rows = np.concatenate([u, v])
+        cols = np.concatenate([v, u])
+        keys = rows * np.int64(max(n, 1)) + cols
+        keys, first = np.unique(keys, return_index=True)
+        rows = keys // max(n, 1)
+        cols = keys % max(n, 1)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        indices = cols.astype(np.int32)
+        if w is not None:
+            w = np.concatenate([w, w])[first]
+
+        if node_ids is None:
+            node_ids = np.arange(n, dtype=np.int64)
+        return cls(np.asarray(node_ids, dtype=np.int64), indptr, indices, w, self_loops)
+
+    # ---------- 基本查询 ----------
+
+    def number_of_nodes(self) -> int:
+        return int(len(self.node_ids))
+
+    def number_of_edges(self) -> int:
+        return int(len(self.indices) // 2)
+
+    def degree(self, count_self_loops: bool = False) -> np.ndarray:
+        """按下标排列的度数组；count_self_loops=True 时自环按 2 计入（与 nx.Graph.degree 一致）。"""
+        deg = np.diff(self.indptr)
+        if count_self_loops:
+            deg = deg + 2 * self.self_loops.astype(deg.dtype)
+        return deg
+
+    def neighbors(self, idx: int) -> np.ndarray:
+        return self.indices[self.indptr[idx]:self.indptr[idx + 1]]
+
+    def index_of(self, node_id: Any) -> int:
+        """原始 id -> 下标；不存在时抛 KeyError。"""
+        i = int(np.searchsorted(self.node_ids, int(node_id)))
+        if i >= len(self.node_ids) or int(self.node_ids[i]) != int(node_id):
+            raise KeyError(node_id)
+        return i
+
+    def id_of(self, idx: int) -> int:
+        return int(self.node_ids[idx])
+
+    def active_mask(self) -> np.ndarray:
+        """本图中至少有一条边的节点（多层网络里用来区分“本层节点”）。"""
+        return self.degree() > 0
+
+    def edge_arrays(self):
+        """返回每条无向边一次（u < v）的下标数组 (u, v)。"""
+        rows = np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), self.degree())
+        mask = rows < self.indices
+        return rows[mask], self.indices[mask]
+
+    # ---------- 适配 ----------
+
+    def to_scipy(self):
+        """转为 scipy.sparse.csr_matrix（0/1 邻接或边权）。"""
+        import scipy.sparse as sp
+
+        n = self.number_of_nodes()
+        data = self.weights if self.weights is not None else np.ones(len(self.indices), dtype=np.float64)
+        return sp.csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+    def to_networkx(self, include_isolated: bool = True):
+        """转为 networkx.Graph（节点为原始 int id）。
+
+        include_isolated=False 时只输出本图中有边的节点，用于多层网络的单层视图。
+        """
+        import networkx as nx
+
+        G = nx.Graph()
+        ids = self.node_ids.tolist()
+        if include_isolated:
+            G.add_nodes_from(ids)
+        u, v = self.edge_arrays()
+        if self.weights is None:
+            G.add_edges_from(zip(self.node_ids[u].tolist(), self.node_ids[v].tolist()))
+        else:
+            rows = np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), self.degree())
+            w = self.weights[rows < self.indices]
+            G.add_edges_from(
+                (a, b, {'weight': c})
+                for a, b, c in zip(self.node_ids[u].tolist(), self.node_ids[v].tolist(), w.tolist())
+            )
+        return G
+
+    def nbytes(self) -> int:
+        total = self.node_ids.nbytes + self.indptr.nbytes + self.indices.nbytes + self.self_loops.nbytes
+        if self.weights is not None:
+            total += self.weights.nbytes
+        return int(total)
+
+    def __repr__(self) -> str:
+        return f'CSRGraph(nodes={self.number_of_nodes()}, edges={self.number_of_edges()})'
+
+
+def layers_to_networkx(layers: Iterable[CSRGraph]) -> List[Any]:
+    """多层 CSR -> list[nx.Graph]，与 utils.load_multilayer_graph 的输出口径一致。"""
+    layers = list(layers)
+    if len(layers) == 1:
+        return [layers[0].to_networkx(include_isolated=True)]
+    return [g.to_networkx(include_isolated=False) for g in layers]
+
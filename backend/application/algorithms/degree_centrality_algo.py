@@ -9,7 +9,8 @@
 其中 degree_centrality = degree/(n-1)（无向图归一化度中心性）。
 
 实现要点：
-- 复用你现有的图加载方法：application.algorithms.utils.load_graph
+- 使用 CSR 图加载方法：application.algorithms.utils.load_csr_graph；度数口径与 nx.Graph 一致
+  （重边只计一次，自环计 2）
 - 支持任务进度回调 progress_cb
 - 支持取消 is_cancelled
 
@@ -22,6 +23,8 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
+import numpy as np
+
 from .registry import ProgressCallback, IsCancelled
 
 
@@ -33,11 +36,10 @@ def run(abs_path: str, params: Dict[str, Any], progress_cb: ProgressCallback, is
     if is_cancelled():
         return {}
 
-    # 复用现有建图逻辑（无向图）
-    # utils.py 里依赖 networkx，这里也依赖同一环境
-    from application.algorithms.utils import load_graph
+    # 使用 CSR 表示建图，度数由 indptr 差分得到，再按 nx 口径补上自环
+    from application.algorithms.utils import load_csr_graph
 
-    G = load_graph(abs_path)
+    G = load_csr_graph(abs_path)
 
     if is_cancelled():
         return {}
@@ -46,29 +48,15 @@ def run(abs_path: str, params: Dict[str, Any], progress_cb: ProgressCallback, is
     m = G.number_of_edges()
     progress_cb(40, 'computing', f'开始计算度中心性（节点={n}，边={m}）')
 
-    # 计算度
-    degrees = dict(G.degree())
-
     # 归一化：除以 (n-1)
     denom = (n - 1) if (normalized and n > 1) else 1
+    values = G.degree(count_self_loops=True).astype(np.float64) / float(denom)
 
-    out: Dict[str, Any] = {}
-    # 迭代节点输出
-    nodes = list(G.nodes())
-    total = len(nodes)
-
-    for i, node in enumerate[Any](nodes):
-        if is_cancelled():
-            return {}
-        deg = degrees.get(node, 0)
-        val = float(deg) / float(denom)
-        out[str(node)] = val
+    if is_cancelled():
+        return {}
+    progress_cb(90, 'computing', f'计算中：{n}/{n}')
 
-        # 进度：40 -> 90
-        if total > 0 and (i + 1) % max(1, total // 20) == 0:
-            p = 40 + int((i + 1) / total * 50)
-            progress_cb(min(90, p), 'computing', f'计算中：{i + 1}/{total}')
+    out: Dict[str, Any] = dict(zip(map(str, G.node_ids.tolist()), values.tolist()))
 
     progress_cb(95, 'finalizing', '整理结果')
     return out
-
@@ -0,0 +1,284 @@
+"""按上传文件内容缓存的节点结构特征（feature store）。
+
+cr/hgc 的核数剪枝、MGNN_AL 的输入特征、报告的连通分量/聚类指标都在同一张图上反复计算
+相同的结构量。这里把它们按“源文件 sha256 + 特征版本”落盘为列式数组，每个特征只算一次：
+
+    <上传目录>/.features/<sha256>/v<FEATURE_VERSION>/<key>.npy
+
+- key 为特征名（合并图口径）或 `L<层号>.<特征名>`（多层网络的单层口径，层号从 1 开始）；
+- 数组与 sidecar 的 node_ids 对齐（全局节点表，单层口径下本层没有边的节点为孤立点）；
+- 图口径与 CSRGraph 一致：简单无向图（去掉自环与重边）。
+
+支持的特征：
+- degree       int64，度数
+- core_number  int64，k-核数（Batagelj–Zaversnik 桶排序，与 nx.core_number 一致）
+- triangles    int64，经过该节点的三角形数（与 nx.triangles 一致）
+- clustering   float64，局部聚类系数（与 nx.clustering 一致）
+- eigenvector  float64，特征向量中心性（与 nx.eigenvector_centrality(max_iter=10000) 同一迭代；
+               不收敛时为 1/n，与 MGNN_AL 的回退口径一致）
+- component    int64，连通分量编号
+
+没有 sidecar（格式不支持）时 FeatureStore.open 返回 None，调用方回退到原有的 networkx 计算。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from application.algorithms.graph_sidecar import GraphSidecar, ensure_sidecar
+
+FEATURE_VERSION = 1
+FEATURE_DIR = '.features'
+
+FEATURES = ('degree', 'core_number', 'triangles', 'clustering', 'eigenvector', 'component')
+
+# 同一进程内同一特征只计算一次（跨进程依赖原子换名，重复计算的结果相同）
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = threading.Lock()
+        return lock
+
+
+# ---------------- 特征计算（CSR 下标口径） ----------------
+
+def core_number(indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Batagelj–Zaversnik O(m) k-核分解。"""
+    n = len(indptr) - 1
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    ptr = indptr.tolist()
+    nbrs = indices.tolist()
+    deg = np.diff(indptr).tolist()
+
+    max_deg = max(deg)
+    bins = [0] * (max_deg + 1)
+    for d in deg:
+        bins[d] += 1
+    start = 0
+    for d in range(max_deg + 1):
+        start, bins[d] = start + bins[d], start
+
+    pos = [0] * n
+    vert = [0] * n
+    for v in range(n):
+        pos[v] = bins[deg[v]]
+        vert[pos[v]] = v
+        bins[deg[v]] += 1
+    for d in range(max_deg, 0, -1):
+        bins[d] = bins[d - 1]
+    bins[0] = 0
+
+    for i in range(n):
+        v = vert[i]
+        dv = deg[v]
+        for u in nbrs[ptr[v]:ptr[v + 1]]:
+            du = deg[u]
+            if du > dv:
+                pu = pos[u]
+                pw = bins[du]
+                w = vert[pw]
+                if u != w:
+                    pos[u], vert[pu] = pw, w
+                    pos[w], vert[pw] = pu, u
+                bins[du] += 1
+                deg[u] = du - 1
+    return np.asarray(deg, dtype=np.int64)
+
+
+def triangles(indptr: np.ndarray, indices: np.ndarray, budget: int = 4_000_000) -> np.ndarray:
+    """每个节点的三角形数：diag(A^3)/2，按两跳路径数分块计算 (A[R]·A) ∘ A[R]。"""
+    import scipy.sparse as sp
+
+    n = len(indptr) - 1
+    out = np.zeros(n, dtype=np.int64)
+    if n == 0 or len(indices) == 0:
+        return out
+    A = sp.csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr), shape=(n, n))
+    deg = np.diff(indptr)
+    rows = np.repeat(np.arange(n, dtype=np.int64), deg)
+    csum = np.cumsum(np.bincount(rows, weights=deg[indices], minlength=n).astype(np.int64))
+    start = 0
+    while start < n:
+        base = int(csum[start - 1]) if start else 0
+        stop = min(max(int(np.searchsorted(csum, base + budget, side='right')), start + 1), n)
+        AR = A[start:stop]
+        out[start:stop] = np.asarray((AR @ A).multiply(AR).sum(axis=1)).ravel() // 2
+        start = stop
+    return out
+
+
+def clustering(deg: np.ndarray, tri: np.ndarray) -> np.ndarray:
+    """局部聚类系数 2T / (d(d-1))，度数 < 2 时为 0。"""
+    out = np.zeros(len(deg), dtype=np.float64)
+    mask = deg > 1
+    d = deg[mask].astype(np.float64)
+    out[mask] = 2.0 * tri[mask] / (d * (d - 1))
+    return out
+
+
+def eigenvector(indptr: np.ndarray, indices: np.ndarray, max_iter: int = 10000, tol: float = 1.0e-6) -> np.ndarray:
+    """与 nx.eigenvector_centrality 相同的幂迭代：x <- (A + I)x，L2 归一化，
+    Σ|x - x_last| < n·tol 时收敛；不收敛时返回 1/n。"""
+    import scipy.sparse as sp
+
+    n = len(indptr) - 1
+    if n == 0:
+        return np.zeros(0, dtype=np.float64)
+    A = sp.csr_matrix((np.ones(len(indices), dtype=np.float64), indices, indptr), shape=(n, n))
+    x = np.full(n, 1.0 / n, dtype=np.float64)
+    for _ in range(max_iter):
+        last = x
+        x = last + A @ last
+        norm = float(np.sqrt(np.dot(x, x))) or 1.0
+        x = x / norm
+        if float(np.abs(x - last).sum()) < n * tol:
+            return x
+    return np.full(n, 1.0 / n, dtype=np.float64)
+
+
+def component(indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    import scipy.sparse as sp
+    from scipy.sparse.csgraph import connected_components
+
+    n = len(indptr) - 1
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    A = sp.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr), shape=(n, n))
+    _, labels = connected_components(A, directed=False)
+    return labels.astype(np.int64)
+
+
+# ---------------- 存储 ----------------
+
+class FeatureStore:
+    """单个上传文件的特征缓存。"""
+
+    def __init__(self, sidecar: GraphSidecar, root: str):
+        self.sidecar = sidecar
+        self.root = root
+        self._graphs: Dict[Optional[int], Any] = {}
+
+    @classmethod
+    def open(cls, abs_path: str) -> Optional['FeatureStore']:
+        """打开上传文件对应的特征缓存；没有可用 sidecar 时返回 None。"""
+        sc = ensure_sidecar(abs_path)
+        if sc is None or not sc.sha256:
+            return None
+        root = os.path.join(os.path.dirname(os.path.abspath(abs_path)), FEATURE_DIR, sc.sha256, f'v{FEATURE_VERSION}')
+        return cls(sc, root)
+
+    @property
+    def node_ids(self) -> np.ndarray:
+        return np.asarray(self.sidecar.node_ids)
+
+    @property
+    def num_layers(self) -> int:
+        return int(self.sidecar.meta.get('layers') or 0) if self.sidecar.is_multilayer else 1
+
+    def graph(self, layer: Optional[int] = None):
+        """特征所基于的 CSRGraph：layer=None 为合并图，否则为第 layer 层（从 1 开始）。"""
+        if layer is not None and not self.sidecar.is_multilayer:
+            layer = None
+        if layer is not None:
+            layer = int(layer)
+        if layer not in self._graphs:
+            if layer is None:
+                self._graphs[None] = self.sidecar.to_csr()
+            else:
+                if not 1 <= int(layer) <= self.num_layers:
+                    raise ValueError(f'层号超出范围: {layer}')
+                for i, g in enumerate(self.sidecar.to_csr_layers(), start=1):
+                    self._graphs[i] = g
+        return self._graphs[layer]
+
+    def _key(self, name: str, layer: Optional[int]) -> str:
+        if layer is None or not self.sidecar.is_multilayer:
+            return name
+        return f'L{int(layer)}.{name}'
+
+    def get(self, name: str, layer: Optional[int] = None) -> np.ndarray:
+        """读取特征数组（与 node_ids 对齐），首次访问时计算并落盘。"""
+        if name not in FEATURES:
+            raise ValueError(f'未知特征: {name}')
+        path = os.path.join(self.root, self._key(name, layer) + '.npy')
+        if os.path.exists(path):
+            try:
+                return np.load(path, mmap_mode='r')
+            except Exception:
+                pass
+
+        with _lock_for(path):
+            if os.path.exists(path):
+                try:
+                    return np.load(path, mmap_mode='r')
+                except Exception:
+                    pass
+            values = self._compute(name, layer)
+            self._save(path, values)
+            return values
+
+    def has(self, name: str, layer: Optional[int] = None) -> bool:
+        """特征是否已落盘。"""
+        return os.path.exists(os.path.join(self.root, self._key(name, layer) + '.npy'))
+
+    def put(self, name: str, values: np.ndarray, layer: Optional[int] = None) -> None:
+        """写入在别处（如进程池 worker）算好的特征；已存在时忽略。"""
+        if name not in FEATURES:
+            raise ValueError(f'未知特征: {name}')
+        path = os.path.join(self.root, self._key(name, layer) + '.npy')
+        if len(values) != len(self.node_ids) or os.path.exists(path):
+            return
+        with _lock_for(path):
+            if not os.path.exists(path):
+                self._save(path, np.asarray(values))
+
+    def as_dict(self, name: str, layer: Optional[int] = None) -> Dict[int, Any]:
+        """{原始节点 id: 值}，供仍以 networkx 节点为键的算法使用。"""
+        return dict(zip(self.node_ids.tolist(), np.asarray(self.get(name, layer)).tolist()))
+
+    def _compute(self, name: str, layer: Optional[int]) -> np.ndarray:
+        G = self.graph(layer)
+        if name == 'degree':
+            return G.degree().astype(np.int64)
+        if name == 'core_number':
+            return core_number(G.indptr, G.indices)
+        if name == 'triangles':
+            return triangles(G.indptr, G.indices)
+        if name == 'clustering':
+            return clustering(np.asarray(self.get('degree', layer)), np.asarray(self.get('triangles', layer)))
+        if name == 'eigenvector':
+            return eigenvector(G.indptr, G.indices)
+        return component(G.indptr, G.indices)
+
+    @staticmethod
+    def _save(path: str, values: np.ndarray) -> None:
+        # 落盘失败（只读目录等）不影响本次计算结果
+        tmp = f'{path}.tmp-{uuid.uuid4().hex}.npy'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.save(tmp, values)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except Exception:
+                pass
+
+
+def open_store(abs_path: str) -> Optional[FeatureStore]:
+    """FeatureStore.open 的容错版本：任何异常都视为不可用。"""
+    try:
+        return FeatureStore.open(abs_path)
+    except Exception:
+        return None
@@ -0,0 +1,279 @@
+"""上传文件的二进制图旁路文件（sidecar）。
+
+上传时把 txt/csv 边表一次性转换为 `<stored_name>.graph/` 目录：
+- meta.json     版本号、格式（singlelayer/multilayer）、列数、节点/边/层统计、源文件 size/mtime/sha256
+- node_ids.npy  int64，升序的原始节点 id 表
+- src.npy/dst.npy  int32，按文件顺序的边（node_ids 下标，保留自环与重边）
+- weight.npy    float32，仅 4 列多层网络
+- layer.npy     int32，仅 4 列多层网络（层号从 1 开始）
+
+之后所有消费方（算法加载器、/network/graph、报告、传播仿真）都用 np.load(mmap_mode='r')
+读取，不再做文本解析。只支持首行 2 列（source target）或 4 列（layer source target weight）
+的整数边表，且节点 id 必须是规范的十进制整数（`str(int(t)) == t`，如 "007"、"1e3" 不算）：
+node_ids 以 int64 存储，非规范写法转换后会与文本解析保留的原始 id 不一致。
+其他格式（如带表头的 csv）只记录 format=unsupported，调用方回退到原有文本解析。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+SIDECAR_VERSION = 3
+SIDECAR_SUFFIX = '.graph'
+
+FORMAT_SINGLELAYER = 'singlelayer'
+FORMAT_MULTILAYER = 'multilayer'
+FORMAT_UNSUPPORTED = 'unsupported'
+
+_SEPARATORS = re.compile(r'[,;]')
+_NON_EMPTY_LINE = re.compile(r'^[ \t]*\S', re.M)
+
+
+class GraphSidecar:
+    """已加载（内存映射）的 sidecar。"""
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.path = path
+        self.meta = meta
+        self.node_ids = np.load(os.path.join(path, 'node_ids.npy'), mmap_mode='r')
+        self.src = np.load(os.path.join(path, 'src.npy'), mmap_mode='r')
+        self.dst = np.load(os.path.join(path, 'dst.npy'), mmap_mode='r')
+        self.weight = None
+        self.layer = None
+        if self.is_multilayer:
+            self.weight = np.load(os.path.join(path, 'weight.npy'), mmap_mode='r')
+            self.layer = np.load(os.path.join(path, 'layer.npy'), mmap_mode='r')
+
+    @property
+    def format(self) -> str:
+        return self.meta.get('format') or ''
+
+    @property
+    def sha256(self) -> str:
+        return (self.meta.get('source') or {}).get('sha256') or ''
+
+    @property
+    def is_multilayer(self) -> bool:
+        return self.format == FORMAT_MULTILAYER
+
+    def to_csr(self):
+        """单层 CSRGraph（多层文件会把所有层合并为一张图）。"""
+        from application.algorithms.csr_graph import CSRGraph
+
+        return CSRGraph.from_index_edges(self.src, self.dst, len(self.node_ids), node_ids=np.asarray(self.node_ids))
+
+    def to_csr_layers(self):
+        """list[CSRGraph]，各层共享全局节点表（与 utils.load_multilayer_csr_graph 一致）。"""
+        from application.algorithms.csr_graph import CSRGraph
+
+        node_ids = np.asarray(self.node_ids)
+        n = len(node_ids)
+        if not self.is_multilayer:
+            return [CSRGraph.from_index_edges(self.src, self.dst, n, node_ids=node_ids)]
+
+        layer = np.asarray(self.layer)
+        num_layers = int(self.meta.get('layers') or 0)
+        order = np.argsort(layer, kind='stable')
+        bounds = np.searchsorted(layer[order], np.arange(1, num_layers + 2))
+        graphs = []
+        for i in range(num_layers):
+            sel = order[bounds[i]:bounds[i + 1]]
+            graphs.append(CSRGraph.from_index_edges(self.src[sel], self.dst[sel], n, node_ids=node_ids, weights=self.weight[sel]))
+        return graphs
+
+
+def sidecar_path(abs_path: str) -> str:
+    return abs_path + SIDECAR_SUFFIX
+
+
+def _source_stat(abs_path: str) -> Dict[str, int]:
+    st = os.stat(abs_path)
+    return {'size': int(st.st_size), 'mtime_ns': int(st.st_mtime_ns)}
+
+
+def content_hash(abs_path: str) -> str:
+    """源文件内容的 sha256（十六进制），内容相同的上传共享结构特征缓存（见 feature_store.py）。"""
+    h = hashlib.sha256()
+    with open(abs_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _parse_table(abs_path: str) -> Optional[np.ndarray]:
+    """把边表解析为二维数组；格式不支持时返回 None。
+
+    分隔符兼容空白/逗号/分号，跳过空行与 # 注释行（与 graph_service 口径一致）。
+    """
+    with open(abs_path, 'r', encoding='utf-8', errors='strict') as f:
+        data = f.read()
+
+    if '#' in data:
+        data = '\n'.join(line for line in data.splitlines() if not line.lstrip().startswith('#'))
+    data = _SEPARATORS.sub(' ', data)
+
+    first_tokens = None
+    for line in data.splitlines():
+        s = line.strip()
+        if s:
+            first_tokens = s.split()
+            break
+    if first_tokens is None:
+        return None
+
+    cols = len(first_tokens)
+    if cols not in (2, 4):
+        return None
+
+    tokens = data.split()
+    rows = len(_NON_EMPTY_LINE.findall(data))
+    if len(tokens) != rows * cols:
+        return None
+
+    try:
+        table = np.array(tokens, dtype=np.int64).reshape(rows, cols)
+    except ValueError:
+        # 4 列时允许权重为小数，其余列必须是整数
+        if cols != 4:
+            return None
+        try:
+            table = np.array(tokens, dtype=np.float64).reshape(rows, cols)
+        except ValueError:
+            return None
+        if not np.all(np.mod(table[:, :3], 1) == 0):
+            return None
+
+    # 节点 id 列必须能原样还原（"007" -> 7 -> "7" 会改变节点 id），否则交给文本解析
+    id_cols = [0, 1] if cols == 2 else [1, 2]
+    raw = np.array(tokens).reshape(rows, cols)[:, id_cols]
+    if not np.array_equal(table[:, id_cols].astype(np.int64).astype(str), raw):
+        return None
+    return table
+
+
+def build_sidecar(abs_path: str) -> Optional[Dict[str, Any]]:
+    """为上传文件生成 sidecar，返回 meta；格式不支持时返回 None。"""
+    stat = _source_stat(abs_path)
+    stat['sha256'] = content_hash(abs_path)
+    try:
+        table = _parse_table(abs_path)
+    except UnicodeDecodeError:
+        table = None
+    if table is None:
+        # 记录“不支持”，避免每次加载都重复尝试解析
+        _write_sidecar(abs_path, {'version': SIDECAR_VERSION, 'format': FORMAT_UNSUPPORTED, 'source': stat}, {})
+        return None
+
+    cols = table.shape[1]
+    if cols == 2:
+        src_ids = table[:, 0].astype(np.int64)
+        dst_ids = table[:, 1].astype(np.int64)
+        fmt = FORMAT_SINGLELAYER
+    else:
+        src_ids = table[:, 1].astype(np.int64)
+        dst_ids = table[:, 2].astype(np.int64)
+        fmt = FORMAT_MULTILAYER
+
+    node_ids = np.unique(np.concatenate([src_ids, dst_ids]))
+    src = np.searchsorted(node_ids, src_ids).astype(np.int32)
+    dst = np.searchsorted(node_ids, dst_ids).astype(np.int32)
+
+    meta: Dict[str, Any] = {
+        'version': SIDECAR_VERSION,
+        'format': fmt,
+        'columns': int(cols),
+        'nodes': int(len(node_ids)),
+        'edges': int(len(src)),
+        'self_loops': int(np.count_nonzero(src == dst)),
+        'layers': 1,
+        'source': stat,
+    }
+
+    arrays = {'node_ids': node_ids, 'src': src, 'dst': dst}
+    if fmt == FORMAT_MULTILAYER:
+        layer = table[:, 0].astype(np.int32)
+        if len(layer) and int(layer.min()) < 1:
+            raise ValueError('层号必须从1开始')
+        meta['layers'] = int(layer.max()) if len(layer) else 0
+        arrays['layer'] = layer
+        arrays['weight'] = table[:, 3].astype(np.float32)
+
+    _write_sidecar(abs_path, meta, arrays)
+    return meta
+
+
+def _write_sidecar(abs_path: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+    target = sidecar_path(abs_path)
+    tmp = f'{target}.tmp-{uuid.uuid4().hex}'
+    os.makedirs(tmp)
+    try:
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f'{name}.npy'), arr)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        # 先删旧版本再换名；并发构建时后到者直接丢弃自己的临时目录
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _read_meta(abs_path: str) -> Optional[Dict[str, Any]]:
+    """读取 meta.json；不存在、版本不符或源文件已变化时返回 None。"""
+    meta_file = os.path.join(sidecar_path(abs_path), 'meta.json')
+    if not os.path.exists(meta_file):
+        return None
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if int(meta.get('version') or 0) != SIDECAR_VERSION:
+            return None
+        source = dict(meta.get('source') or {})
+        source.pop('sha256', None)
+        if source != _source_stat(abs_path):
+            return None
+        return meta
+    except Exception:
+        return None
+
+
+def load_sidecar(abs_path: str) -> Optional[GraphSidecar]:
+    """读取 sidecar；不存在、已过期或文件格式不支持时返回 None。"""
+    meta = _read_meta(abs_path)
+    if meta is None or meta.get('format') == FORMAT_UNSUPPORTED:
+        return None
+    try:
+        return GraphSidecar(sidecar_path(abs_path), meta)
+    except Exception:
+        return None
+
+
+def ensure_sidecar(abs_path: str) -> Optional[GraphSidecar]:
+    """读取 sidecar，缺失/过期时现场生成（兼容 sidecar 功能上线前的历史上传）。"""
+    meta = _read_meta(abs_path)
+    if meta is not None:
+        return load_sidecar(abs_path)
+    try:
+        if build_sidecar(abs_path) is None:
+            return None
+    except Exception:
+        return None
+    return load_sidecar(abs_path)
+
+
+def remove_sidecar(abs_path: str) -> None:
+    shutil.rmtree(sidecar_path(abs_path), ignore_errors=True)
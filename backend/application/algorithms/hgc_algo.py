@@ -26,7 +26,9 @@ def run(abs_path: str, params: Dict[str, Any], progress_cb: ProgressCallback, is
     # 并返回 {node_id: node_value}
     from application.algorithms.my_algo_module import  hgc # 导入你的算法模块
     # 或者，如果你的算法代码直接写在这个文件里，直接调用函数
-    result_dict = hgc.cal_hgc(G)
+    from application.algorithms.feature_store import open_store
+    store = open_store(abs_path)
+    result_dict = hgc.cal_hgc(G, core_number=store.as_dict('core_number') if store is not None else None)
 
     # 5. 检查取消和进度
     if is_cancelled():
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import os
+import threading
+from typing import Any, Dict, Optional
 
-from .registry import IsCancelled, ProgressCallback
+from .registry import AlgorithmResult, IsCancelled, ProgressCallback
 
 
 def run(
@@ -17,9 +19,9 @@ def run(
     if is_cancelled():
         return {}
 
-    from application.algorithms.utils import load_multilayer_graph
+    from application.algorithms.utils import load_multilayer_csr_graph
 
-    Gs = load_multilayer_graph(abs_path)
+    Gs = load_multilayer_csr_graph(abs_path)
 
     if is_cancelled():
         return {}
@@ -30,13 +32,44 @@ def run(
     if is_cancelled():
         return {}
 
-    from application.algorithms.my_algo_module.MGNN_AL import mgnn_al
-    from application.algorithms.my_algo_module.MGNN_AL.Model import CombinedModel
-
-    
-    result_dict = mgnn_al.MGNN_AL(Gs)
-
-    if is_cancelled():
+    from application.algorithms.my_algo_module.MGNN_AL import layer_features, mgnn_al
+    from application.algorithms import parallel
+    from application.algorithms.feature_store import open_store
+
+    # backend: eager（默认）| quantized（Linear 动态 int8 量化）| compiled（torch.compile）；
+    # 未指定时取环境变量 MGNN_BACKEND。validate=true 时额外用 eager 校验本次输出
+    backend = str(params.get('backend') or os.getenv('MGNN_BACKEND') or 'eager').strip().lower()
+    if backend not in mgnn_al.BACKENDS:
+        raise ValueError(f'不支持的 backend: {backend}（可选 {", ".join(mgnn_al.BACKENDS)}）')
+    validate = str(params.get('validate') or '').strip().lower() in ('1', 'true', 'yes')
+
+    # batch_size > 0：逐层 mini-batch 推理（全邻居 block），峰值内存与批大小而非全图边数成正比
+    batch_size = int(params.get('batch_size') or 0)
+    if batch_size < 0:
+        raise ValueError('batch_size 必须为正整数')
+
+    # 各层特征提取的进程数：未指定时只有各层节点数合计足够大才启用进程池
+    if params.get('workers') in (None, ''):
+        total_nodes = sum(G.number_of_nodes() for G in Gs)
+        workers = parallel.default_workers() if total_nodes >= layer_features.PARALLEL_MIN_NODES else 1
+    else:
+        workers = parallel.resolve_workers(params.get('workers'))
+
+    def on_progress(done: int, total: int):
+        progress_cb(30 + int(60 * done / max(total, 1)), 'computing', f'MGNN_AL 推理批次 {done}/{total}')
+
+    result_dict, meta = mgnn_al.MGNN_AL_csr(
+        Gs,
+        store=open_store(abs_path),
+        backend=backend,
+        validate=validate,
+        batch_size=batch_size or None,
+        progress=on_progress,
+        is_cancelled=is_cancelled,
+        workers=workers,
+    )
+
+    if result_dict is None or is_cancelled():
         return {}
 
     progress_cb(90, 'finalizing', '推理完成，正在格式化结果...')
@@ -46,5 +79,27 @@ def run(
         formatted_result[str(node_id)] = float(value)
 
     progress_cb(100, 'done', '计算完成')
-    return formatted_result
-
+    return AlgorithmResult(formatted_result, meta=meta)
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """后台预热 MGNN_AL：导入 torch/dgl、加载权重并跑一次小图前向。
+
+    - 通过环境变量 MGNN_WARMUP=true 启用（默认关闭，未安装 torch/dgl 的部署不受影响）
+    - 在 app 启动或独立 worker 启动时调用；失败只记日志，首个任务会再按需加载
+    """
+    enabled = (os.getenv('MGNN_WARMUP', '') or '').lower() in ('1', 'true', 'yes')
+    if not enabled:
+        return None
+
+    def _warmup():
+        try:
+            from application.algorithms.my_algo_module.MGNN_AL import layer_features, mgnn_al
+            mgnn_al.warmup()
+        except Exception:
+            import logging
+            logging.getLogger(__name__).exception('MGNN_AL warmup failed')
+
+    th = threading.Thread(target=_warmup, name='mgnn_warmup', daemon=True)
+    th.start()
+    return th
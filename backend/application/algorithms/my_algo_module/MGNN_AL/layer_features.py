@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+MGNN_AL 各层输入特征的 numpy 实现（不依赖 torch / dgl）。
+
+_prepare_layers 的进程池块函数放在这里：spawn 出来的子进程只导入本模块，
+不必为提特征付出导入 torch + dgl 的开销。
+"""
+
+import numpy as np
+
+
+# 未显式指定 workers 时，各层节点数合计达到该值才启用进程池（小图上进程启动开销大于收益）
+PARALLEL_MIN_NODES = 20000
+
+STRUCTURAL_FEATURES = ('clustering', 'eigenvector', 'core_number')
+
+
+def structural_features(indptr, indices):
+    """聚类系数/特征向量中心性/核数，与 networkx 口径一致（见 feature_store）。"""
+    from application.algorithms import feature_store
+
+    return {
+        'clustering': feature_store.clustering(np.diff(indptr), feature_store.triangles(indptr, indices)),
+        'eigenvector': feature_store.eigenvector(indptr, indices),
+        'core_number': feature_store.core_number(indptr, indices),
+    }
+
+
+def input_feature_matrix(indptr, indices, features=None):
+    """由 0..N-1 编号的 CSR 邻接一次性生成 [N, 5] float32 节点特征（numpy）。
+
+    列依次为：度、邻居平均度、邻居平均聚类系数、特征向量中心性、核数，每列再除以列最大值。
+    邻居平均量用稀疏矩阵乘法 A·x / deg 计算；features 给出时直接使用其中缓存的结构特征。
+    """
+    import scipy.sparse as sp
+
+    n = len(indptr) - 1
+    deg = np.diff(indptr).astype(np.float64)
+    if features is None:
+        features = structural_features(indptr, indices)
+
+    A = sp.csr_matrix((np.ones(len(indices), dtype=np.float64), indices, indptr), shape=(n, n))
+    has_nei = deg > 0
+    nei_deg = np.zeros(n, dtype=np.float64)
+    nei_clu = np.zeros(n, dtype=np.float64)
+    nei_deg[has_nei] = (A @ deg)[has_nei] / deg[has_nei]
+    nei_clu[has_nei] = (A @ np.asarray(features['clustering'], dtype=np.float64))[has_nei] / deg[has_nei]
+
+    cols = [
+        deg,
+        nei_deg,
+        nei_clu,
+        np.asarray(features['eigenvector'], dtype=np.float64),
+        np.asarray(features['core_number'], dtype=np.float64),
+    ]
+    input_features = np.stack(cols, axis=1).astype(np.float32)
+    max_val = input_features.max(axis=0) if n else np.zeros(5, dtype=np.float32)
+    scale = np.where(max_val > 0, max_val, np.float32(1.0))
+    return input_features / scale
+
+
+def prepare_layers_chunk(shared, layer_idxs, cancelled):
+    """进程池块函数：为一批层生成输入特征。
+
+    shared 中每层有 L<i>.indptr / L<i>.indices；特征库已缓存的结构特征以 L<i>.<特征名> 给出，
+    缺失时现场计算并随结果返回，由主进程写回特征库。
+    返回 [(层号, 输入特征矩阵, 新算出的结构特征或 None)]。
+    """
+    out = []
+    for i in layer_idxs:
+        if cancelled():
+            return None
+        indptr = np.asarray(shared[f'L{i}.indptr'])
+        indices = np.asarray(shared[f'L{i}.indices'])
+        computed = None
+        if all(f'L{i}.{name}' in shared for name in STRUCTURAL_FEATURES):
+            features = {name: shared[f'L{i}.{name}'] for name in STRUCTURAL_FEATURES}
+        else:
+            features = computed = structural_features(indptr, indices)
+        out.append((i, input_feature_matrix(indptr, indices, features=features), computed))
+    return out
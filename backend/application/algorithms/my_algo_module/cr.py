@@ -1,13 +1,145 @@
 import networkx as nx
+import numpy as np
 
-from typing import Dict, Set, Tuple, List
+from application.algorithms import parallel
+from application.algorithms.csr_graph import CSRGraph
 
-def compute_cycle_ratio(G: nx.Graph) -> Dict[int, float]:
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+
+def _enumerate_triangles(G: nx.Graph) -> Iterator[Tuple]:
+    """按度数定向的 compact-forward 三角形枚举，O(m^1.5)。
+
+    每条边从 (度数, 排名) 较小的端点指向较大的端点，三角形 (u, v, w) 只会在
+    u 的出邻居 v 与 w 相邻时被找到一次；输出为升序元组（与原三重循环的 curCyc 一致）。
+    """
+    order = sorted(G.nodes(), key=lambda x: (G.degree(x), x))
+    rank = {node: i for i, node in enumerate(order)}
+    out: Dict = {node: set() for node in order}
+    for u, v in G.edges():
+        if u == v:
+            continue
+        if rank[u] < rank[v]:
+            out[u].add(v)
+        else:
+            out[v].add(u)
+
+    for u in order:
+        out_u = out[u]
+        for v in out_u:
+            for w in out_u & out[v]:
+                yield tuple(sorted((u, v, w)))
+
+
+def _shortest_paths_avoiding_edge(indptr, indices, u: int, v: int, max_len: int = 0) -> List[List[int]]:
+    """u、v 之间不经过边 (u, v) 的全部最短路（节点下标列表，u 在前）。
+
+    双向 BFS：两侧按整层交替扩展（每次扩展较小的一侧），出现公共节点即停。
+    此时每条最短路上“距 u 为 min(ru, L)”的那个节点一定被两侧都访问过，
+    以它为分界点拼接 u 侧与 v 侧的最短路 DAG，每条路径恰好生成一次。
+    max_len > 0 时只搜索边数不超过 max_len 的路径。不修改图。
+    """
+    def blocked(a, b):
+        return (a == u and b == v) or (a == v and b == u)
+
+    du = {u: 0}
+    dv = {v: 0}
+    fu, fv = [u], [v]
+    ru = rv = 0
+    common = []
+    while fu and fv:
+        if max_len and ru + rv >= max_len:
+            return []
+        if len(fu) <= len(fv):
+            dist, other, frontier, depth = du, dv, fu, ru + 1
+        else:
+            dist, other, frontier, depth = dv, du, fv, rv + 1
+        nxt = []
+        for a in frontier:
+            for b in indices[indptr[a]:indptr[a + 1]]:
+                if b in dist or blocked(a, b):
+                    continue
+                dist[b] = depth
+                nxt.append(b)
+                if b in other:
+                    common.append(b)
+        if dist is du:
+            fu, ru = nxt, depth
+        else:
+            fv, rv = nxt, depth
+        if common:
+            break
+    if not common:
+        return []
+
+    L = min(du[x] + dv[x] for x in common)
+    if max_len and L > max_len:
+        return []
+    split = min(ru, L)
+    mids = [x for x in du if du[x] == split and x in dv and du[x] + dv[x] == L]
+
+    def walk(dist, start):
+        # 从 start 沿 dist 递减回溯到距离 0 的根，返回 [start, ..., root] 的全部路径
+        paths = []
+        stack = [(start, [start])]
+        while stack:
+            node, path = stack.pop()
+            d = dist[node]
+            if d == 0:
+                paths.append(path)
+                continue
+            for p in indices[indptr[node]:indptr[node + 1]]:
+                if dist.get(p) == d - 1 and not blocked(node, p):
+                    stack.append((p, path + [p]))
+        return paths
+
+    out = []
+    for x in mids:
+        left = walk(du, x)      # x -> u
+        right = walk(dv, x)     # x -> v
+        for lp in left:
+            head = lp[::-1]     # u -> x
+            for rp in right:
+                out.append(head + rp[1:])
+    return out
+
+
+def _cycles_chunk(shared, edges, cancelled) -> List[Tuple[int, int, List[Tuple[int, ...]]]]:
+    """进程池块函数：对一批边求经过该边的全部最短环，返回 [(u, v, [升序下标元组, ...]), ...]。"""
+    if 'indptr_list' not in shared:
+        shared['indptr_list'] = shared['indptr'].tolist()
+        shared['indices_list'] = shared['indices'].tolist()
+    indptr = shared['indptr_list']
+    indices = shared['indices_list']
+    out = []
+    for i, (u, v) in enumerate(edges):
+        if i % 64 == 0 and cancelled():
+            return None
+        paths = _shortest_paths_avoiding_edge(indptr, indices, int(u), int(v))
+        out.append((int(u), int(v), [tuple(sorted(path)) for path in paths]))
+    return out
+
+
+# 进程池一次预取的边数（每个 worker）
+_PREFETCH_PER_WORKER = 256
+
+
+def compute_cycle_ratio(
+    G: nx.Graph,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+    workers: int = 1,
+    core_number: Optional[Dict[int, int]] = None,
+) -> Dict[int, float]:
     """
     计算网络中每个节点的CycleRatio（循环比率）
     
     参数:
         G: networkx.Graph 图对象
+        is_cancelled: 可选，返回 True 时中止并返回空字典
+        progress_cb: 可选，(第二步已处理节点数, 总数)
+        workers: 第二步（≥4 环）预取最短环使用的进程数，1 表示在当前进程内执行
+        core_number: 可选，预先算好的核数（来自 feature_store），缺省时现场计算
         
     返回:
         {节点ID: CycleRatio值} 字典，值越大表示节点的环结构越重要
@@ -28,42 +160,16 @@ def compute_cycle_ratio(G: nx.Graph) -> Dict[int, float]:
     SmallestCyclesOfNodes: Dict[int, Set[Tuple]] = {}
     
     # ---------- 2. 辅助函数 ----------
-    def my_all_shortest_paths(G, source, target):
-        """获取两点间所有最短路径"""
-        pred = nx.predecessor(G, source)
-        if target not in pred:
-            raise nx.NetworkXNoPath(f"Target {target} cannot be reached")
-        sources = {source}
-        seen = {target}
-        stack = [[target, 0]]
-        top = 0
-        while top >= 0:
-            node, i = stack[top]
-            if node in sources:
-                yield [p for p, n in reversed(stack[:top + 1])]
-            if len(pred[node]) > i:
-                stack[top][1] = i + 1
-                next_node = pred[node][i]
-                if next_node in seen:
-                    continue
-                seen.add(next_node)
-                top += 1
-                if top == len(stack):
-                    stack.append([next_node, 0])
-                else:
-                    stack[top][:] = [next_node, 0]
-            else:
-                seen.discard(node)
-                top -= 1
+    # 三角形枚举与“绕开某条边的最短路”见模块级 _enumerate_triangles / _shortest_paths_avoiding_edge
     
     # ---------- 3. 核心算法：获取最小环 ----------
-    Coreness = nx.core_number(Mygraph)
+    Coreness = core_number if core_number is not None else nx.core_number(Mygraph)
     removeNodes = set()
     
     for i in Mygraph.nodes():
         SmallestCyclesOfNodes[i] = set()
         CycleRatio[i] = 0
-        if Mygraph.degree(i) <= 1 or Coreness[i] <= 1:
+        if Mygraph.degree(i) <= 1 or Coreness.get(i, 0) <= 1:
             NodeGirth[i] = 0
             removeNodes.add(i)
         else:
@@ -76,65 +182,131 @@ def compute_cycle_ratio(G: nx.Graph) -> Dict[int, float]:
     for i in range(3, Mygraph.number_of_nodes() + 2):
         CycLenDict[i] = 0
     
-    # 第一步：查找3环（三角形）
+    # 第一步：查找3环（三角形），按原三重循环的字典序加入
     NodeList = list(Mygraph.nodes())
     NodeList.sort()
-    
-    curCyc = []
-    for ix in NodeList[:-2]:  # v1
-        if NodeGirth[ix] == 0:
-            continue
-        curCyc.append(ix)
-        for jx in NodeList[NodeList.index(ix) + 1: -1]:  # v2
-            if NodeGirth[jx] == 0:
-                continue
-            curCyc.append(jx)
-            if Mygraph.has_edge(ix, jx):
-                for kx in NodeList[NodeList.index(jx) + 1:]:  # v3
-                    if NodeGirth[kx] == 0:
-                        continue
-                    if Mygraph.has_edge(kx, ix):
-                        curCyc.append(kx)
-                        if Mygraph.has_edge(kx, jx):
-                            SmallestCycles.add(tuple(curCyc))
-                            for node in curCyc:
-                                NodeGirth[node] = 3
-                        curCyc.pop()
-            curCyc.pop()
-        curCyc.pop()
+
+    for tri in sorted(_enumerate_triangles(Mygraph)):
+        SmallestCycles.add(tri)
+        for node in tri:
+            NodeGirth[node] = 3
     
     # 第二步：查找更大环（≥4）
+    # 哪些边要搜索、按什么顺序搜索与原实现逐条一致（结果逐位相同）：
+    # - visitedNodes 由 dict.fromkeys(ResiNodeList, set()) 构建，所有键共用同一个集合 visited；
+    # - 核数为 2 且已有环长的节点跳过，这取决于此前已处理的边；
+    # - 原实现处理一条边时先 remove_edge 再 add_edge，两端会互相移到对方邻接表末尾，影响之后的邻居顺序。
+    # 经过某条边的最短环只与图有关（搜索不修改图），所以用进程池按回放顺序预取，主进程按顺序合并。
     ResiNodeList = [nod for nod in NodeList if NodeGirth[nod] == DEF_IMPOSSLEN]
     
     if ResiNodeList:
-        visitedNodes = dict.fromkeys(ResiNodeList, set())
-        for nod in ResiNodeList:
-            if Coreness[nod] == 2 and NodeGirth[nod] < DEF_IMPOSSLEN:
-                continue
-            for nei in list(Mygraph.neighbors(nod)):
-                if Coreness[nei] == 2 and NodeGirth[nei] < DEF_IMPOSSLEN:
-                    continue
-                if nei not in visitedNodes or nod not in visitedNodes[nei]:
-                    visitedNodes[nod].add(nei)
-                    if nei not in visitedNodes:
-                        visitedNodes[nei] = {nod}
-                    else:
-                        visitedNodes[nei].add(nod)
-                    
-                    if Coreness[nei] == 2 and NodeGirth[nei] < DEF_IMPOSSLEN:
+        index = {nod: i for i, nod in enumerate(NodeList)}
+        pairs = np.array([(index[a], index[b]) for a, b in Mygraph.edges() if a != b], dtype=np.int64).reshape(-1, 2)
+        csr = CSRGraph.from_index_edges(pairs[:, 0], pairs[:, 1], len(NodeList))
+        shared = {'indptr': csr.indptr, 'indices': csr.indices}
+
+        resi = set(ResiNodeList)
+        adj = {nod: dict.fromkeys(Mygraph.neighbors(nod)) for nod in ResiNodeList}
+        visited: Set = set()
+        found: Dict[Tuple, List[Tuple]] = {}
+        cancelled = is_cancelled or (lambda: False)
+        total = len(ResiNodeList)
+
+        def skipped(x) -> bool:
+            return Coreness.get(x, 0) == 2 and NodeGirth[x] < DEF_IMPOSSLEN
+
+        def walk(q, nbrs, i, seen, adj_of, visit):
+            """从第 q 个节点的第 i 个邻居起按原实现的顺序判定要处理的边，依次调用 visit(nod, nei, q, nbrs, i)。
+
+            nbrs 为第 q 个节点开始处理时的邻居快照（None 表示还没开始）；visit 返回 False 时停止。
+            """
+            while q < total:
+                nod = ResiNodeList[q]
+                if nbrs is None:
+                    if skipped(nod):
+                        q += 1
                         continue
-                    
-                    # 临时移除边以查找环
-                    Mygraph.remove_edge(nod, nei)
-                    if nx.has_path(Mygraph, nod, nei):
-                        for path in my_all_shortest_paths(Mygraph, nod, nei):
-                            lenPath = len(path)
-                            path.sort()
-                            SmallestCycles.add(tuple(path))
-                            for node in path:
-                                if NodeGirth[node] > lenPath:
-                                    NodeGirth[node] = lenPath
-                    Mygraph.add_edge(nod, nei)
+                    nbrs, i = list(adj_of(nod)), 0
+                while i < len(nbrs):
+                    nei = nbrs[i]
+                    i += 1
+                    if skipped(nei):
+                        continue
+                    if nei in resi:
+                        if nod in seen:
+                            continue
+                        seen.add(nod)
+                    seen.add(nei)
+                    for a, b in ((nod, nei), (nei, nod)):
+                        d = adj_of(a)
+                        if d is not None:
+                            del d[b]
+                            d[b] = None
+                    if visit(nod, nei, q, nbrs, i) is False:
+                        return
+                nbrs = None
+                q += 1
+
+        workers = max(1, int(workers or 1))
+        if csr.number_of_edges() < 20000:
+            # 边太少时进程池的启动开销大于收益
+            workers = 1
+
+        with parallel.ChunkPool(shared, workers) as pool:
+
+            def prefetch(nod, nei, q, nbrs, i) -> bool:
+                """按当前状态模拟后续回放（不考虑之后环长的变化），批量计算接下来要处理的边。"""
+                batch = [(index[nod], index[nei])]
+                if workers > 1:
+                    limit = workers * _PREFETCH_PER_WORKER
+                    overlay: Dict = {}
+
+                    def adj_of(a):
+                        if a not in overlay:
+                            overlay[a] = dict(adj[a]) if a in adj else None
+                        return overlay[a]
+
+                    def collect(a, b, *_):
+                        if (a, b) not in found:
+                            batch.append((index[a], index[b]))
+                        return len(batch) < limit
+
+                    walk(q, list(nbrs), i, set(visited), adj_of, collect)
+
+                def merge(acc, part):
+                    for u, v, cycles in part or ():
+                        acc[(NodeList[u], NodeList[v])] = [tuple(NodeList[x] for x in cyc) for cyc in cycles]
+                    return acc
+
+                chunks = parallel.split_chunks(batch, parallel.auto_chunk_size(len(batch), workers))
+                return pool.map_reduce(_cycles_chunk, chunks, merge, found, is_cancelled=cancelled) is not None
+
+            state = {'aborted': False, 'reported': -1}
+
+            def process(nod, nei, q, nbrs, i) -> bool:
+                if (nod, nei) not in found and not prefetch(nod, nei, q, nbrs, i):
+                    state['aborted'] = True
+                    return False
+                for path in found.pop((nod, nei)):
+                    lenPath = len(path)
+                    SmallestCycles.add(path)
+                    for node in path:
+                        if NodeGirth[node] > lenPath:
+                            NodeGirth[node] = lenPath
+                if q != state['reported']:
+                    state['reported'] = q
+                    if cancelled():
+                        state['aborted'] = True
+                        return False
+                    if progress_cb is not None:
+                        progress_cb(q, total)
+                return True
+
+            walk(0, None, 0, visited, adj.get, process)
+        if state['aborted']:
+            return {}
+        if progress_cb is not None:
+            progress_cb(total, total)
     
     # ---------- 4. 计算CycleRatio ----------
     NumSmallCycles = len(SmallestCycles)
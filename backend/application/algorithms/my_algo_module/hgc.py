@@ -8,160 +8,206 @@ import random
 import math
 import statistics
 import pandas as pd
+import scipy.sparse as sp
 
+from application.algorithms.csr_graph import CSRGraph
 from application.algorithms.my_algo_module import cr
 
 from typing import Any, Dict
 
 
 
-def cal_hgc(G: nx.Graph) -> Dict[int, float]:
+class TwoHopIndex:
+    """1 跳/2 跳邻域的紧凑索引，ED、DK、LCGM 各阶段共用，只构建一次。
+
+    节点按 G.nodes() 的顺序编号为 0..n-1：
+    - deg：G.degree()（自环计 2）
+    - indptr/indices：1 跳邻居（去掉自环、升序）
+    - hop2_indptr/hop2_indices：恰好距离为 2 的节点（升序）
+    - hop2_mid：对应的中间节点，取度数最小的公共邻居（与原 middle_node 一致）
+    - self_loop：是否带自环（RCP 的邻居求和会把自身算进去）
+    """
+
+    # 每块展开的 (i, k, j) 两跳路径数上限
+    WEDGE_BUDGET = 4_000_000
+
+    def __init__(self, G: nx.Graph):
+        self.nodes = list(G.nodes())
+        n = len(self.nodes)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        self.deg = np.array([G.degree(node) for node in self.nodes], dtype=np.int64)
+
+        pairs = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+        self.self_loop = np.zeros(n, dtype=bool)
+        self.self_loop[pairs[pairs[:, 0] == pairs[:, 1], 0]] = True
+        csr = CSRGraph.from_index_edges(pairs[:, 0], pairs[:, 1], n)
+        self.indptr = csr.indptr
+        self.indices = csr.indices.astype(np.int64)
+        self.n = n
+        self._build_hop2()
+
+    def _build_hop2(self) -> None:
+        n, indptr, indices = self.n, self.indptr, self.indices
+        deg1 = np.diff(indptr)
+        rows = np.repeat(np.arange(n, dtype=np.int64), deg1)
+        wedges = np.bincount(rows, weights=deg1[indices], minlength=n).astype(np.int64)
+        csum = np.cumsum(wedges)
+
+        counts = np.zeros(n, dtype=np.int64)
+        hop2, mids = [], []
+        start = 0
+        while start < n:
+            base = int(csum[start - 1]) if start else 0
+            stop = max(int(np.searchsorted(csum, base + self.WEDGE_BUDGET, side='right')), start + 1)
+            stop = min(stop, n)
+
+            # 展开块内所有 i-k-j 路径
+            e0, e1 = indptr[start], indptr[stop]
+            i_of_edge = np.repeat(np.arange(start, stop, dtype=np.int64), deg1[start:stop])
+            k = indices[e0:e1]
+            dk = deg1[k]
+            total = int(dk.sum())
+            if total:
+                i_arr = np.repeat(i_of_edge, dk)
+                k_arr = np.repeat(k, dk)
+                ends = np.cumsum(dk)
+                pos = np.repeat(indptr[k] - (ends - dk), dk) + np.arange(total, dtype=np.int64)
+                j_arr = indices[pos]
+
+                key = i_arr * n + j_arr
+                one_hop = i_of_edge * n + k      # 块内 1 跳键，已升序
+                loc = np.searchsorted(one_hop, key)
+                is_one_hop = (loc < len(one_hop)) & (one_hop[loc.clip(max=len(one_hop) - 1)] == key)
+                keep = (j_arr != i_arr) & ~is_one_hop
+                key, k_arr = key[keep], k_arr[keep]
+
+                # 同一 (i, j) 取度数最小的中间节点
+                order = np.lexsort((k_arr, self.deg[k_arr], key))
+                key, k_arr = key[order], k_arr[order]
+                first = np.concatenate(([True], key[1:] != key[:-1])) if len(key) else np.zeros(0, dtype=bool)
+                key, k_arr = key[first], k_arr[first]
+                counts[start:stop] = np.bincount(key // n - start, minlength=stop - start)
+                hop2.append(key % n)
+                mids.append(k_arr)
+            start = stop
+
+        self.hop2_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.hop2_indptr[1:])
+        self.hop2_indices = np.concatenate(hop2) if hop2 else np.zeros(0, dtype=np.int64)
+        self.hop2_mid = np.concatenate(mids) if mids else np.zeros(0, dtype=np.int64)
+
+    def adjacency(self, with_self_loops: bool = False) -> sp.csr_matrix:
+        data = np.ones(len(self.indices), dtype=np.float64)
+        A = sp.csr_matrix((data, self.indices, self.indptr), shape=(self.n, self.n))
+        if with_self_loops and self.self_loop.any():
+            A = sp.csr_matrix(A + sp.diags(self.self_loop.astype(np.float64)))
+        return A
+
+
+def _log_term(d: int) -> float:
+    return 1 - math.log(1 / d, 10)
+
+
+def cal_hgc(G: nx.Graph, core_number: Dict[int, int] = None) -> Dict[int, float]:
     """
     HGC主算法封装函数
-    保持原有代码逻辑不变，将所有计算步骤封装，返回最终的hgc分数字典
+    各阶段共用同一个 TwoHopIndex，LCGM/RCP 为向量化实现，返回最终的hgc分数字典
+    core_number 可选，传给 CR 阶段做剪枝（来自 feature_store，缺省时现场计算）
     """
-    # ============ 原代码中的依赖函数定义（这里直接使用，保持原样）============
-    def each_order_neighbor(G, node, n):
-        neighbors = []
-        for i in range(1, n + 1):
-            neighbors.append(find_n_order_neighbor(G, node, i))
-            if i != 1:
-                neighbors[i - 1] -= neighbors[i - 2]
-        return neighbors
-
-    def find_n_order_neighbor(G, node, n):
-        source_node = node
-        all_order_edges = nx.bfs_edges(G, source_node, depth_limit=n)
-        all_order_neighbors = {source_node} | set(v for u, v in all_order_edges)
-        all_order_neighbors.discard(node)
-        return all_order_neighbors
-
-    def middle_node(G, node1, node2):
-        start_neighbors = list(G.neighbors(node1))
-        end_neighbors = list(G.neighbors(node2))
-        middle_nodes = list(set(start_neighbors) & set(end_neighbors))
-        if len(middle_nodes) == 1:
-            return middle_nodes[0]
-        else:
-            degrees = {node: G.degree(node) for node in middle_nodes}
-            min_degree_node = min(degrees, key=degrees.get)
-            return min_degree_node
-
-    def ED(G):
-        ED_dict = {}
-        for node in G.nodes():
-            all_neighbors = each_order_neighbor(G, node, 2)
-            ed1 = {}
-            for nei1 in all_neighbors[0]:
-                D = 1 - math.log(1 / G.degree(node), 10)
-                ed1[nei1] = round(D, 4)
-            ED_dict[node] = ed1
-
-        for node in G.nodes():
-            all_neighbors = each_order_neighbor(G, node, 2)
-            ed2 = {}
-            for nei2 in all_neighbors[1]:
-                middle_nodes = middle_node(G, node, nei2)
-                D = ED_dict[node][middle_nodes] + 1 - math.log(1 / G.degree(middle_nodes), 10)
-                ed2[nei2] = round(D, 4)
-            ED_dict[node].update(ed2)
-        return ED_dict
-
     def SH(G):
+        # 稀疏实现：P 为按行归一化的邻接矩阵（P[i][j] = 1/deg(i)），
+        # c_i = Σ_{j∈N(i)} ((P·P)[i][j] + P[i][j])^2，P·P 只在已有边上取值。
+        # 按行分块计算 P[R]·P，内存 O(m)；求和顺序与原逐元素实现一致，结果逐位相同。
         num = nx.number_of_nodes(G)
-        A = np.array(nx.adjacency_matrix(G, nodelist=range(0, num)).todense())
-        A = A / A.sum(axis=0).reshape(-1, 1)
-        C = []
-        count = 0
-        for i in range(A.shape[0]):
-            n_idx = np.where(A[i] > 0)[0]
-            c_i = 0
-            for j in n_idx:
-                com_n_idx = np.where(np.logical_and(A[i] > 0, A[j] > 0))[0]
-                tmp = sum([A[i][k] * A[k][j] for k in com_n_idx]) + A[i][j]
-                c_i += tmp * tmp
-            C.append((count, round(c_i, 4)))
-            count += 1
-        return {key: value for key, value in C}
-
-    # ============ 计算流程（复制原代码逻辑，但移除所有print）============
-    
+        A = sp.csr_matrix(nx.adjacency_matrix(G, nodelist=range(0, num)), dtype=np.float64)
+        A.sum_duplicates()
+        A.sort_indices()
+        col_sum = np.asarray(A.sum(axis=0)).ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            P = sp.diags(1.0 / col_sum) @ A
+        P = sp.csr_matrix(P)
+        P.eliminate_zeros()
+        P.sort_indices()
+
+        C = np.zeros(num, dtype=np.float64)
+        # 按两跳非零元数量切块，每块约 4M 个非零元
+        two_hop = np.asarray(P.astype(bool).astype(np.int64) @ np.diff(P.indptr)).ravel()
+        csum = np.cumsum(two_hop)
+        start = 0
+        while start < num:
+            base = int(csum[start - 1]) if start else 0
+            stop = max(int(np.searchsorted(csum, base + 4_000_000, side='right')), start + 1)
+            PR = P[start:stop]
+            mask = PR.copy()
+            mask.data = np.ones_like(mask.data)
+            T = sp.csr_matrix((PR @ P).multiply(mask)) + PR
+            T.sort_indices()
+            sq = T.data * T.data
+            nz = np.flatnonzero(np.diff(T.indptr) > 0)
+            if len(nz):
+                C[start + nz] = np.add.reduceat(sq, T.indptr[nz])
+            start = stop
+        C = np.round(C, 4)
+        return {i: C[i] for i in range(num)}
+
+    # ============ 计算流程 ============
+
+    idx = TwoHopIndex(G)
+    n = idx.n
+    if n == 0:
+        return {}
+    deg = idx.deg
+    rows1 = np.repeat(np.arange(n, dtype=np.int64), np.diff(idx.indptr))
+    rows2 = np.repeat(np.arange(n, dtype=np.int64), np.diff(idx.hop2_indptr))
+
     # 1. 计算必要的中间指标
-    degrees = dict(G.degree())
-    ks = nx.core_number(G)
-    s_ks = dict(sorted(ks.items(), key=lambda x: x[1], reverse=True))
-    ED_dict = ED(G)
     sh = SH(G)
-    
+    e_sh = np.array([math.exp(-sh[node]) for node in idx.nodes], dtype=np.float64)
+
+    # ED：1 跳 ed1(i) = round(1 - log10(1/deg(i)), 4)；
+    # 2 跳 ed2(i, j) = round(ed1(i) + 1 - log10(1/deg(mid)), 4)，按 (deg(i), deg(mid)) 缓存
+    ed1 = np.zeros(n, dtype=np.float64)
+    has_nei = np.diff(idx.indptr) > 0
+    ed1_cache = {d: round(_log_term(d), 4) for d in np.unique(deg[has_nei]).tolist()}
+    ed1[has_nei] = [ed1_cache[d] for d in deg[has_nei].tolist()]
+
+    ed2 = np.zeros(len(idx.hop2_indices), dtype=np.float64)
+    if len(ed2):
+        pair = deg[rows2] * (int(deg.max()) + 1) + deg[idx.hop2_mid]
+        uniq, inv = np.unique(pair, return_inverse=True)
+        base = int(deg.max()) + 1
+        vals = [round(ed1_cache[int(p // base)] + 1 - math.log(1 / int(p % base), 10), 4) for p in uniq.tolist()]
+        ed2 = np.asarray(vals, dtype=np.float64)[inv]
+
     # 2. 计算CR
-    
-    cr_list = cr.compute_cycle_ratio(G)
-    
-    ks = nx.core_number(G)
-
-    s_ks = dict(sorted(ks.items(),key=lambda x:x[1],reverse=True))
-    # 3. 计算DK（原代码逻辑）
-    def bigger_ks_nodes(node, neighbors):
-        return [nei for nei in neighbors if s_ks[nei] > s_ks[node]]
-    
-    DK = {}
-    for node in G.nodes():
-        neighbors = find_n_order_neighbor(G, node, 2)
-        length1 = len(neighbors)
-        new_neighbors = bigger_ks_nodes(node, neighbors)
-        length2 = len(new_neighbors)
-        if length2 == 0:
-            length2 = 1
-        Y = length2 / length1
-        s = 0
-        for nei in neighbors:
-            s += degrees[nei]
-            
-        DK[node] = degrees[node]  # 注意：原代码中Y和s计算了但未使用
-    
-    # 4. 计算LCGM（原代码逻辑）
-    LCGM = {}
-    for node in G.nodes():
-        neighbors = each_order_neighbor(G, node, 2)
-        s = 0
-        d = 1
-        for nei in neighbors:
-            for n in nei:
-                if n in ED_dict[node]:
-                    s += DK[node] * DK[n] / (ED_dict[node][n] ** 2)
-            d += 1
-            s *= math.exp(-sh[node])
-        LCGM[node] = round(s, 4)
-    
-    average_lcgm = sum(LCGM.values()) / len(LCGM)
-    
-    # 5. 计算RCP（原代码逻辑）
-    I0 = {node: cr_list[node] for node in G.nodes()}
-    I1, I2, I3 = {}, {}, {}
-    
-    for node in G.nodes():
-        nei = list(G.neighbors(node))
-        I1[node] = sum(I0[n] for n in nei) / (1 ** 2) if nei else 0
-    
-    for node in G.nodes():
-        nei = list(G.neighbors(node))
-        I2[node] = sum(I1[n] for n in nei) / (2 ** 2) if nei else 0
-    
-    for node in G.nodes():
-        nei = list(G.neighbors(node))
-        I3[node] = sum(I2[n] for n in nei) / (3 ** 2) if nei else 0
-    
-    RCP = {}
-    for node in G.nodes():
-        RCP[node] = I1[node] + I2[node] + I3[node]
-        RCP[node] *= math.exp(-sh[node])
-    
-    average_rcp = sum(RCP.values()) / len(RCP)
-    
+    cr_list = cr.compute_cycle_ratio(G, core_number=core_number)
+
+    # 3. 计算DK（原代码中 Y 与 s 计算后未使用，DK 即度数）
+    DK = deg.astype(np.float64)
+
+    # 4. 计算LCGM：s = (S1·e + S2)·e，S1/S2 分别为 1 跳/2 跳邻居的 DK[i]·DK[j]/ED²
+    t1 = (deg[rows1] * deg[idx.indices]) / (ed1[rows1] ** 2) if len(rows1) else np.zeros(0)
+    t2 = (deg[rows2] * deg[idx.hop2_indices]) / (ed2 ** 2) if len(rows2) else np.zeros(0)
+    S1 = np.bincount(rows1, weights=t1, minlength=n)
+    S2 = np.bincount(rows2, weights=t2, minlength=n)
+    lcgm_raw = (S1 * e_sh + S2) * e_sh
+    LCGM = np.array([round(v, 4) for v in lcgm_raw.tolist()], dtype=np.float64)
+
+    average_lcgm = LCGM.sum() / n
+
+    # 5. 计算RCP：I1 = A·I0，I2 = A·I1 / 4，I3 = A·I2 / 9（A 含自环，与 G.neighbors 一致）
+    A = idx.adjacency(with_self_loops=True)
+    I0 = np.array([cr_list[node] for node in idx.nodes], dtype=np.float64)
+    I1 = A @ I0
+    I2 = (A @ I1) / (2 ** 2)
+    I3 = (A @ I2) / (3 ** 2)
+    RCP = (I1 + I2 + I3) * e_sh
+
+    average_rcp = RCP.sum() / n
+
     # 6. 计算最终HGC
     gama = average_lcgm / average_rcp
-    hgc_result = {}
-    for node in G.nodes():
-        hgc_result[node] = LCGM[node] + gama * RCP[node]
-    
+    hgc = LCGM + gama * RCP
+    hgc_result = {node: float(v) for node, v in zip(idx.nodes, hgc.tolist())}
+
     return dict(sorted(hgc_result.items(), key=lambda x: x[1], reverse=True))
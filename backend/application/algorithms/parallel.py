@@ -0,0 +1,196 @@
+"""算法内核的进程池分块执行工具。
+
+识别任务运行在请求派生的线程里，纯 Python 内核受 GIL 限制只能用到一个核。
+这里把“按源点/按边分块”的计算放到 ProcessPoolExecutor 中：
+- 只读的大数组（CSR 的 indptr/indices 等）先写入临时目录的 .npy，
+  worker 在 initializer 里以 mmap_mode='r' 打开，多个进程共享同一份页缓存；
+- 每个块完成后在主进程 reduce，并回调进度、检查取消；
+- 取消时置位共享 Event，worker 内核在源点之间检查并尽快返回。
+
+块函数签名：fn(shared: Dict[str, np.ndarray], chunk, cancelled: Callable[[], bool]) -> partial
+块函数必须是模块级函数（可 pickle）。workers<=1 或块数为 1 时直接在当前进程内执行。
+
+进程池用 spawn 启动：Web 进程/worker 是多线程的，fork 出的子进程可能继承被其他线程持有的锁
+（日志、DB 连接池、任务表锁）而死锁，与 task_process 的考虑相同。
+"""
+
+from __future__ import annotations
+
+import concurrent.futures as cf
+import multiprocessing
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ChunkFn = Callable[[Dict[str, np.ndarray], Any, Callable[[], bool]], Any]
+
+_worker_shared: Dict[str, np.ndarray] = {}
+_worker_cancel_event = None
+
+
+def default_workers() -> int:
+    """默认 worker 数：环境变量 ALGO_WORKERS，否则 可用 CPU 核数 // TASK_MAX_WORKERS。
+
+    同时运行的任务最多 TASK_MAX_WORKERS 个，每个任务只分到自己那一份核，避免多个任务的进程池
+    叠加后超额占用 CPU。
+    """
+    try:
+        v = int(os.getenv('ALGO_WORKERS') or 0)
+    except ValueError:
+        v = 0
+    if v <= 0:
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cores = os.cpu_count() or 1
+        try:
+            tasks = int(os.getenv('TASK_MAX_WORKERS') or 2)
+        except ValueError:
+            tasks = 2
+        v = cores // max(1, tasks)
+    return max(1, v)
+
+
+def resolve_workers(value: Any) -> int:
+    """把参数中的 workers 规整为正整数；缺省/非法时用 default_workers()。"""
+    try:
+        v = int(value)
+    except (TypeError, ValueError):
+        return default_workers()
+    return max(1, v)
+
+
+def split_chunks(items: Sequence[Any], chunk_size: int) -> List[Sequence[Any]]:
+    chunk_size = max(1, int(chunk_size))
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def auto_chunk_size(total: int, workers: int, per_worker: int = 8, min_size: int = 1) -> int:
+    """每个 worker 大约分到 per_worker 个块，保证进度/取消的粒度。"""
+    return max(min_size, -(-int(total) // max(1, workers * per_worker)))
+
+
+def _init_worker(shared_dir: str, names: List[str], cancel_event) -> None:
+    global _worker_shared, _worker_cancel_event
+    _worker_shared = {name: np.load(os.path.join(shared_dir, f'{name}.npy'), mmap_mode='r') for name in names}
+    _worker_cancel_event = cancel_event
+
+
+def _worker_cancelled() -> bool:
+    return bool(_worker_cancel_event is not None and _worker_cancel_event.is_set())
+
+
+def _call_in_worker(fn: ChunkFn, chunk: Any) -> Any:
+    return fn(_worker_shared, chunk, _worker_cancelled)
+
+
+class ChunkPool:
+    """可复用的进程池：共享数组只写一次，之后可以多次 map_reduce。
+
+    调用方：cr.compute_cycle_ratio 第二步在同一个池上分批预取最短环，由主进程按原顺序回放；
+    map_reduce_chunks 每次调用用它执行一轮。workers<=1 时不启动进程池，所有块在当前进程内执行。
+    """
+
+    def __init__(self, shared: Dict[str, np.ndarray], workers: int = 1):
+        self.shared = shared
+        self.workers = max(1, int(workers or 1))
+        self._dir: Optional[str] = None
+        self._ex: Optional[cf.ProcessPoolExecutor] = None
+        self._cancel_event = None
+
+    def __enter__(self) -> 'ChunkPool':
+        if self.workers > 1:
+            self._dir = tempfile.mkdtemp(prefix='algo-shared-')
+            try:
+                for name, arr in self.shared.items():
+                    np.save(os.path.join(self._dir, f'{name}.npy'), np.ascontiguousarray(arr))
+                ctx = multiprocessing.get_context('spawn')
+                self._cancel_event = ctx.Event()
+                self._ex = cf.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(self._dir, list(self.shared.keys()), self._cancel_event),
+                )
+            except Exception:
+                self.__exit__(None, None, None)
+                raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._ex is not None:
+            self._ex.shutdown(wait=True, cancel_futures=True)
+            self._ex = None
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def map_reduce(
+        self,
+        fn: ChunkFn,
+        chunks: Sequence[Any],
+        reduce: Callable[[Any, Any], Any],
+        initial: Any,
+        progress: Optional[Callable[[int, int], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        poll_interval: float = 0.2,
+    ) -> Optional[Any]:
+        """对 chunks 逐块执行 fn 并用 reduce 聚合；取消时返回 None。
+
+        reduce(acc, partial) -> acc，在主进程按完成顺序调用，因此只需满足交换律。
+        """
+        total = len(chunks)
+        cancelled = is_cancelled or (lambda: False)
+        acc = initial
+
+        if self._ex is None or total <= 1:
+            for i, chunk in enumerate(chunks):
+                if cancelled():
+                    return None
+                partial = fn(self.shared, chunk, cancelled)
+                if cancelled():
+                    return None
+                acc = reduce(acc, partial)
+                if progress is not None:
+                    progress(i + 1, total)
+            return acc
+
+        pending = {self._ex.submit(_call_in_worker, fn, chunk) for chunk in chunks}
+        done_count = 0
+        while pending:
+            done, pending = cf.wait(pending, timeout=poll_interval, return_when=cf.FIRST_COMPLETED)
+            if cancelled():
+                self._cancel_event.set()
+                for fut in pending:
+                    fut.cancel()
+                return None
+            for fut in done:
+                acc = reduce(acc, fut.result())
+                done_count += 1
+                if progress is not None:
+                    progress(done_count, total)
+        return acc
+
+
+def map_reduce_chunks(
+    fn: ChunkFn,
+    chunks: Sequence[Any],
+    reduce: Callable[[Any, Any], Any],
+    initial: Any,
+    shared: Dict[str, np.ndarray],
+    workers: int = 1,
+    progress: Optional[Callable[[int, int], None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    poll_interval: float = 0.2,
+) -> Optional[Any]:
+    """对 chunks 逐块执行 fn 并用 reduce 聚合；取消时返回 None（一次性 ChunkPool）。
+
+    reduce(acc, partial) -> acc，在主进程按完成顺序调用，因此只需满足交换律。
+    """
+    workers = min(workers, len(chunks)) if len(chunks) > 1 else 1
+    with ChunkPool(shared, workers) as pool:
+        return pool.map_reduce(fn, chunks, reduce, initial, progress=progress, is_cancelled=is_cancelled,
+                               poll_interval=poll_interval)
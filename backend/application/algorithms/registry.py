@@ -1,20 +1,111 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional
+import importlib
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
 
 
 ProgressCallback = Callable[[int, str, str], None]
 IsCancelled = Callable[[], bool]
 
 
+class AlgorithmResult(dict):
+    """runner 的返回值：仍然是 {node_id: node_value}，可额外携带结果元数据 meta。
+
+    例如近似算法的模式、样本数与误差界。普通 dict 返回值视为没有 meta。
+    """
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None, meta: Optional[Dict[str, Any]] = None):
+        super().__init__(values or {})
+        self.meta: Dict[str, Any] = dict(meta or {})
+
+
 @dataclass
 class AlgorithmSpec:
-    """算法运行时描述。"""
+    """算法的声明式描述。
+
+    runner 按 module:attr 在首次使用时才导入（见 load），导入失败只影响该算法本身；
+    其余字段是给前端/调度使用的静态元数据：
+    - complexity       期望时间复杂度（n 节点、m 边、L 层）
+    - supports_approx  是否支持近似/抽样参数
+    - multilayer       是否接受 4 列多层网络（按层计算而不是合并）
+    - memory_estimate  峰值内存的量级估计
+    - version          实现版本，结果口径变化时递增（结果复用按它区分）
+    """
 
     algo_key: str
     name: str
-    runner: Callable[[str, Dict[str, Any], ProgressCallback, IsCancelled], Dict[str, Any]]
+    module: str = ''
+    attr: str = 'run'
+    complexity: str = ''
+    supports_approx: bool = False
+    multilayer: bool = False
+    memory_estimate: str = ''
+    version: str = '1'
+    _runner: Optional[Callable[[str, Dict[str, Any], ProgressCallback, IsCancelled], Dict[str, Any]]] = field(default=None, repr=False)
+    import_seconds: Optional[float] = None
+    import_error: Optional[str] = None
+    imported_modules: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self._runner is not None
+
+    def load(self):
+        """导入并返回 runner；失败时抛 ImportError（记录在 import_error 中，下次调用会重试）。"""
+        if self._runner is not None:
+            return self._runner
+        with self._lock:
+            if self._runner is not None:
+                return self._runner
+            before = _top_level_modules()
+            t0 = time.perf_counter()
+            try:
+                runner = getattr(importlib.import_module(self.module), self.attr)
+            except Exception as e:
+                self.import_error = f'{type(e).__name__}: {e}'
+                raise ImportError(f'算法 {self.algo_key} 导入失败: {self.import_error}') from e
+            finally:
+                self.import_seconds = time.perf_counter() - t0
+                self.imported_modules = sorted(_top_level_modules() - before)
+            self.import_error = None
+            self._runner = runner
+            return runner
+
+    @property
+    def runner(self):
+        return self.load()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'algo_key': self.algo_key,
+            'name': self.name,
+            'module': self.module,
+            'complexity': self.complexity,
+            'supports_approx': self.supports_approx,
+            'multilayer': self.multilayer,
+            'memory_estimate': self.memory_estimate,
+            'version': self.version,
+        }
+
+    def import_report(self) -> Dict[str, Any]:
+        return {
+            'algo_key': self.algo_key,
+            'module': self.module,
+            'loaded': self.loaded,
+            'import_seconds': None if self.import_seconds is None else round(self.import_seconds, 4),
+            'import_error': self.import_error,
+            # 首次导入时新引入的顶层包（如 torch/dgl），用于判断哪些算法拖慢了进程启动
+            'imported_modules': list(self.imported_modules),
+        }
+
+
+def _top_level_modules() -> Set[str]:
+    return {name.split('.', 1)[0] for name in list(sys.modules)}
 
 
 class AlgorithmRegistry:
@@ -29,13 +120,30 @@ class AlgorithmRegistry:
     def __init__(self):
         self._specs_by_key: Dict[str, AlgorithmSpec] = {}
 
-    def register_key(self, algo_key: str, name: str, runner):
+    @staticmethod
+    def _normalize_key(algo_key: str) -> str:
         if not algo_key:
             raise ValueError('algo_key 不能为空')
         k = str(algo_key).strip()
         if not k:
             raise ValueError('algo_key 不能为空')
-        self._specs_by_key[k] = AlgorithmSpec(algo_key=k, name=name or k, runner=runner)
+        return k
+
+    def register(self, spec: AlgorithmSpec) -> AlgorithmSpec:
+        """注册声明式 spec（模块在首次使用时才导入）。"""
+        spec.algo_key = self._normalize_key(spec.algo_key)
+        spec.name = spec.name or spec.algo_key
+        if not spec.module:
+            raise ValueError('module 不能为空')
+        self._specs_by_key[spec.algo_key] = spec
+        return spec
+
+    def register_key(self, algo_key: str, name: str, runner):
+        """直接注册已导入的 runner（兼容旧写法）。"""
+        k = self._normalize_key(algo_key)
+        spec = AlgorithmSpec(algo_key=k, name=name or k, module=getattr(runner, '__module__', '') or '')
+        spec._runner = runner
+        self._specs_by_key[k] = spec
 
     def get_by_key(self, algo_key: str) -> Optional[AlgorithmSpec]:
         if not algo_key:
@@ -45,29 +153,42 @@ class AlgorithmRegistry:
     def list_keys(self):
         return sorted(self._specs_by_key.keys())
 
+    def list_specs(self) -> List[AlgorithmSpec]:
+        return [self._specs_by_key[k] for k in self.list_keys()]
 
-registry = AlgorithmRegistry()
+    def import_report(self, load: bool = False) -> List[Dict[str, Any]]:
+        """各算法的导入开销；load=True 时先导入尚未加载的算法（失败只记录，不抛出）。"""
+        out = []
+        for spec in self.list_specs():
+            if load and not spec.loaded:
+                try:
+                    spec.load()
+                except ImportError:
+                    pass
+            out.append(spec.import_report())
+        return out
 
 
-# --- 在这里按 algo_key 注册你的算法实现 ---
-try:
-    from .example_textline_algo import run as _example_run
-    from .degree_centrality_algo import run as _degree_run
-    from .betweenness_centrality_algo import run as _betweenness_run
-    from .closeness_centrality_algo import run as _closeness_run
-    from .hgc_algo import run as _hgc_run
-    from .cr_algo import run as _cr_run
-    from .mgnn_al_algo import run as _mgnn_al_run
-
-    # 该 key 必须与你数据库 algorithms.algo_key 一致
-    registry.register_key('example_textline_algo', '示例-按行读取', _example_run)
-    registry.register_key('dc', '度中心性', _degree_run)
-    registry.register_key('bc', '介数中心性', _betweenness_run)
-    registry.register_key('cc', '接近中心性', _closeness_run)
-    registry.register_key('cr', '圈比', _cr_run)
-    registry.register_key('hgc', 'HGC算法', _hgc_run)
-    registry.register_key('mgnn-al', 'MGNN_AL', _mgnn_al_run)
-except Exception:
-    pass
+registry = AlgorithmRegistry()
 
 
+# --- 在这里按 algo_key 注册你的算法实现（key 必须与数据库 algorithms.algo_key 一致） ---
+_PKG = __name__.rsplit('.', 1)[0]
+
+for _spec in (
+    AlgorithmSpec('example_textline_algo', '示例-按行读取', f'{_PKG}.example_textline_algo',
+                  complexity='O(m)', memory_estimate='O(m)'),
+    AlgorithmSpec('dc', '度中心性', f'{_PKG}.degree_centrality_algo',
+                  complexity='O(n + m)', memory_estimate='O(n + m)'),
+    AlgorithmSpec('bc', '介数中心性', f'{_PKG}.betweenness_centrality_algo',
+                  complexity='O(nm)；近似 O(km)', supports_approx=True, memory_estimate='O(n + m)，每个 worker 一份 O(n) 工作区'),
+    AlgorithmSpec('cc', '接近中心性', f'{_PKG}.closeness_centrality_algo',
+                  complexity='O(nm)；sample/hyperball 为 O(km)', supports_approx=True, memory_estimate='O(n·batch_size/8 + m)'),
+    AlgorithmSpec('cr', '圈比', f'{_PKG}.cr_algo',
+                  complexity='O(m^1.5 + m·最短环搜索)', memory_estimate='O(m + 最小环总长)'),
+    AlgorithmSpec('hgc', 'HGC算法', f'{_PKG}.hgc_algo',
+                  complexity='O(Σ两跳邻居 + cr)', memory_estimate='O(Σ两跳邻居)'),
+    AlgorithmSpec('mgnn-al', 'MGNN_AL', f'{_PKG}.mgnn_al_algo',
+                  complexity='O(L·m·heads)', multilayer=True, memory_estimate='O(L·m·heads)；mini-batch 时 O(L·n·d + batch 边数·heads)'),
+):
+    registry.register(_spec)
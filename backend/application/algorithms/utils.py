@@ -1,8 +1,22 @@
+import re
+
 import networkx as nx
+import numpy as np
+
+from application.algorithms.csr_graph import CSRGraph
+from application.algorithms.graph_sidecar import ensure_sidecar
 
 
 
 def load_graph(path):    #加载单层网络
+    sc = ensure_sidecar(path)
+    if sc is not None and not sc.is_multilayer:
+        # 二进制 sidecar：按文件顺序回放边（含自环/重边），与逐行解析结果一致
+        ids = sc.node_ids.tolist()
+        G = nx.Graph()
+        G.add_edges_from((ids[u], ids[v]) for u, v in zip(sc.src.tolist(), sc.dst.tolist()))
+        return G
+
     G = nx.Graph()
     with open(path, 'r') as text:
         for line in text:
@@ -19,6 +33,10 @@ def load_multilayer_graph(path):
     # 1) 单层网络：node1 node2
     # 2) 多层网络：layer node1 node2 weight
 
+    sc = ensure_sidecar(path)
+    if sc is not None:
+        return _multilayer_graph_from_sidecar(sc)
+
     with open(path, 'r') as text:
         first_tokens = None
         for line in text:
@@ -78,3 +96,101 @@ def load_multilayer_graph(path):
             return G
 
         raise ValueError(f"不支持的文件格式：期望2列或4列，但首行是{cols}列: {' '.join(first_tokens)}")
+
+
+def _multilayer_graph_from_sidecar(sc):
+    ids = sc.node_ids.tolist()
+    src = sc.src.tolist()
+    dst = sc.dst.tolist()
+
+    if not sc.is_multilayer:
+        G0 = nx.Graph()
+        G0.add_edges_from((ids[u], ids[v]) for u, v in zip(src, dst))
+        G0.remove_edges_from(nx.selfloop_edges(G0))
+        return [G0]
+
+    G = [nx.Graph() for _ in range(int(sc.meta.get('layers') or 0))]
+    for layer, u, v, w in zip(sc.layer.tolist(), src, dst, sc.weight.tolist()):
+        G[layer - 1].add_edge(ids[u], ids[v], weight=int(w))
+    for graph in G:
+        graph.remove_edges_from(nx.selfloop_edges(graph))
+    return G
+
+
+# ---------------- CSR 加载（NumPy，可选） ----------------
+# 与上面的 networkx 版本口径一致，但一次性向量化解析，不逐边构建 Python 对象。
+# 所有加载器优先读取上传时生成的二进制 sidecar（见 graph_sidecar.py），命中时不做文本解析。
+# 运行器按需选用：load_csr_graph / load_multilayer_csr_graph。
+
+_NON_EMPTY_LINE = re.compile(r'^[ \t]*\S', re.M)
+
+
+def _read_int_table(path):
+    """读取整数边表，返回 (rows, cols) 的 int64 数组；空文件返回 None。
+
+    要求每个非空行的列数一致，否则抛 ValueError（与 load_multilayer_graph 行为一致）。
+    """
+    with open(path, 'r') as f:
+        data = f.read()
+
+    first_tokens = None
+    for line in data.splitlines():
+        s = line.strip()
+        if s:
+            first_tokens = s.split()
+            break
+    if first_tokens is None:
+        return None
+
+    cols = len(first_tokens)
+    tokens = data.split()
+    lines = len(_NON_EMPTY_LINE.findall(data))
+    if len(tokens) != lines * cols:
+        raise ValueError(f"文件格式不一致，应为{cols}列")
+    return np.array(tokens, dtype=np.int64).reshape(lines, cols)
+
+
+def load_csr_graph(path) -> CSRGraph:
+    """加载单层网络为 CSRGraph（取每行首列与末列，与 load_graph 一致）。"""
+    sc = ensure_sidecar(path)
+    if sc is not None and not sc.is_multilayer:
+        return sc.to_csr()
+
+    table = _read_int_table(path)
+    if table is None:
+        return CSRGraph.from_index_edges(np.empty(0), np.empty(0), 0)
+    return CSRGraph.from_edges(table[:, 0], table[:, -1])
+
+
+def load_multilayer_csr_graph(path):
+    """加载单层(2列)/多层(4列)网络为 list[CSRGraph]，各层共享全局节点表。
+
+    层号从 1 开始；中间缺失的层为空图（与 load_multilayer_graph 一致）。
+    """
+    sc = ensure_sidecar(path)
+    if sc is not None:
+        return sc.to_csr_layers()
+
+    table = _read_int_table(path)
+    if table is None:
+        return []
+
+    cols = table.shape[1]
+    if cols == 2:
+        return [CSRGraph.from_edges(table[:, 0], table[:, 1])]
+
+    if cols == 4:
+        layer, src, dst, weight = table[:, 0], table[:, 1], table[:, 2], table[:, 3]
+        if len(layer) and int(layer.min()) < 1:
+            raise ValueError("层号必须从1开始")
+        node_ids = np.unique(np.concatenate([src, dst]))
+        num_layers = int(layer.max()) if len(layer) else 0
+        order = np.argsort(layer, kind='stable')
+        bounds = np.searchsorted(layer[order], np.arange(1, num_layers + 2))
+        graphs = []
+        for i in range(num_layers):
+            sel = order[bounds[i]:bounds[i + 1]]
+            graphs.append(CSRGraph.from_edges(src[sel], dst[sel], node_ids=node_ids, weights=weight[sel]))
+        return graphs
+
+    raise ValueError(f"不支持的文件格式：期望2列或4列，但首行是{cols}列")
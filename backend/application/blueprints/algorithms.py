@@ -82,6 +82,17 @@ def create_algorithm():
         return fail("系统错误: " + str(e), http_code=500, status="error")
 
 
+@bp.route('/algorithms/registry', methods=['GET'])
+@require_admin
+def get_algorithm_registry():
+    """算法实现注册表：声明式元数据 + 各 runner 的导入耗时/新引入的包/导入错误。"""
+    try:
+        load = (request.args.get('load') or '').strip().lower() in ('1', 'true', 'yes')
+        return ok(algorithms_service.get_registry_report(load=load))
+    except Exception as e:
+        return fail("系统错误: " + str(e), http_code=500, status="error")
+
+
 @bp.route('/algorithms/<int:algo_id>', methods=['GET'])
 @require_auth
 def get_algorithm(algo_id: int):
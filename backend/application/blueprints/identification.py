@@ -2,13 +2,16 @@ from flask import Blueprint, request, g, current_app, Response
 from mysql.connector import Error
 import os
 import networkx as nx
+import numpy as np
 
 
 from application.common.auth import require_auth, is_admin
 from application.common.responses import ok, fail
 from application.services import identification_service, uploads_service
-from application.services.graph_service import parse_graph_from_file
+from application.services.graph_service import parse_graph_from_file, build_nx_graph, load_nx_graph
 from application.services.propagation_service import PropagationSimulator, threshhold
+from application.services import result_store
+from application.services.result_store import ResultView
 
 bp = Blueprint('identification', __name__)
 
@@ -27,7 +30,12 @@ def _safe_int(v, default=None):
         return default
 
 
-def _compute_graph_metrics(G: nx.Graph, graph_obj: dict, top_nodes: list[str]) -> dict:
+def _compute_graph_metrics(G: nx.Graph, graph_obj: dict, top_nodes: list[str], store=None) -> dict:
+    """报告用的图结构指标。
+
+    store 为上传文件的 FeatureStore（可选）：图未截断且节点表一致时，连通分量、
+    聚类系数与传递性直接由缓存的 component/clustering/triangles/degree 计算。
+    """
     num_nodes = G.number_of_nodes()
     num_edges = G.number_of_edges()
 
@@ -47,8 +55,37 @@ def _compute_graph_metrics(G: nx.Graph, graph_obj: dict, top_nodes: list[str]) -
     num_components = 0
     largest_component_ratio = 0.0
 
+    meta = graph_obj.get('meta') or {}
+    if store is not None and (meta.get('truncated') or graph_obj.get('type') == 'multilayer' or len(store.node_ids) != num_nodes):
+        store = None
+
     try:
-        if num_nodes > 0:
+        if num_nodes > 0 and store is not None:
+            import numpy as np
+
+            labels = np.asarray(store.get('component'))
+            sizes = np.bincount(labels)
+            num_components = int(len(sizes))
+
+            # 最大连通分量（与 max(..., key=len) 一样取第一个最大者）
+            largest = int(np.argmax(sizes))
+            in_lcc = labels == largest
+            largest_component_ratio = int(sizes[largest]) / num_nodes
+            H = G.subgraph([str(nid) for nid in store.node_ids[in_lcc].tolist()]).copy()
+            lcc_nodes = H.number_of_nodes()
+            lcc_edges = H.number_of_edges()
+
+            if H.number_of_nodes() > 1:
+                lcc_avg_path_length = nx.average_shortest_path_length(H)
+            else:
+                lcc_avg_path_length = 0.0
+
+            # 分量内的聚类系数与全图一致；transitivity = Σ2T / Σd(d-1)
+            lcc_avg_clustering = float(np.asarray(store.get('clustering'))[in_lcc].mean())
+            deg = np.asarray(store.get('degree'))[in_lcc].astype(np.float64)
+            tri = np.asarray(store.get('triangles'))[in_lcc]
+            lcc_transitivity = float(2.0 * tri.sum() / (deg * (deg - 1)).sum()) if tri.sum() else 0.0
+        elif num_nodes > 0:
             connected_components = list(nx.connected_components(G))
             num_components = len(connected_components)
 
@@ -109,9 +146,18 @@ def _compute_graph_metrics(G: nx.Graph, graph_obj: dict, top_nodes: list[str]) -
     }
 
 
-def _score_distribution(scores: list[float]) -> dict:
-    scores = [s for s in scores if isinstance(s, (int, float))]
-    if not scores:
+def _score_array(scores) -> np.ndarray:
+    """分数列表/数组 -> float64 数组（去掉非数值与 NaN）。"""
+    if isinstance(scores, np.ndarray):
+        arr = scores.astype(np.float64, copy=False)
+    else:
+        arr = np.asarray([s for s in scores if isinstance(s, (int, float))], dtype=np.float64)
+    return arr[~np.isnan(arr)]
+
+
+def _score_distribution(scores) -> dict:
+    scores_sorted = np.sort(_score_array(scores))
+    if not len(scores_sorted):
         return {
             'count': 0,
             'min': None,
@@ -119,15 +165,14 @@ def _score_distribution(scores: list[float]) -> dict:
             'mean': None,
             'median': None,
         }
-    scores_sorted = sorted(scores)
     n = len(scores_sorted)
-    mn = scores_sorted[0]
-    mx = scores_sorted[-1]
-    mean = sum(scores_sorted) / n
+    mn = float(scores_sorted[0])
+    mx = float(scores_sorted[-1])
+    mean = float(scores_sorted.sum()) / n
     if n % 2 == 1:
-        med = scores_sorted[n // 2]
+        med = float(scores_sorted[n // 2])
     else:
-        med = (scores_sorted[n // 2 - 1] + scores_sorted[n // 2]) / 2.0
+        med = float(scores_sorted[n // 2 - 1] + scores_sorted[n // 2]) / 2.0
     return {
         'count': n,
         'min': mn,
@@ -137,22 +182,23 @@ def _score_distribution(scores: list[float]) -> dict:
     }
 
 
-def _risk_level(top_scores: list[float], all_scores: list[float]) -> dict:
+def _risk_level(top_scores, all_scores) -> dict:
     # 规则化、可解释：头部集中 + top1 突出
     dist = _score_distribution(all_scores)
-    if not all_scores:
+    if not len(all_scores):
         return {'level': 'unknown', 'reason': '结果为空'}
 
-    scores_sorted = sorted([s for s in all_scores if isinstance(s, (int, float))], reverse=True)
-    if not scores_sorted:
+    scores_sorted = np.sort(_score_array(all_scores))[::-1]
+    if not len(scores_sorted):
         return {'level': 'unknown', 'reason': '结果为空'}
 
-    total_sum = sum(scores_sorted) if sum(scores_sorted) != 0 else 1.0
+    total = float(scores_sorted.sum())
+    total_sum = total if total != 0 else 1.0
     top10 = scores_sorted[:10]
-    top10_ratio = sum(top10) / total_sum
+    top10_ratio = float(top10.sum()) / total_sum
 
-    top1 = scores_sorted[0]
-    top2 = scores_sorted[1] if len(scores_sorted) > 1 else None
+    top1 = float(scores_sorted[0])
+    top2 = float(scores_sorted[1]) if len(scores_sorted) > 1 else None
     gap12 = (top1 - top2) if (top2 is not None) else None
 
     mean = dist.get('mean')
@@ -196,6 +242,9 @@ def create_identification_task():
         file_id = data.get('file_id')
         algorithm_key = (data.get('algorithm_key') or data.get('algo_key') or '').strip()
         params = data.get('params') or {}
+        priority = data.get('priority')
+        # reuse=false：不复用相同文件/算法/参数的已有结果，强制重新计算
+        reuse = str(data.get('reuse', True)).strip().lower() not in ('0', 'false', 'no')
 
         if not file_id:
             return fail('缺少参数: file_id', http_code=400)
@@ -219,6 +268,8 @@ def create_identification_task():
                     'ip': request.remote_addr,
                     'user_agent': request.headers.get('User-Agent', ''),
                 },
+                priority=priority,
+                reuse=reuse,
             )
         except PermissionError:
             return fail('无权限使用该文件', http_code=403)
@@ -231,6 +282,9 @@ def create_identification_task():
             'progress': t.progress,
             'stage': t.stage,
             'message': t.message,
+            'priority': t.priority,
+            'reused_from': identification_service.public_reused_from(t),
+            **identification_service.queue_info(t),
         }, message='任务创建成功')
 
     except Error as e:
@@ -274,6 +328,9 @@ def get_identification_task(task_id: str):
             'started_at': _ts(t.started_at),
             'ended_at': _ts(t.ended_at),
             'error': t.error,
+            'priority': t.priority,
+            'reused_from': identification_service.public_reused_from(t),
+            **identification_service.queue_info(t),
         })
 
     except Error as e:
@@ -282,9 +339,43 @@ def get_identification_task(task_id: str):
         return fail('系统错误: ' + str(e), http_code=500, status='error')
 
 
+# 分页/按节点查询时单次返回的上限（完整结果请用 /result/download 流式下载）
+RESULT_PAGE_MAX = 10000
+
+
+def _result_query_args():
+    """解析 /result 的查询参数：offset/limit、top_k、order、nodes；参数非法时抛 ValueError。"""
+    order = (request.args.get('order') or result_store.ORDER_DESC).strip().lower()
+    if order not in (result_store.ORDER_DESC, result_store.ORDER_ASC):
+        raise ValueError('参数错误: order 只能为 desc 或 asc')
+
+    nodes = []
+    for raw in request.args.getlist('nodes'):
+        nodes.extend(x.strip() for x in str(raw).split(',') if x.strip())
+    if len(nodes) > RESULT_PAGE_MAX:
+        raise ValueError(f'参数错误: nodes 最多 {RESULT_PAGE_MAX} 个')
+
+    top_k = request.args.get('top_k', default=None, type=int)
+    offset = request.args.get('offset', default=None, type=int)
+    limit = request.args.get('limit', default=None, type=int)
+    if top_k is not None:
+        offset, limit = 0, top_k
+    paged = offset is not None or limit is not None
+    offset = max(0, int(offset or 0))
+    limit = RESULT_PAGE_MAX if limit is None else max(0, min(int(limit), RESULT_PAGE_MAX))
+    return order, nodes, paged, offset, limit
+
+
 @bp.route('/identification/tasks/<task_id>/result', methods=['GET'])
 @require_auth
 def get_identification_result(task_id: str):
+    """识别结果。
+
+    不带参数时返回完整的 {node_id: score}（兼容旧前端）；
+    - offset/limit 或 top_k：按分数排序分页（order=desc|asc，limit 上限 RESULT_PAGE_MAX）
+    - nodes=1,2,3：只返回指定节点的分数（可重复传参）
+    分页/按节点查询时 items 保持排序，result 为同样内容的映射。
+    """
     try:
         t = identification_service.get_task(task_id)
         if not t:
@@ -295,29 +386,37 @@ def get_identification_result(task_id: str):
         if t.status != identification_service.TASK_STATUS_SUCCEEDED:
             return fail('任务未完成，无法获取结果', http_code=409)
 
-        # 结果优先内存，其次 DB
-        result = t.result
-        if result is None:
-            try:
-                from application.repositories import identification_repo
-                row = identification_repo.get_task_result(t.task_id)
-                raw = (row or {}).get('result')
-                if isinstance(raw, (str, bytes)):
-                    import json
-                    result = json.loads(raw)
-                elif isinstance(raw, dict):
-                    result = raw
-            except Exception:
-                result = None
+        try:
+            order, nodes, paged, offset, limit = _result_query_args()
+        except ValueError as ve:
+            return fail(str(ve), http_code=400)
 
-        return ok({
+        # 结果优先内存，其次 DB（列式结果按需解压）
+        view, result_meta = identification_service.load_result(t)
+
+        data = {
             'task_id': t.task_id,
-            'result': result or {},
             'meta': {
                 'file_id': t.file_id,
                 'algorithm_key': t.algorithm_key,
+                'result_meta': result_meta,
             }
-        })
+        }
+        if nodes:
+            rows = view.lookup(nodes)
+            found = {nid for nid, _ in rows}
+            data['result'] = dict(rows)
+            data['items'] = [{'node_id': nid, 'score': score} for nid, score in rows]
+            data['missing'] = [nid for nid in nodes if nid not in found]
+            data['page'] = {'total': len(view), 'order': order}
+        elif paged:
+            rows = view.page(offset, limit, order=order)
+            data['result'] = dict(rows)
+            data['items'] = [{'rank': offset + i + 1, 'node_id': nid, 'score': score} for i, (nid, score) in enumerate(rows)]
+            data['page'] = {'total': len(view), 'offset': offset, 'limit': limit, 'order': order}
+        else:
+            data['result'] = view.to_dict(order=order)
+        return ok(data)
 
     except Error as e:
         return fail('数据库错误: ' + str(e), http_code=500, status='error')
@@ -325,25 +424,75 @@ def get_identification_result(task_id: str):
         return fail('系统错误: ' + str(e), http_code=500, status='error')
 
 
-def _build_identification_report(t, result: dict, upload_row: dict, algo_row: dict, graph_obj: dict, G: nx.Graph, top_n: int, max_edges: int | None):
+@bp.route('/identification/tasks/<task_id>/result/download', methods=['GET'])
+@require_auth
+def download_identification_result(task_id: str):
+    """流式下载完整结果：format=ndjson|csv，order=desc|asc。
+
+    行由生成器按块从列式结果编码输出，不在内存中拼出整个响应体。
+    """
+    try:
+        t = identification_service.get_task(task_id)
+        if not t:
+            return fail('任务不存在', http_code=404)
+        if (not is_admin()) and t.user_id != g.user['id']:
+            return fail('无权限访问该任务', http_code=403)
+
+        if t.status != identification_service.TASK_STATUS_SUCCEEDED:
+            return fail('任务未完成，无法获取结果', http_code=409)
+
+        fmt = (request.args.get('format') or 'ndjson').strip().lower()
+        order = (request.args.get('order') or result_store.ORDER_DESC).strip().lower()
+        if fmt not in ('ndjson', 'csv'):
+            return fail('参数错误: format 只能为 ndjson 或 csv', http_code=400)
+        if order not in (result_store.ORDER_DESC, result_store.ORDER_ASC):
+            return fail('参数错误: order 只能为 desc 或 asc', http_code=400)
+
+        view, _ = identification_service.load_result(t)
+
+        if fmt == 'csv':
+            body = result_store.iter_csv(view, order=order)
+            mimetype = 'text/csv; charset=utf-8'
+        else:
+            body = result_store.iter_ndjson(view, order=order)
+            mimetype = 'application/x-ndjson'
+
+        filename = f'identification_result_{task_id}.{fmt}'
+        return Response(
+            body,
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Result-Total': str(len(view)),
+            },
+        )
+
+    except Error as e:
+        return fail('数据库错误: ' + str(e), http_code=500, status='error')
+    except Exception as e:
+        return fail('系统错误: ' + str(e), http_code=500, status='error')
+
+
+def _build_identification_report(t, result, upload_row: dict, algo_row: dict, graph_obj: dict, G: nx.Graph, top_n: int, max_edges: int | None, abs_path: str | None = None):
     # TopN（默认 20）
     top_n = max(1, min(int(top_n or 20), 200))
 
-    # 排序结果
-    items = []
-    for k, v in (result or {}).items():
-        items.append((str(k), v, _safe_float(v, None)))
-    items.sort(key=lambda x: (x[2] is not None, x[2]), reverse=True)
-
-    top_items = items[:top_n]
+    # 排序结果（ResultView 已按分数降序预排序，只取需要的部分）
+    if isinstance(result, dict):
+        result = ResultView.from_dict(result)
+    top_items = [(nid, v, v) for nid, v in result.top_k(top_n)]
     top_nodes = [it[0] for it in top_items]
     top_scores = [it[2] for it in top_items if it[2] is not None]
-    all_scores = [it[2] for it in items if it[2] is not None]
+    all_scores = result.sorted_scores()
 
     dist = _score_distribution(all_scores)
     risk = _risk_level(top_scores=top_scores, all_scores=all_scores)
 
-    graph_metrics = _compute_graph_metrics(G, graph_obj, top_nodes=top_nodes)
+    store = None
+    if abs_path:
+        from application.algorithms.feature_store import open_store
+        store = open_store(abs_path)
+    graph_metrics = _compute_graph_metrics(G, graph_obj, top_nodes=top_nodes, store=store)
 
     def _algo_explain(algo_key: str) -> str:
         k = (algo_key or '').strip().lower()
@@ -842,20 +991,7 @@ def get_identification_report(task_id: str):
             return fail('任务未完成，无法生成报告', http_code=409)
 
         # 取结果（优先内存，其次 DB）
-        result = t.result
-        if result is None:
-            try:
-                from application.repositories import identification_repo
-                row = identification_repo.get_task_result(t.task_id)
-                raw = (row or {}).get('result')
-                if isinstance(raw, (str, bytes)):
-                    import json
-                    result = json.loads(raw)
-                elif isinstance(raw, dict):
-                    result = raw
-            except Exception:
-                result = None
-        result = result or {}
+        result, _ = identification_service.load_result(t)
 
         # 算法元信息（来自 DB algorithms 表）
         algo_row = None
@@ -893,20 +1029,7 @@ def get_identification_report(task_id: str):
         graph_obj = parse_graph_from_file(abs_path=abs_path, ext=ext, max_edges=max_edges, force_multilayer=is_multi_name)
 
         # 构建 networkx 无向图（用于最大连通分量口径指标 / 桥接点等）
-        G = nx.Graph()
-        for n in graph_obj.get('nodes') or []:
-            nid = (n or {}).get('id')
-            if nid is not None:
-                G.add_node(str(nid))
-        for e in graph_obj.get('edges') or []:
-            s = (e or {}).get('source')
-            tt = (e or {}).get('target')
-            if s is None or tt is None:
-                continue
-            s = str(s)
-            tt = str(tt)
-            if s and tt:
-                G.add_edge(s, tt)
+        G = build_nx_graph(graph_obj)
 
         top_n = request.args.get('top_n', default=20, type=int)
         top_n = max(1, min(int(top_n or 20), 200))
@@ -920,6 +1043,7 @@ def get_identification_report(task_id: str):
             G=G,
             top_n=top_n,
             max_edges=max_edges,
+            abs_path=abs_path,
         )
 
         return ok({'task_id': t.task_id, 'report': report})
@@ -1465,20 +1589,7 @@ def export_identification_report_html(task_id: str):
 
         # 直接复用 report 生成逻辑（避免依赖 ok()/Response.get_json 造成导出回退为 JSON）
         # 取结果（优先内存，其次 DB）
-        result = t.result
-        if result is None:
-            try:
-                from application.repositories import identification_repo
-                row = identification_repo.get_task_result(t.task_id)
-                raw = (row or {}).get('result')
-                if isinstance(raw, (str, bytes)):
-                    import json
-                    result = json.loads(raw)
-                elif isinstance(raw, dict):
-                    result = raw
-            except Exception:
-                result = None
-        result = result or {}
+        result, _ = identification_service.load_result(t)
 
         # 算法元信息（来自 DB algorithms 表）
         algo_row = None
@@ -1515,20 +1626,7 @@ def export_identification_report_html(task_id: str):
         graph_obj = parse_graph_from_file(abs_path=abs_path, ext=ext, max_edges=max_edges, force_multilayer=is_multi_name)
 
         # 构建 networkx 无向图
-        G = nx.Graph()
-        for n in graph_obj.get('nodes') or []:
-            nid = (n or {}).get('id')
-            if nid is not None:
-                G.add_node(str(nid))
-        for e in graph_obj.get('edges') or []:
-            s = (e or {}).get('source')
-            tt = (e or {}).get('target')
-            if s is None or tt is None:
-                continue
-            s = str(s)
-            tt = str(tt)
-            if s and tt:
-                G.add_edge(s, tt)
+        G = build_nx_graph(graph_obj)
 
         top_n = request.args.get('top_n', default=20, type=int)
         top_n = max(1, min(int(top_n or 20), 200))
@@ -1542,6 +1640,7 @@ def export_identification_report_html(task_id: str):
             G=G,
             top_n=top_n,
             max_edges=max_edges,
+            abs_path=abs_path,
         )
 
         from application.services.report_pdf_service import build_report_html
@@ -1707,29 +1806,10 @@ def identification_propagation():
             return fail('任务未完成，无法进行传播仿真', http_code=409)
 
         # 获取识别结果（优先内存，其次 DB）
-        result = t.result
-        if result is None:
-            try:
-                from application.repositories import identification_repo
-                row = identification_repo.get_task_result(t.task_id)
-                raw = (row or {}).get('result')
-                if isinstance(raw, (str, bytes)):
-                    import json
-                    result = json.loads(raw)
-                elif isinstance(raw, dict):
-                    result = raw
-            except Exception:
-                result = None
-        result = result or {}
+        result, _ = identification_service.load_result(t)
 
-        # 从结果里取 top-k：按 value(影响力/分数)降序
-        try:
-            sorted_items = sorted(result.items(), key=lambda kv: float(kv[1]), reverse=True)
-        except Exception:
-            # 兜底：无法转 float 时按字符串
-            sorted_items = sorted(result.items(), key=lambda kv: str(kv[1]), reverse=True)
-
-        topk_nodes = [str(kv[0]) for kv in sorted_items[:k]]
+        # 从结果里取 top-k：按 value(影响力/分数)降序（列式结果已预排序）
+        topk_nodes = [nid for nid, _ in result.top_k(k)]
         if not topk_nodes:
             return fail('识别结果为空，无法进行传播仿真', http_code=409)
 
@@ -1750,19 +1830,9 @@ def identification_propagation():
             ext = (ext2 or '').lstrip('.')
 
         abs_path = os.path.join(current_app.config['UPLOAD_FOLDER'], stored_name)
-        graph_obj = parse_graph_from_file(abs_path=abs_path, ext=ext, max_edges=None)
 
-        # 构建 networkx 无向图
-        G = nx.Graph()
-        for n in graph_obj.get('nodes') or []:
-            nid = str((n or {}).get('id'))
-            if nid:
-                G.add_node(nid)
-        for e in graph_obj.get('edges') or []:
-            s = str((e or {}).get('source'))
-            tt = str((e or {}).get('target'))
-            if s and tt:
-                G.add_edge(s, tt)
+        # 构建 networkx 无向图（命中 sidecar 时不做文本解析）
+        G = load_nx_graph(abs_path=abs_path, ext=ext, max_edges=None)
 
         if beta is None:
             beta = threshhold(G)
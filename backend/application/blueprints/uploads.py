@@ -58,6 +58,9 @@ def upload_file():
             },
         )
 
+        # 二进制图 sidecar 与内容哈希在后台生成（失败不影响上传，消费方会按需生成）
+        uploads_service.schedule_graph_sidecar(upload_id, abs_path)
+
         return ok({
             "id": upload_id,
             "original_name": filename,
@@ -199,6 +202,7 @@ def delete_upload(file_id: int):
             abs_path = os.path.join(current_app.config['UPLOAD_FOLDER'], row['stored_name'])
             if os.path.exists(abs_path):
                 os.remove(abs_path)
+            uploads_service.remove_graph_sidecar(abs_path)
         except Exception:
             pass
 
@@ -110,4 +110,12 @@ def create_app() -> Flask:
         app.logger.error(f"Failed to start health check daemon: {e}")
         pass
 
+    # 可选：后台预热 MGNN_AL 模型（MGNN_WARMUP=true）
+    try:
+        from .algorithms.mgnn_al_algo import start_warmup
+        start_warmup()
+    except Exception:
+        # 不影响主应用启动
+        pass
+
     return app
@@ -5,34 +5,41 @@ from application.common.db import get_db_connection
 
 
 def create_task_record(task: Dict[str, Any]) -> None:
+    """写入任务记录；task 含 priority / reuse_key / reused_from 时一并写入（需要迁移后的对应列）。"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
+        cols = ['task_id', 'user_id', 'file_id', 'algorithm_key', 'params', 'status', 'progress', 'stage', 'message', 'error']
+        params_json = json.dumps(task.get('params') or {}, ensure_ascii=False)
+        error_json = json.dumps(task.get('error'), ensure_ascii=False) if task.get('error') is not None else None
+        vals = [
+            task['task_id'],
+            task['user_id'],
+            task['file_id'],
+            task['algorithm_key'],
+            params_json,
+            task.get('status') or 'queued',
+            int(task.get('progress') or 0),
+            task.get('stage') or '',
+            task.get('message') or '',
+            error_json,
+        ]
+        if 'priority' in task:
+            cols.append('priority')
+            vals.append(task.get('priority') or 'interactive')
+        for col in ('reuse_key', 'reused_from'):
+            if col in task:
+                cols.append(col)
+                vals.append(task.get(col))
         sql = (
-            """
+            f"""
             INSERT INTO identification_tasks
-            (task_id, user_id, file_id, algorithm_key, params, status, progress, stage, message, error, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, FROM_UNIXTIME(%s))
+            ({', '.join(cols)}, created_at)
+            VALUES ({', '.join(['%s'] * len(cols))}, FROM_UNIXTIME(%s))
             """
         )
-        params_json = json.dumps(task.get('params') or {}, ensure_ascii=False)
-        error_json = json.dumps(task.get('error'), ensure_ascii=False) if task.get('error') is not None else None
-        cursor.execute(
-            sql,
-            (
-                task['task_id'],
-                task['user_id'],
-                task['file_id'],
-                task['algorithm_key'],
-                params_json,
-                task.get('status') or 'queued',
-                int(task.get('progress') or 0),
-                task.get('stage') or '',
-                task.get('message') or '',
-                error_json,
-                float(task.get('created_at') or 0.0)
-            )
-        )
+        vals.append(float(task.get('created_at') or 0.0))
+        cursor.execute(sql, tuple(vals))
         conn.commit()
     finally:
         try:
@@ -42,9 +49,14 @@ def create_task_record(task: Dict[str, Any]) -> None:
         conn.close()
 
 
-def update_task_record(task_id: str, fields: Dict[str, Any]) -> None:
+def update_task_record(task_id: str, fields: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+    """更新任务字段。
+
+    worker_id 给出时（TASK_QUEUE=db 的 worker 写入）只在该 worker 仍持有这个 running 任务时写入，
+    租约被回收、任务被取消或由其他 worker 接手后返回 False，调用方应放弃后续写入（如结果）。
+    """
     if not fields:
-        return
+        return True
 
     conn = get_db_connection()
     try:
@@ -84,12 +96,17 @@ def update_task_record(task_id: str, fields: Dict[str, Any]) -> None:
                 vals.append(v)
 
         if not sets:
-            return
+            return True
 
         sql = f"UPDATE identification_tasks SET {', '.join(sets)} WHERE task_id=%s"
         vals.append(task_id)
+        if worker_id:
+            sql += " AND worker_id=%s AND status='running'"
+            vals.append(worker_id)
         cursor.execute(sql, tuple(vals))
+        matched = cursor.rowcount > 0
         conn.commit()
+        return matched or not worker_id
     finally:
         try:
             cursor.close()
@@ -98,19 +115,232 @@ def update_task_record(task_id: str, fields: Dict[str, Any]) -> None:
         conn.close()
 
 
-def upsert_task_result(task_id: str, result: Dict[str, Any]) -> None:
+def update_task_progress_batch(updates: Dict[str, Dict[str, Any]], worker_ids: Optional[Dict[str, str]] = None) -> None:
+    """一条 UPDATE 写入多个任务的 progress/stage/message（进度批量落库）。
+
+    updates: {task_id: {'progress'?, 'stage'?, 'message'?}}；某任务没给出的列保持原值。
+    只更新仍在排队/运行中的任务，已到终态（含已取消）的任务不会被迟到的进度覆盖。
+    worker_ids: {task_id: worker_id}，其中的任务只在该 worker 仍持有时写入（见 update_task_record）。
+    """
+    if not updates:
+        return
+
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
+        sets = []
+        vals: List[Any] = []
+        for col in ('progress', 'stage', 'message'):
+            ids = [tid for tid, f in updates.items() if col in f]
+            if not ids:
+                continue
+            cases = []
+            for tid in ids:
+                v = updates[tid][col]
+                cases.append("WHEN %s THEN %s")
+                vals.extend([tid, int(v or 0) if col == 'progress' else v])
+            sets.append(f"{col}=CASE task_id {' '.join(cases)} ELSE {col} END")
+        if not sets:
+            return
+        conds = []
+        for tid in updates:
+            wid = (worker_ids or {}).get(tid)
+            if wid:
+                conds.append("(task_id=%s AND worker_id=%s)")
+                vals.extend([tid, wid])
+            else:
+                conds.append("task_id=%s")
+                vals.append(tid)
         sql = (
+            f"UPDATE identification_tasks SET {', '.join(sets)} "
+            f"WHERE ({' OR '.join(conds)}) AND status IN ('queued', 'running')"
+        )
+        cursor.execute(sql, tuple(vals))
+        conn.commit()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def upsert_task_result(task_id: str, result: Dict[str, Any], meta: Optional[Dict[str, Any]] = None, blob: Optional[bytes] = None) -> None:
+    """写入任务结果。blob 为列式结果（result_store），给出时 result 列只存占位的 {}。"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if blob is not None:
+            sql = (
+                """
+                INSERT INTO identification_task_results (task_id, result, meta, result_blob)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE result=VALUES(result), meta=VALUES(meta), result_blob=VALUES(result_blob)
+                """
+            )
+            cursor.execute(sql, (
+                task_id,
+                json.dumps(result or {}, ensure_ascii=False),
+                json.dumps(meta, ensure_ascii=False) if meta is not None else None,
+                blob,
+            ))
+        elif meta is None:
+            sql = (
+                """
+                INSERT INTO identification_task_results (task_id, result)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE result=VALUES(result)
+                """
+            )
+            cursor.execute(sql, (task_id, json.dumps(result or {}, ensure_ascii=False)))
+        else:
+            sql = (
+                """
+                INSERT INTO identification_task_results (task_id, result, meta)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE result=VALUES(result), meta=VALUES(meta)
+                """
+            )
+            cursor.execute(sql, (
+                task_id,
+                json.dumps(result or {}, ensure_ascii=False),
+                json.dumps(meta, ensure_ascii=False),
+            ))
+        conn.commit()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+# ---------------- 持久化队列（TASK_QUEUE=db） ----------------
+
+def claim_next_task(worker_id: str, lease_seconds: int, per_user_limit: int = 0) -> Optional[Dict[str, Any]]:
+    """领取一个排队中的任务并置为 running（带租约）；没有可领取的任务时返回 None。
+
+    等待复用相同任务结果的任务（reused_from 非空）不会被领取，见 settle_followers。
+
+    SELECT ... FOR UPDATE SKIP LOCKED 保证多个 worker 并发领取时互不阻塞、不会重复领取。
+    per_user_limit > 0 时跳过已有这么多 running 任务的用户（跨所有 worker 生效）：
+    查询里的子查询只是一致性快照下的预筛，选中任务后按用户加 GET_LOCK 串行化，
+    并用加锁读重新统计该用户的 running 数，超限则放弃本次领取。
+    顺序：interactive 先于 batch，同优先级按创建时间。
+    """
+    conn = get_db_connection()
+    user_lock = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        conn.start_transaction()
+        sql = """
+            SELECT t.task_id, t.user_id
+            FROM identification_tasks t
+            WHERE t.status='queued' AND t.reused_from IS NULL
+        """
+        args: List[Any] = []
+        if per_user_limit and per_user_limit > 0:
+            sql += """
+              AND t.user_id NOT IN (
+                SELECT user_id FROM (
+                  SELECT user_id FROM identification_tasks
+                  WHERE status='running'
+                  GROUP BY user_id
+                  HAVING COUNT(*) >= %s
+                ) busy
+              )
+            """
+            args.append(int(per_user_limit))
+        sql += """
+            ORDER BY (t.priority='interactive') DESC, t.created_at ASC
+            LIMIT 1
+            FOR UPDATE OF t SKIP LOCKED
+        """
+        cursor.execute(sql, tuple(args))
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            return None
+
+        if per_user_limit and per_user_limit > 0:
+            name = f"task_claim_user_{row['user_id']}"
+            cursor.execute("SELECT GET_LOCK(%s, 5) AS locked", (name,))
+            if not (cursor.fetchone() or {}).get('locked'):
+                conn.rollback()
+                return None
+            user_lock = name
+            cursor.execute(
+                """
+                SELECT COUNT(*) AS n FROM identification_tasks
+                WHERE user_id=%s AND status='running'
+                LOCK IN SHARE MODE
+                """,
+                (row['user_id'],)
+            )
+            if int((cursor.fetchone() or {}).get('n') or 0) >= int(per_user_limit):
+                conn.rollback()
+                return None
+
+        cursor.execute(
             """
-            INSERT INTO identification_task_results (task_id, result)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE result=VALUES(result)
+            UPDATE identification_tasks
+            SET status='running', worker_id=%s, attempts=attempts+1,
+                lease_expires_at=DATE_ADD(NOW(), INTERVAL %s SECOND), heartbeat_at=NOW()
+            WHERE task_id=%s
+            """,
+            (worker_id, int(lease_seconds), row['task_id'])
+        )
+        cursor.execute("SELECT * FROM identification_tasks WHERE task_id=%s", (row['task_id'],))
+        claimed = cursor.fetchone()
+        conn.commit()
+        return claimed
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        # 提交之后才释放用户锁，下一个领取者的加锁读一定能看到本次领取
+        if user_lock:
+            try:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (user_lock,))
+                cursor.fetchall()
+            except Exception:
+                pass
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def renew_task_lease(task_id: str, worker_id: str, lease_seconds: int) -> Optional[str]:
+    """心跳：续租仍由本 worker 持有的 running 任务。
+
+    返回任务当前状态（续租成功为 'running'，被取消为 'cancelled' 等）；
+    租约已被别的 worker 接手或任务已删除时返回 None。
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
             """
+            UPDATE identification_tasks
+            SET lease_expires_at=DATE_ADD(NOW(), INTERVAL %s SECOND), heartbeat_at=NOW()
+            WHERE task_id=%s AND worker_id=%s AND status='running'
+            """,
+            (int(lease_seconds), task_id, worker_id)
         )
-        cursor.execute(sql, (task_id, json.dumps(result or {}, ensure_ascii=False)))
+        renewed = cursor.rowcount > 0
         conn.commit()
+        if renewed:
+            return 'running'
+        cursor.execute("SELECT status, worker_id FROM identification_tasks WHERE task_id=%s", (task_id,))
+        row = cursor.fetchone()
+        if not row or row.get('worker_id') != worker_id:
+            return None
+        return row.get('status')
     finally:
         try:
             cursor.close()
@@ -119,6 +349,254 @@ def upsert_task_result(task_id: str, result: Dict[str, Any]) -> None:
         conn.close()
 
 
+def requeue_expired_tasks(max_attempts: int) -> Tuple[int, int]:
+    """回收租约过期的 running 任务（worker 崩溃/重启）：未超过重试次数的重新排队，其余置为失败。
+
+    只处理由 worker 领取过的任务（worker_id 与租约都非空）；Web 进程内执行（TASK_QUEUE=memory）
+    的任务没有租约，即使与 worker 共用一个库也不会被回收。
+    返回 (重新排队数, 置为失败数)。
+    """
+    orphan = """
+        status='running' AND worker_id IS NOT NULL AND lease_expires_at < NOW()
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            UPDATE identification_tasks
+            SET status='failed', stage='failed', message='任务多次中断，已放弃', progress=100, ended_at=NOW(),
+                error=%s, worker_id=NULL, lease_expires_at=NULL
+            WHERE {orphan} AND attempts >= %s
+            """,
+            (json.dumps({'code': 'WORKER_LOST', 'message': '执行任务的 worker 多次中断'}, ensure_ascii=False),
+             int(max_attempts))
+        )
+        failed = int(cursor.rowcount or 0)
+        cursor.execute(
+            f"""
+            UPDATE identification_tasks
+            SET status='queued', stage='queued', message='worker 中断，任务已重新排队', progress=0,
+                worker_id=NULL, lease_expires_at=NULL, started_at=NULL
+            WHERE {orphan} AND attempts < %s
+            """,
+            (int(max_attempts),)
+        )
+        requeued = int(cursor.rowcount or 0)
+        conn.commit()
+        return requeued, failed
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def cancel_task_record(task_id: str, user_id: Optional[int] = None, message: str = '任务已取消') -> Optional[str]:
+    """把排队/运行中的任务置为 cancelled（运行中的由持有它的 worker 在心跳时发现并中止）。
+
+    返回取消前的状态；任务不存在（或不属于 user_id）时返回 None。
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        sql = "SELECT status FROM identification_tasks WHERE task_id=%s"
+        args: List[Any] = [task_id]
+        if user_id is not None:
+            sql += " AND user_id=%s"
+            args.append(user_id)
+        cursor.execute(sql, tuple(args))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        cursor.execute(
+            """
+            UPDATE identification_tasks
+            SET status='cancelled', stage='cancelled', message=%s, ended_at=NOW()
+            WHERE task_id=%s AND status IN ('queued', 'running')
+            """,
+            (message, task_id)
+        )
+        conn.commit()
+        return row.get('status')
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def count_queued_ahead(task_id: str) -> Optional[int]:
+    """排在该任务前面的排队任务数（与 claim_next_task 的顺序一致，不考虑单用户上限）。"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT 1 AS queued FROM identification_tasks WHERE task_id=%s AND status='queued'", (task_id,))
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(
+            """
+            SELECT COUNT(*) AS cnt
+            FROM identification_tasks q
+            JOIN identification_tasks t ON t.task_id=%s
+            WHERE q.status='queued' AND q.reused_from IS NULL AND q.task_id<>t.task_id AND (
+              (q.priority='interactive') > (t.priority='interactive')
+              OR ((q.priority='interactive') = (t.priority='interactive') AND q.created_at <= t.created_at)
+            )
+            """,
+            (task_id,)
+        )
+        row = cursor.fetchone()
+        return int((row or {}).get('cnt', 0))
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+# ---------------- 结果复用 ----------------
+
+def find_reusable_task(reuse_key: str) -> Optional[Dict[str, Any]]:
+    """按复用键查找可复用的任务：优先已成功且有结果行的任务，其次仍在排队/运行中的原始任务。
+
+    返回 {task_id, status}；没有时返回 None。
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT t.task_id, t.status
+            FROM identification_tasks t
+            JOIN identification_task_results r ON r.task_id = t.task_id
+            WHERE t.reuse_key=%s AND t.status='succeeded'
+            ORDER BY t.ended_at DESC
+            LIMIT 1
+            """,
+            (reuse_key,)
+        )
+        row = cursor.fetchone()
+        if row:
+            return row
+        cursor.execute(
+            """
+            SELECT task_id, status
+            FROM identification_tasks
+            WHERE reuse_key=%s AND status IN ('queued', 'running') AND reused_from IS NULL
+            ORDER BY created_at ASC
+            LIMIT 1
+            """,
+            (reuse_key,)
+        )
+        return cursor.fetchone()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def settle_followers(source_task_id: str, succeeded: bool) -> int:
+    """源任务结束后处理等待复用它的排队任务。
+
+    succeeded=True：直接置为成功（结果通过 reused_from 读取源任务的结果行）；
+    否则解除关联（reused_from=NULL），改为独立执行。返回受影响行数。
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if succeeded:
+            cursor.execute(
+                """
+                UPDATE identification_tasks
+                SET status='succeeded', progress=100, stage='succeeded', message='复用相同任务的结果',
+                    started_at=COALESCE(started_at, NOW()), ended_at=NOW(), error=NULL
+                WHERE reused_from=%s AND status='queued'
+                """,
+                (source_task_id,)
+            )
+        else:
+            cursor.execute(
+                """
+                UPDATE identification_tasks
+                SET reused_from=NULL, stage='queued', message='相同任务未成功，改为独立执行'
+                WHERE reused_from=%s AND status='queued'
+                """,
+                (source_task_id,)
+            )
+        affected = cursor.rowcount
+        conn.commit()
+        return int(affected or 0)
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def reconcile_followers() -> int:
+    """补偿：源任务已结束（或已删除）但等待中的复用任务没有被处理（如 worker 在结束时崩溃）。
+
+    源任务成功的跟随置为成功，其余解除关联重新排队。返回受影响行数。
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE identification_tasks f
+            JOIN identification_tasks s ON s.task_id = f.reused_from
+            JOIN identification_task_results r ON r.task_id = s.task_id
+            SET f.status='succeeded', f.progress=100, f.stage='succeeded', f.message='复用相同任务的结果',
+                f.started_at=COALESCE(f.started_at, NOW()), f.ended_at=NOW(), f.error=NULL
+            WHERE f.status='queued' AND s.status='succeeded'
+            """
+        )
+        affected = int(cursor.rowcount or 0)
+        cursor.execute(
+            """
+            UPDATE identification_tasks f
+            LEFT JOIN identification_tasks s ON s.task_id = f.reused_from
+            SET f.reused_from=NULL, f.stage='queued', f.message='相同任务未成功，改为独立执行'
+            WHERE f.status='queued' AND f.reused_from IS NOT NULL
+              AND (s.task_id IS NULL OR s.status NOT IN ('queued', 'running', 'succeeded'))
+            """
+        )
+        affected += int(cursor.rowcount or 0)
+        conn.commit()
+        return affected
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
+def _copy_result_to_dependents(cursor, task_id: str) -> None:
+    """删除任务前，把结果复制给复用它的已成功任务（它们只记录了 reused_from，没有自己的结果行）。"""
+    try:
+        cursor.execute(
+            """
+            INSERT IGNORE INTO identification_task_results (task_id, result, meta, result_blob)
+            SELECT d.task_id, r.result, r.meta, r.result_blob
+            FROM identification_tasks d
+            JOIN identification_task_results r ON r.task_id = d.reused_from
+            WHERE d.reused_from=%s AND d.status='succeeded'
+            """,
+            (task_id,)
+        )
+    except Exception:
+        # 未执行迁移（没有 reused_from / result_blob 列）的库不存在复用关系
+        pass
+
+
 def get_task_by_id(task_id: str) -> Optional[Dict[str, Any]]:
     conn = get_db_connection()
     try:
@@ -138,7 +616,8 @@ def get_task_result(task_id: str) -> Optional[Dict[str, Any]]:
     conn = get_db_connection()
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT result FROM identification_task_results WHERE task_id=%s", (task_id,))
+        # SELECT *：兼容尚未添加 meta 列的旧库
+        cursor.execute("SELECT * FROM identification_task_results WHERE task_id=%s", (task_id,))
         row = cursor.fetchone()
         return row
     finally:
@@ -170,6 +649,7 @@ def delete_task_by_id(task_id: str, user_id: int) -> int:
             conn.rollback()
             return 0
 
+        _copy_result_to_dependents(cursor, task_id)
         cursor.execute("DELETE FROM identification_task_results WHERE task_id=%s", (task_id,))
         cursor.execute("DELETE FROM identification_tasks WHERE task_id=%s AND user_id=%s", (task_id, user_id))
         affected = cursor.rowcount
@@ -191,6 +671,7 @@ def delete_task_anyway(task_id: str) -> int:
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
+        _copy_result_to_dependents(cursor, task_id)
         cursor.execute("DELETE FROM identification_task_results WHERE task_id=%s", (task_id,))
         cursor.execute("DELETE FROM identification_tasks WHERE task_id=%s", (task_id,))
         affected = cursor.rowcount
@@ -92,6 +92,20 @@ def update_upload_original_name(file_id: int, original_name: str) -> None:
         conn.close()
 
 
+def update_upload_content_hash(file_id: int, content_hash: str) -> None:
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE uploads SET content_hash=%s WHERE id=%s", (content_hash, file_id))
+        conn.commit()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        conn.close()
+
+
 def delete_upload(file_id: int) -> None:
     conn = get_db_connection()
     try:
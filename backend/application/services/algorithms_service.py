@@ -279,3 +279,19 @@ def list_all_algorithms() -> List[Dict]:
     if total <= 0:
         return []
     return repo.list_algorithms(offset=0, limit=min(total, 10000))
+
+
+def get_registry_report(load: bool = False) -> Dict[str, Any]:
+    """已注册算法实现的声明式元数据与导入开销。
+
+    load=True 时先导入尚未加载的 runner（导入失败只记录在 import_error 中）。
+    """
+    from application.algorithms.registry import registry as algo_registry
+
+    import_report = {r['algo_key']: r for r in algo_registry.import_report(load=load)}
+    items = []
+    for spec in algo_registry.list_specs():
+        item = spec.to_dict()
+        item['import'] = import_report.get(spec.algo_key)
+        items.append(item)
+    return {'items': items, 'total': len(items)}
@@ -3,6 +3,8 @@ import os
 import re
 from typing import Dict, List, Tuple, Optional
 
+from application.algorithms.graph_sidecar import load_sidecar
+
 
 def _safe_float(x: str) -> Optional[float]:
     try:
@@ -149,13 +151,104 @@ def _parse_multilayer_txt(abs_path: str, max_edges: Optional[int]) -> Tuple[List
     return result_layers, truncated
 
 
+def _sidecar_edges(sc, max_edges: Optional[int]):
+    """按文件顺序截取前 max_edges 条边，返回 (ids, src, dst, truncated)。"""
+    total = len(sc.src)
+    end = total if max_edges is None else min(total, max_edges)
+    ids = [str(x) for x in sc.node_ids.tolist()]
+    return ids, sc.src[:end].tolist(), sc.dst[:end].tolist(), end < total
+
+
+def _singlelayer_from_sidecar(sc, max_edges: Optional[int]) -> Tuple[List[Dict], List[Dict], bool]:
+    ids, src, dst, truncated = _sidecar_edges(sc, max_edges)
+    edges = [{"source": ids[u], "target": ids[v]} for u, v in zip(src, dst)]
+    seen = dict.fromkeys(x for pair in zip(src, dst) for x in pair)
+    nodes = [{"id": ids[i], "label": ids[i]} for i in seen]
+    return nodes, edges, truncated
+
+
+def _multilayer_from_sidecar(sc, max_edges: Optional[int]) -> Tuple[List[Dict], bool]:
+    ids, src, dst, truncated = _sidecar_edges(sc, max_edges)
+    layer_col = sc.layer[:len(src)].tolist()
+    weight_col = sc.weight[:len(src)].tolist()
+
+    layers = {}
+    for layer, u, v, w in zip(layer_col, src, dst, weight_col):
+        data = layers.get(layer)
+        if data is None:
+            data = layers[layer] = {'nodes': {}, 'edges': []}
+        data['nodes'][u] = None
+        data['nodes'][v] = None
+        data['edges'].append({"source": ids[u], "target": ids[v], "weight": float(w)})
+
+    result_layers = []
+    # 与文本解析一致：layer_id 为字符串并按字符串排序
+    for layer_id, data in sorted(((str(k), v) for k, v in layers.items())):
+        nodes = [{"id": ids[i], "label": ids[i]} for i in data['nodes']]
+        result_layers.append({
+            "layer_id": layer_id,
+            "nodes": nodes,
+            "edges": data['edges'],
+            "meta": {
+                "nodes": len(nodes),
+                "edges": len(data['edges'])
+            }
+        })
+    return result_layers, truncated
+
+
+def build_nx_graph(graph_obj: Dict):
+    """由 parse_graph_from_file 的单层结果构建 networkx 无向图（节点 id 为字符串）。"""
+    import networkx as nx
+
+    G = nx.Graph()
+    for n in graph_obj.get('nodes') or []:
+        nid = (n or {}).get('id')
+        if nid is not None:
+            G.add_node(str(nid))
+    for e in graph_obj.get('edges') or []:
+        s = (e or {}).get('source')
+        t = (e or {}).get('target')
+        if s is None or t is None:
+            continue
+        s = str(s)
+        t = str(t)
+        if s and t:
+            G.add_edge(s, t)
+    return G
+
+
+def load_nx_graph(abs_path: str, ext: str, max_edges: Optional[int] = None):
+    """加载单层 networkx 图（节点 id 为字符串）。
+
+    命中 sidecar 时直接由边数组构建，跳过中间的 nodes/edges 字典。
+    """
+    sc = load_sidecar(abs_path)
+    if sc is not None and not sc.is_multilayer:
+        import networkx as nx
+
+        ids, src, dst, _ = _sidecar_edges(sc, max_edges)
+        G = nx.Graph()
+        G.add_edges_from((ids[u], ids[v]) for u, v in zip(src, dst))
+        return G
+    return build_nx_graph(parse_graph_from_file(abs_path=abs_path, ext=ext, max_edges=max_edges))
+
+
 def parse_graph_from_file(abs_path: str, ext: str, max_edges: Optional[int] = None, force_multilayer: bool = False) -> Dict:
     ext = (ext or '').lower().lstrip('.')
     if not os.path.exists(abs_path):
         raise FileNotFoundError("文件不存在")
 
+    # 优先使用上传时生成的二进制 sidecar（格式与请求的单层/多层口径一致时）
+    sc = load_sidecar(abs_path)
+    if sc is not None and sc.is_multilayer != bool(force_multilayer):
+        sc = None
+
     if force_multilayer:
-        layers, truncated = _parse_multilayer_txt(abs_path, max_edges)
+        if sc is not None:
+            layers, truncated = _multilayer_from_sidecar(sc, max_edges)
+        else:
+            layers, truncated = _parse_multilayer_txt(abs_path, max_edges)
         # For overall metrics, we can aggregate node and edge counts
         total_nodes = len(set(n['id'] for layer in layers for n in layer['nodes']))
         total_edges = sum(len(layer['edges']) for layer in layers)
@@ -171,7 +264,9 @@ def parse_graph_from_file(abs_path: str, ext: str, max_edges: Optional[int] = No
             }
         }
 
-    if ext == 'csv':
+    if sc is not None and ext in ('csv', 'txt'):
+        nodes, edges, truncated = _singlelayer_from_sidecar(sc, max_edges)
+    elif ext == 'csv':
         nodes, edges, truncated = _parse_csv(abs_path, max_edges)
     elif ext in ('txt',):
         nodes, edges, truncated = _parse_txt(abs_path, max_edges)
@@ -1,9 +1,12 @@
+import hashlib
+import json
 import os
 import threading
 import time
 import uuid
-from dataclasses import dataclass, asdict
-from typing import Any, Dict, Optional, List
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, replace
+from typing import Any, Dict, Optional, List, Tuple
 
 from flask import request
 
@@ -13,9 +16,11 @@ from application.services.audit_context import sanitize_detail
 from flask import current_app
 
 from application.common.auth import is_admin
-from application.services import uploads_service, algorithms_service
+from application.services import uploads_service, algorithms_service, task_process
 from application.repositories import identification_repo
 from application.algorithms.registry import registry as algo_registry
+from application.services.result_store import ResultView
+from application.services.task_executor import get_executor, PRIORITIES, PRIORITY_INTERACTIVE
 
 
 TASK_STATUS_QUEUED = 'queued'
@@ -42,13 +47,26 @@ class IdentificationTask:
     started_at: float = 0.0
     ended_at: float = 0.0
 
-    # result is expected to be a map: {node_id: node_value}
-    result: Optional[Dict[str, Any]] = None
+    # 成功后为 ResultView（列式结果视图，见 result_store），由 load_result 统一读取
+    result: Optional[ResultView] = None
     error: Optional[Dict[str, Any]] = None
 
+    # 结果元数据（如近似算法的模式/样本数/误差界），由 AlgorithmResult.meta 提供
+    result_meta: Optional[Dict[str, Any]] = None
+
+    # 调度优先级：interactive / batch（见 task_executor）
+    priority: str = PRIORITY_INTERACTIVE
+
+    # 结果复用：reuse_key 见 make_reuse_key；reused_from 为提供结果的源任务
+    # （排队中表示正在等待源任务完成，成功后结果从源任务读取）
+    reuse_key: Optional[str] = None
+    reused_from: Optional[str] = None
+
 
 _tasks_lock = threading.Lock()
 _tasks: Dict[str, IdentificationTask] = {}
+# worker 领取的任务 -> 领取它的 worker_id（TASK_QUEUE=db），写 DB 时据此校验租约仍归本 worker
+_task_owners: Dict[str, str] = {}
 
 
 def _now() -> float:
@@ -56,12 +74,123 @@ def _now() -> float:
 
 
 def task_to_public_dict(task: IdentificationTask) -> Dict[str, Any]:
-    d = asdict(task)
+    d = asdict(replace(task, result=None))
+    d['reused_from'] = public_reused_from(task)
     if task.status != TASK_STATUS_SUCCEEDED:
-        d['result'] = None
+        d['result_meta'] = None
+    elif isinstance(task.result, ResultView):
+        d['result'] = task.result.to_dict()
+    d.update(queue_info(task))
     return d
 
 
+def public_reused_from(task: IdentificationTask) -> Optional[str]:
+    """对外展示的 reused_from：只有源任务属于同一用户时才返回。
+
+    复用按文件内容跨用户生效，源任务可能属于其他用户；其 task_id 只在内部用于读取结果，不对外暴露。
+    """
+    if not task.reused_from:
+        return None
+    with _tasks_lock:
+        source = _tasks.get(task.reused_from)
+        owner = source.user_id if source is not None else None
+    if owner is None:
+        try:
+            row = identification_repo.get_task_by_id(task.reused_from)
+            owner = row.get('user_id') if row else None
+        except Exception:
+            owner = None
+    if owner is None or int(owner) != int(task.user_id):
+        return None
+    return task.reused_from
+
+
+def queue_info(task: IdentificationTask) -> Dict[str, Any]:
+    """排队中任务的 queue_position / eta_seconds（其他状态为 None）。
+
+    TASK_QUEUE=db 时位置来自 DB 队列（跨所有 worker），不估算 eta。
+    """
+    info = None
+    if task.status == TASK_STATUS_QUEUED and not task.reused_from:
+        try:
+            if db_queue_enabled():
+                ahead = identification_repo.count_queued_ahead(task.task_id)
+                if ahead is not None:
+                    info = {'queue_position': ahead + 1, 'eta_seconds': None}
+            else:
+                info = get_executor().queue_info(task.task_id)
+        except Exception:
+            info = None
+    return info or {'queue_position': None, 'eta_seconds': None}
+
+
+def db_queue_enabled() -> bool:
+    """TASK_QUEUE=db：任务只落库排队，由独立 worker（python -m application.worker）领取执行。"""
+    try:
+        return (current_app.config.get('TASK_QUEUE') or 'memory') == 'db'
+    except RuntimeError:
+        return False
+
+
+# 从 DB 读出的结果视图的小型 LRU（分页/报告会对同一任务反复读取）
+_RESULT_CACHE_SIZE = 8
+_result_cache_lock = threading.Lock()
+_result_cache: 'OrderedDict[str, Tuple[ResultView, Optional[Dict[str, Any]]]]' = OrderedDict()
+
+
+def load_result(task: IdentificationTask) -> Tuple[ResultView, Optional[Dict[str, Any]]]:
+    """读取任务结果：(ResultView, result_meta)。
+
+    优先内存任务，其次 DB：有列式 result_blob 时按需解压，否则兼容旧的 JSON 结果。
+    复用结果的任务（reused_from）没有自己的结果行时读取源任务的结果。
+    读取失败时返回空视图。
+    """
+    if isinstance(task.result, ResultView):
+        return task.result, task.result_meta
+    if isinstance(task.result, dict):
+        return ResultView.from_dict(task.result), task.result_meta
+
+    with _result_cache_lock:
+        cached = _result_cache.get(task.task_id)
+        if cached is not None:
+            _result_cache.move_to_end(task.task_id)
+            return cached
+
+    view, meta = ResultView.from_dict({}), task.result_meta
+    try:
+        row = identification_repo.get_task_result(task.task_id) or {}
+        if not row and task.reused_from:
+            with _tasks_lock:
+                source = _tasks.get(task.reused_from)
+                shared = (source.result, source.result_meta) if source is not None else None
+            if shared is not None and isinstance(shared[0], ResultView):
+                return shared
+            row = identification_repo.get_task_result(task.reused_from) or {}
+        raw_meta = row.get('meta')
+        if isinstance(raw_meta, (str, bytes)):
+            meta = json.loads(raw_meta)
+        elif isinstance(raw_meta, dict):
+            meta = raw_meta
+
+        blob = row.get('result_blob')
+        if blob:
+            view = ResultView.from_bytes(blob)
+        else:
+            raw = row.get('result')
+            if isinstance(raw, (str, bytes)):
+                raw = json.loads(raw)
+            if isinstance(raw, dict):
+                view = ResultView.from_dict(raw)
+    except Exception:
+        return view, meta
+
+    with _result_cache_lock:
+        _result_cache[task.task_id] = (view, meta)
+        while len(_result_cache) > _RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    return view, meta
+
+
 def _normalize_list_items(items):
     normalized = []
     for it in items:
@@ -140,43 +269,49 @@ def get_task(task_id: str) -> Optional[IdentificationTask]:
         row = identification_repo.get_task_by_id(task_id)
         if not row:
             return None
-
-        # mysql-connector 对 JSON 字段可能返回 str/bytes
-        params = row.get('params') or {}
-        if isinstance(params, (str, bytes)):
-            import json
-            params = json.loads(params)
-
-        error = row.get('error')
-        if isinstance(error, (str, bytes)):
-            import json
-            error = json.loads(error)
-
-        task = IdentificationTask(
-            task_id=row.get('task_id'),
-            user_id=int(row.get('user_id')),
-            file_id=int(row.get('file_id')),
-            algorithm_key=row.get('algorithm_key') or '',
-            params=params or {},
-            status=row.get('status') or TASK_STATUS_QUEUED,
-            progress=int(row.get('progress') or 0),
-            stage=row.get('stage') or '',
-            message=row.get('message') or '',
-            created_at=0.0,
-            started_at=0.0,
-            ended_at=0.0,
-            result=None,
-            error=error,
-        )
-        # 这里直接把 datetime 透传到对象属性，供蓝图返回
-        task.created_at = row.get('created_at')
-        task.started_at = row.get('started_at')
-        task.ended_at = row.get('ended_at')
-        return task
+        return _task_from_row(row)
     except Exception:
         return None
 
 
+def _task_from_row(row: Dict[str, Any]) -> IdentificationTask:
+    # mysql-connector 对 JSON 字段可能返回 str/bytes
+    params = row.get('params') or {}
+    if isinstance(params, (str, bytes)):
+        import json
+        params = json.loads(params)
+
+    error = row.get('error')
+    if isinstance(error, (str, bytes)):
+        import json
+        error = json.loads(error)
+
+    task = IdentificationTask(
+        task_id=row.get('task_id'),
+        user_id=int(row.get('user_id')),
+        file_id=int(row.get('file_id')),
+        algorithm_key=row.get('algorithm_key') or '',
+        params=params or {},
+        status=row.get('status') or TASK_STATUS_QUEUED,
+        progress=int(row.get('progress') or 0),
+        stage=row.get('stage') or '',
+        message=row.get('message') or '',
+        created_at=0.0,
+        started_at=0.0,
+        ended_at=0.0,
+        result=None,
+        error=error,
+        priority=row.get('priority') or PRIORITY_INTERACTIVE,
+        reuse_key=row.get('reuse_key'),
+        reused_from=row.get('reused_from'),
+    )
+    # 这里直接把 datetime 透传到对象属性，供蓝图返回
+    task.created_at = row.get('created_at')
+    task.started_at = row.get('started_at')
+    task.ended_at = row.get('ended_at')
+    return task
+
+
 def _can_use_upload(current_user_id: int, upload_row: Dict[str, Any]) -> bool:
     """判断当前用户是否允许使用该文件。
 
@@ -194,6 +329,65 @@ def _can_use_upload(current_user_id: int, upload_row: Dict[str, Any]) -> bool:
         return False
 
 
+# 只影响并行切分方式、不改变结果口径的参数，不参与复用键
+_EXECUTION_PARAMS = frozenset(('workers', 'chunk_size'))
+
+# 进程内串行化“查找可复用任务 + 建任务”，保证并发的相同请求只执行一次
+_reuse_lock = threading.Lock()
+# 源任务 -> 等待其结果的任务（内存队列模式；DB 队列模式以 reused_from 列为准）
+_followers: Dict[str, List[str]] = {}
+
+
+def make_reuse_key(content_hash: str, algorithm_key: str, params: Optional[Dict[str, Any]], version: str) -> str:
+    """结果复用键：文件内容哈希 + 算法 + 规范化参数 + 算法实现版本 的 sha256。"""
+    canonical = {str(k): v for k, v in (params or {}).items() if str(k) not in _EXECUTION_PARAMS}
+    payload = json.dumps(
+        [content_hash, algorithm_key, canonical, str(version)],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _task_reuse_key(app, upload_row: Dict[str, Any], algorithm_key: str, params: Optional[Dict[str, Any]]) -> Optional[str]:
+    """计算任务的复用键；文件或算法实现不可用时返回 None（不复用，照常执行并由 _run_task 报错）。"""
+    spec = algo_registry.get_by_key(algorithm_key)
+    stored_name = upload_row.get('stored_name')
+    if spec is None or not stored_name:
+        return None
+    abs_path = os.path.join(app.config.get('UPLOAD_FOLDER') or '', stored_name)
+    if not os.path.exists(abs_path):
+        return None
+    sha = uploads_service.ensure_content_hash(upload_row, abs_path)
+    if not sha:
+        return None
+    return make_reuse_key(sha, algorithm_key, params, spec.version)
+
+
+def _find_reusable(reuse_key: str, use_db_queue: bool) -> Optional[Tuple[str, str]]:
+    """查找可复用的任务：(task_id, status)。优先本进程内存中的任务，其次 DB。"""
+    with _tasks_lock:
+        active = None
+        for t in _tasks.values():
+            if t.reuse_key != reuse_key or t.reused_from:
+                continue
+            if t.status == TASK_STATUS_SUCCEEDED and isinstance(t.result, ResultView):
+                return t.task_id, t.status
+            if active is None and t.status in (TASK_STATUS_QUEUED, TASK_STATUS_RUNNING):
+                active = (t.task_id, t.status)
+    if active is not None and not use_db_queue:
+        return active
+    try:
+        row = identification_repo.find_reusable_task(reuse_key)
+    except Exception:
+        row = None
+    if row:
+        status = row.get('status')
+        # 内存队列模式下 DB 中排队/运行中但不在本进程内存里的任务不会再执行（如进程已重启），不能等待它
+        if status == TASK_STATUS_SUCCEEDED or use_db_queue:
+            return row.get('task_id'), status
+    return active
+
+
 def create_task(
     app,
     user_id: int,
@@ -201,12 +395,22 @@ def create_task(
     algorithm_key: str,
     params: Optional[Dict[str, Any]] = None,
     actor_meta: Optional[Dict[str, Any]] = None,
+    priority: Optional[str] = None,
+    reuse: bool = True,
 ) -> IdentificationTask:
     """创建异步识别任务（方案2：algo_key）。
 
     注意：后台线程执行需要 Flask application context，因此必须传入 app 实例。
+    任务交给 task_executor 排队执行（全局/单用户并发上限，priority 为 interactive 或 batch）。
+    reuse=True 时，文件内容、算法、参数、算法版本都相同的任务已有结果则直接成功（reused_from 指向源任务），
+    正在执行中则等待它完成后共享结果，不重复计算。复用跨用户生效（前提是本用户可使用该文件，见上方校验），
+    源任务属于其他用户时其 task_id 不出现在返回与日志中（见 public_reused_from）。
     记录审计日志：TASK_CREATE（success/fail）。
     """
+    priority = str(priority or PRIORITY_INTERACTIVE).strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError('priority 只能为 interactive 或 batch')
+
     # 同步校验：文件权限（public 或 owner；admin 全放开）
     try:
         upload_row = uploads_service.get_upload_record(file_id)
@@ -253,29 +457,34 @@ def create_task(
         stage='queued',
         message='任务已创建，等待执行',
         created_at=_now(),
+        priority=priority,
     )
 
-    with _tasks_lock:
-        _tasks[t.task_id] = t
-
-    # 持久化：写入任务记录（用于历史列表/重启后可查询）
-    try:
-        identification_repo.create_task_record({
-            'task_id': t.task_id,
-            'user_id': t.user_id,
-            'file_id': t.file_id,
-            'algorithm_key': t.algorithm_key,
-            'params': t.params,
-            'status': t.status,
-            'progress': t.progress,
-            'stage': t.stage,
-            'message': t.message,
-            'error': t.error,
-            'created_at': t.created_at,
-        })
-    except Exception:
-        # 不影响任务创建与执行
-        pass
+    use_db_queue = db_queue_enabled()
+    if reuse:
+        try:
+            t.reuse_key = _task_reuse_key(app, upload_row, t.algorithm_key, t.params)
+        except Exception:
+            t.reuse_key = None
+
+    if t.reuse_key:
+        # 查找与建任务在同一把锁内完成：并发提交的相同任务只有第一个会真正执行
+        with _reuse_lock:
+            hit = _find_reusable(t.reuse_key, use_db_queue)
+            if hit:
+                t.reused_from, source_status = hit
+                if source_status == TASK_STATUS_SUCCEEDED:
+                    t.status = TASK_STATUS_SUCCEEDED
+                    t.progress = 100
+                    t.stage = 'succeeded'
+                    t.message = '复用相同任务的结果'
+                    t.started_at = t.ended_at = t.created_at
+                else:
+                    t.stage = 'waiting'
+                    t.message = '相同任务正在执行，完成后直接复用其结果'
+            _save_new_task(t, use_db_queue)
+    else:
+        _save_new_task(t, use_db_queue)
 
     # TASK_CREATE 审计日志（成功）
     try:
@@ -296,17 +505,146 @@ def create_task(
                     'algorithm_key': t.algorithm_key,
                     'params': safe_params,
                 },
+                'extra': _reuse_log_extra(t),
                 'actor': actor_meta or {},
             }),
         )
     except Exception:
         pass
 
-    th = threading.Thread(target=_run_task, args=(app, t.task_id), daemon=True)
-    th.start()
+    if not use_db_queue and t.status == TASK_STATUS_QUEUED and not t.reused_from:
+        _submit(app, t)
+    return t
+
+
+def _reuse_log_extra(t: IdentificationTask) -> Dict[str, Any]:
+    """TASK_CREATE 日志的复用信息：源任务属于其他用户时只记录发生了复用，不记录其 task_id。"""
+    if not t.reused_from:
+        return {}
+    own = public_reused_from(t)
+    return {'reused_from': own} if own else {'reused': True}
+
+
+def _submit(app, t: IdentificationTask) -> None:
+    get_executor(app.config).submit(
+        t.task_id,
+        t.user_id,
+        lambda: _run_task(app, t.task_id),
+        priority=t.priority,
+        kind=t.algorithm_key,
+    )
+
+
+def _save_new_task(t: IdentificationTask, use_db_queue: bool) -> None:
+    """登记新任务：内存队列模式放入 _tasks，并写入任务记录（TASK_QUEUE=db 时即入队）。"""
+    if not use_db_queue:
+        with _tasks_lock:
+            _tasks[t.task_id] = t
+            if t.reused_from and t.status == TASK_STATUS_QUEUED:
+                _followers.setdefault(t.reused_from, []).append(t.task_id)
+
+    # 持久化：写入任务记录（用于历史列表/重启后可查询；TASK_QUEUE=db 时即入队）
+    record = {
+        'task_id': t.task_id,
+        'user_id': t.user_id,
+        'file_id': t.file_id,
+        'algorithm_key': t.algorithm_key,
+        'params': t.params,
+        'status': t.status,
+        'progress': t.progress,
+        'stage': t.stage,
+        'message': t.message,
+        'error': t.error,
+        'created_at': t.created_at,
+        'priority': t.priority,
+        'reuse_key': t.reuse_key,
+        'reused_from': t.reused_from,
+    }
+    try:
+        identification_repo.create_task_record(record)
+    except Exception:
+        if use_db_queue:
+            # DB 队列模式下落库失败即入队失败
+            raise
+        # 兼容未执行迁移（缺少 priority / 复用列）的库；仍失败时不影响任务创建与执行
+        try:
+            for k in ('priority', 'reuse_key', 'reused_from'):
+                record.pop(k, None)
+            identification_repo.create_task_record(record)
+        except Exception:
+            pass
+    if t.status == TASK_STATUS_SUCCEEDED:
+        try:
+            identification_repo.update_task_record(t.task_id, {'started_at': t.started_at, 'ended_at': t.ended_at})
+        except Exception:
+            pass
+
+
+def _settle_followers(app, task_id: str) -> None:
+    """源任务结束后处理等待它的任务：成功则共享结果直接完成，否则各自独立执行。"""
+    # 与 create_task 的查找共用 _reuse_lock：源任务结束后不会再有新的等待者登记进来
+    with _reuse_lock, _tasks_lock:
+        source = _tasks.get(task_id)
+        followers = _followers.pop(task_id, [])
+    succeeded = bool(source and source.status == TASK_STATUS_SUCCEEDED)
+    try:
+        identification_repo.settle_followers(task_id, succeeded)
+    except Exception:
+        pass
+
+    now = _now()
+    with _tasks_lock:
+        waiting = [_tasks[fid] for fid in followers if fid in _tasks and _tasks[fid].status == TASK_STATUS_QUEUED]
+        for f in waiting:
+            if succeeded:
+                f.status = TASK_STATUS_SUCCEEDED
+                f.progress = 100
+                f.stage = 'succeeded'
+                f.message = '复用相同任务的结果'
+                f.started_at = f.ended_at = now
+                f.result = source.result
+                f.result_meta = source.result_meta
+                f.error = None
+            else:
+                f.reused_from = None
+                f.stage = 'queued'
+                f.message = '相同任务未成功，改为独立执行'
+    if not succeeded:
+        for f in waiting:
+            _submit(app, f)
+
+
+def register_claimed_task(row: Dict[str, Any]) -> IdentificationTask:
+    """worker 领取 DB 任务后登记为本进程的内存任务，供 _run_task 执行与取消检查。"""
+    t = _task_from_row(row)
+    t.created_at = _now()
+    t.started_at = 0.0
+    t.ended_at = 0.0
+    with _tasks_lock:
+        _tasks[t.task_id] = t
+        if row.get('worker_id'):
+            _task_owners[t.task_id] = row['worker_id']
     return t
 
 
+def release_task(task_id: str) -> None:
+    """worker 执行结束后移除内存任务（状态以 DB 为准）。"""
+    with _tasks_lock:
+        _tasks.pop(task_id, None)
+        _task_owners.pop(task_id, None)
+
+
+def abort_local_task(task_id: str, message: str = '任务已取消') -> None:
+    """只在本进程内把任务标记为取消（DB 已是终态或租约已丢失时由 worker 心跳调用）。"""
+    with _tasks_lock:
+        t = _tasks.get(task_id)
+        if t and t.status not in (TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED, TASK_STATUS_CANCELLED):
+            t.status = TASK_STATUS_CANCELLED
+            t.stage = 'cancelled'
+            t.message = message
+            t.ended_at = _now()
+
+
 def delete_task(
     task_id: str,
     user_id: int,
@@ -391,6 +729,45 @@ def delete_task_anyway(
         return False
 
 
+def _dequeue_cancelled(t: IdentificationTask) -> None:
+    """已取消的任务若仍在排队（或在等待复用结果），直接移出队列并落库（不会再进入 _run_task）。"""
+    try:
+        dequeued = get_executor().cancel(t.task_id)
+        if not dequeued and not t.reused_from:
+            return
+        identification_repo.update_task_record(t.task_id, {
+            'status': t.status,
+            'stage': t.stage,
+            'message': t.message,
+            'ended_at': t.ended_at,
+        })
+        if dequeued:
+            # 等待本任务结果的任务改为独立执行
+            _settle_followers(current_app._get_current_object(), t.task_id)
+    except Exception:
+        pass
+
+
+def _cancel_db_task(task_id: str, user_id: Optional[int] = None, message: str = '任务已取消') -> Optional[str]:
+    """TASK_QUEUE=db：取消不在本进程内存中的任务（运行中的由 worker 心跳发现后中止）。
+
+    返回取消前的状态；非 DB 队列模式或任务不存在时返回 None。
+    """
+    if not db_queue_enabled():
+        return None
+    try:
+        prev = identification_repo.cancel_task_record(task_id, user_id=user_id, message=message)
+    except Exception:
+        return None
+    if prev == TASK_STATUS_QUEUED:
+        # 排队中被取消的任务不会再执行，等待它结果的任务改为独立排队
+        try:
+            identification_repo.settle_followers(task_id, False)
+        except Exception:
+            pass
+    return prev
+
+
 def cancel_task(
     task_id: str,
     user_id: int,
@@ -398,16 +775,24 @@ def cancel_task(
 ) -> bool:
     with _tasks_lock:
         t = _tasks.get(task_id)
-        if not t:
-            return False
-        if t.user_id != user_id:
+        if t:
+            if t.user_id != user_id:
+                return False
+            if t.status in (TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED, TASK_STATUS_CANCELLED):
+                return True
+            t.status = TASK_STATUS_CANCELLED
+            t.stage = 'cancelled'
+            t.message = '任务已取消'
+            t.ended_at = _now()
+
+    if t:
+        _dequeue_cancelled(t)
+    else:
+        prev = _cancel_db_task(task_id, user_id=user_id, message='任务已取消')
+        if prev is None:
             return False
-        if t.status in (TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED, TASK_STATUS_CANCELLED):
+        if prev not in (TASK_STATUS_QUEUED, TASK_STATUS_RUNNING):
             return True
-        t.status = TASK_STATUS_CANCELLED
-        t.stage = 'cancelled'
-        t.message = '任务已取消'
-        t.ended_at = _now()
 
     try:
         write_log(
@@ -432,20 +817,28 @@ def cancel_task_anyway(
     actor_user_id: Optional[int] = None,
     actor_meta: Optional[Dict[str, Any]] = None,
 ) -> bool:
-    """管理员强制取消运行中任务（仅内存任务）。
+    """管理员强制取消运行中任务（内存任务；TASK_QUEUE=db 时为 DB 中排队/运行中的任务）。
 
     对于已落库的历史任务：取消的语义不明确（可能已经结束），这里保持仅取消内存任务。
     """
     with _tasks_lock:
         t = _tasks.get(task_id)
-        if not t:
+        if t:
+            if t.status in (TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED, TASK_STATUS_CANCELLED):
+                return True
+            t.status = TASK_STATUS_CANCELLED
+            t.stage = 'cancelled'
+            t.message = '任务已取消(管理员操作)'
+            t.ended_at = _now()
+
+    if t:
+        _dequeue_cancelled(t)
+    else:
+        prev = _cancel_db_task(task_id, message='任务已取消(管理员操作)')
+        if prev is None:
             return False
-        if t.status in (TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED, TASK_STATUS_CANCELLED):
+        if prev not in (TASK_STATUS_QUEUED, TASK_STATUS_RUNNING):
             return True
-        t.status = TASK_STATUS_CANCELLED
-        t.stage = 'cancelled'
-        t.message = '任务已取消(管理员操作)'
-        t.ended_at = _now()
 
     try:
         write_log(
@@ -465,6 +858,54 @@ def cancel_task_anyway(
     return True
 
 
+# 进度落库合并：只含 progress/stage/message 的更新先留在内存（查询走内存任务），
+# 由后台线程每 TASK_PROGRESS_FLUSH_INTERVAL 秒把所有任务的最新进度用一条 UPDATE 写入；
+# 状态变化等其他更新立即落库，并带上该任务尚未写入的进度。
+_PROGRESS_FIELDS = frozenset(('progress', 'stage', 'message'))
+_pending_lock = threading.Lock()
+_pending_progress: Dict[str, Dict[str, Any]] = {}
+# 串行化批量进度写与即时写，避免旧进度晚于终态落库
+_db_write_lock = threading.Lock()
+_flusher_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is not None:
+            return
+        try:
+            interval = float(current_app.config.get('TASK_PROGRESS_FLUSH_INTERVAL') or 1.0)
+        except RuntimeError:
+            interval = 1.0
+        _flusher = threading.Thread(target=_flush_loop, args=(max(0.1, interval),), name='task-progress-flusher', daemon=True)
+        _flusher.start()
+
+
+def _flush_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        flush_progress()
+
+
+def flush_progress() -> None:
+    """把缓存的进度批量写入 DB（失败时丢弃，下一次进度更新会再写）。"""
+    with _db_write_lock:
+        with _pending_lock:
+            batch = dict(_pending_progress)
+            _pending_progress.clear()
+        if not batch:
+            return
+        worker_ids = {tid: f.pop('worker_id') for tid, f in batch.items() if 'worker_id' in f}
+        try:
+            identification_repo.update_task_progress_batch(batch, worker_ids=worker_ids or None)
+        except Exception:
+            pass
+
+
 def _update_task(task_id: str, **kwargs):
     with _tasks_lock:
         t = _tasks.get(task_id)
@@ -473,19 +914,48 @@ def _update_task(task_id: str, **kwargs):
         for k, v in kwargs.items():
             if hasattr(t, k):
                 setattr(t, k, v)
+        worker_id = _task_owners.get(task_id)
+
+    # 纯进度更新：合并后由后台线程批量落库
+    if kwargs and set(kwargs) <= _PROGRESS_FIELDS:
+        with _pending_lock:
+            pending = _pending_progress.setdefault(task_id, {})
+            pending.update(kwargs)
+            if worker_id:
+                pending['worker_id'] = worker_id
+        _ensure_flusher()
+        return
 
     # 持久化：同步到 DB（失败不影响内存任务）
-    try:
-        identification_repo.update_task_record(task_id, kwargs)
-    except Exception:
-        pass
+    with _db_write_lock:
+        with _pending_lock:
+            fields = {**_pending_progress.pop(task_id, {}), **kwargs}
+        fields.pop('worker_id', None)
+        try:
+            if not identification_repo.update_task_record(task_id, fields, worker_id=worker_id):
+                # 租约已不归本 worker（被回收/取消/接手）：不再写入，结果以当前持有者为准
+                return
+        except Exception:
+            pass
 
-    # 若写入成功结果，则 upsert result 表
+    # 若写入成功结果，则 upsert result 表（列式 result_blob；旧库回退为 JSON）
     if 'result' in kwargs and kwargs.get('result') is not None:
+        view = kwargs.get('result')
+        meta = kwargs.get('result_meta')
         try:
-            identification_repo.upsert_task_result(task_id, kwargs.get('result') or {})
+            identification_repo.upsert_task_result(task_id, {}, meta=meta, blob=view.to_bytes())
+            return
         except Exception:
             pass
+        result = view.to_dict()
+        try:
+            identification_repo.upsert_task_result(task_id, result, meta=meta)
+        except Exception:
+            # 兼容未执行迁移（缺少 meta 列）的库：至少保证结果落库
+            try:
+                identification_repo.upsert_task_result(task_id, result)
+            except Exception:
+                pass
 
 
 def _is_cancelled(task_id: str) -> bool:
@@ -495,7 +965,21 @@ def _is_cancelled(task_id: str) -> bool:
 
 
 def _run_task(app, task_id: str):
-    """后台线程执行逻辑。必须在 app.app_context() 下运行。"""
+    """后台线程执行逻辑。必须在 app.app_context() 下运行。
+
+    结束后（无论成败）处理等待复用本任务结果的任务。
+    """
+    try:
+        _execute_task(app, task_id)
+    finally:
+        try:
+            with app.app_context():
+                _settle_followers(app, task_id)
+        except Exception:
+            pass
+
+
+def _execute_task(app, task_id: str):
     try:
         with app.app_context():
             if _is_cancelled(task_id):
@@ -572,17 +1056,47 @@ def _run_task(app, task_id: str):
             def is_cancelled():
                 return _is_cancelled(task_id)
 
-            result = spec.runner(abs_path, task.params or {}, progress_cb, is_cancelled)
-
-            if _is_cancelled(task_id):
-                return
-
-            _update_task(task_id, progress=90, stage='finalizing', message='整理结果')
-            if _is_cancelled(task_id):
-                return
-
-            result_str_keys = {str(k): v for k, v in (result or {}).items()}
-            _update_task(task_id, status=TASK_STATUS_SUCCEEDED, progress=100, stage='succeeded', message='识别完成', ended_at=_now(), result=result_str_keys, error=None)
+            config = current_app.config
+            if (config.get('TASK_ISOLATION') or 'thread') == 'process':
+                # 子进程执行：取消时直接结束进程，崩溃/超限只让本任务失败
+                try:
+                    outcome = task_process.run_in_process(
+                        algo_key, abs_path, task.params or {}, progress_cb, is_cancelled,
+                        memory_mb=int(config.get('TASK_MEMORY_LIMIT_MB') or 0),
+                        cpu_seconds=int(config.get('TASK_CPU_LIMIT_SECONDS') or 0),
+                    )
+                except task_process.TaskProcessError as e:
+                    if _is_cancelled(task_id):
+                        return
+                    _update_task(task_id, status=TASK_STATUS_FAILED, stage='failed', message='计算进程执行失败', ended_at=_now(), progress=100,
+                                 error={'code': e.code, 'message': str(e)})
+                    return
+                if outcome is None or _is_cancelled(task_id):
+                    return
+                result_view, result_meta = outcome
+                _update_task(task_id, progress=90, stage='finalizing', message='整理结果')
+            else:
+                try:
+                    runner = spec.load()
+                except ImportError as e:
+                    _update_task(task_id, status=TASK_STATUS_FAILED, stage='failed', message='算法实现加载失败', ended_at=_now(), progress=100,
+                                 error={'code': 'ALGO_IMPL_IMPORT_FAILED', 'message': str(e)})
+                    return
+
+                result = runner(abs_path, task.params or {}, progress_cb, is_cancelled)
+
+                if _is_cancelled(task_id):
+                    return
+
+                _update_task(task_id, progress=90, stage='finalizing', message='整理结果')
+                if _is_cancelled(task_id):
+                    return
+
+                result_view = ResultView.from_dict({str(k): v for k, v in (result or {}).items()})
+                result_meta = getattr(result, 'meta', None) or None
+                del result
+            _update_task(task_id, status=TASK_STATUS_SUCCEEDED, progress=100, stage='succeeded', message='识别完成', ended_at=_now(),
+                         result=result_view, result_meta=result_meta, error=None)
 
             # TASK_STATUS_CHANGE（终态成功）
             try:
@@ -0,0 +1,195 @@
+"""识别结果的列式存储与只读视图。
+
+runner 的结果 {node_id: score} 不再整体序列化为 JSON，而是编码为压缩 npz（identification_task_results.result_blob）：
+- ids    升序的节点 id：全部为规范整数字符串时存 int64，否则存 unicode 数组
+- scores float64，与 ids 对齐（保持 JSON 时代的精度，排序与报告数值不变）
+- rank   按分数降序的下标（stable：同分按节点 id 升序，NaN 排在最后）
+
+ResultView 在这些数组上提供 top_k / get / page / iter_items，数组在首次访问时才解压，
+不需要构造完整的 dict。旧数据（只有 JSON 结果）由 ResultView.from_dict 兼容。
+iter_ndjson / iter_csv 按块编码为下载流，单次请求的额外内存只与块大小有关。
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+RESULT_FORMAT = 1
+
+ORDER_DESC = 'desc'
+ORDER_ASC = 'asc'
+
+
+class ResultView:
+    """识别结果的只读视图（节点 id 一律以字符串返回，分数为 float）。"""
+
+    def __init__(self, ids: np.ndarray = None, scores: np.ndarray = None, rank: np.ndarray = None, npz=None):
+        self._npz = npz
+        self._ids = ids
+        self._scores = scores
+        self._rank = rank
+
+    # ---------- 构建 ----------
+
+    @classmethod
+    def from_dict(cls, result: Dict[str, Any]) -> 'ResultView':
+        """由 {node_id: score} 构建；分数不是数值时抛 ValueError/TypeError。"""
+        keys = [str(k) for k in (result or {}).keys()]
+        scores = np.fromiter((float(v) for v in (result or {}).values()), dtype=np.float64, count=len(keys))
+        ids = np.array(keys, dtype=str) if keys else np.zeros(0, dtype=np.int64)
+        if len(keys):
+            try:
+                as_int = ids.astype(np.int64)
+                if np.array_equal(as_int.astype(str), ids):
+                    ids = as_int
+            except (ValueError, OverflowError):
+                pass
+        perm = np.argsort(ids, kind='stable')
+        ids, scores = ids[perm], scores[perm]
+        rank = np.argsort(-scores, kind='stable')
+        return cls(ids=ids, scores=scores, rank=rank)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'ResultView':
+        npz = np.load(io.BytesIO(bytes(blob)), allow_pickle=False)
+        if int(npz['format']) != RESULT_FORMAT:
+            raise ValueError(f"不支持的结果格式版本: {int(npz['format'])}")
+        return cls(npz=npz)
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez_compressed(buf, format=np.int64(RESULT_FORMAT), ids=self.ids, scores=self.scores, rank=self.rank)
+        return buf.getvalue()
+
+    # ---------- 列（惰性解压） ----------
+
+    @property
+    def ids(self) -> np.ndarray:
+        if self._ids is None:
+            self._ids = self._npz['ids']
+        return self._ids
+
+    @property
+    def scores(self) -> np.ndarray:
+        if self._scores is None:
+            self._scores = self._npz['scores']
+        return self._scores
+
+    @property
+    def rank(self) -> np.ndarray:
+        if self._rank is None:
+            self._rank = self._npz['rank']
+        return self._rank
+
+    def __len__(self) -> int:
+        return int(len(self.scores))
+
+    # ---------- 查询 ----------
+
+    def _rows(self, idx: np.ndarray) -> List[Tuple[str, float]]:
+        ids = self.ids[idx]
+        ids = ids.astype(str) if ids.dtype.kind != 'U' else ids
+        return list(zip(ids.tolist(), self.scores[idx].tolist()))
+
+    def _ordered(self, order: str) -> np.ndarray:
+        if order == ORDER_ASC:
+            return self.rank[::-1]
+        if order == ORDER_DESC:
+            return self.rank
+        raise ValueError(f'order 只能为 {ORDER_DESC} 或 {ORDER_ASC}')
+
+    def top_k(self, k: int, order: str = ORDER_DESC) -> List[Tuple[str, float]]:
+        """按分数排序的前 k 个 (node_id, score)。"""
+        return self._rows(self._ordered(order)[:max(0, int(k))])
+
+    def page(self, offset: int, limit: int, order: str = ORDER_DESC) -> List[Tuple[str, float]]:
+        offset = max(0, int(offset))
+        return self._rows(self._ordered(order)[offset:offset + max(0, int(limit))])
+
+    def position(self, node_id: Any) -> Optional[int]:
+        """节点在 ids 中的下标；不存在时返回 None。"""
+        ids = self.ids
+        key = str(node_id)
+        if ids.dtype.kind != 'U':
+            try:
+                v = int(key)
+            except ValueError:
+                return None
+            if str(v) != key:
+                return None
+            key = v
+        i = int(np.searchsorted(ids, key))
+        if i < len(ids) and ids[i] == key:
+            return i
+        return None
+
+    def get(self, node_id: Any, default: Optional[float] = None) -> Optional[float]:
+        i = self.position(node_id)
+        return default if i is None else float(self.scores[i])
+
+    def lookup(self, node_ids: List[Any]) -> List[Tuple[str, float]]:
+        """按给定节点取分数（不存在的节点跳过），保持请求顺序。"""
+        out = []
+        for nid in node_ids:
+            i = self.position(nid)
+            if i is not None:
+                out.append((str(nid), float(self.scores[i])))
+        return out
+
+    def iter_chunks(self, order: str = ORDER_DESC, chunk_size: int = 10000) -> Iterator[List[Tuple[str, float]]]:
+        """按排序逐块产出 [(node_id, score), ...]，内存只与 chunk_size 有关。"""
+        ordered = self._ordered(order)
+        chunk_size = max(1, int(chunk_size))
+        for start in range(0, len(ordered), chunk_size):
+            yield self._rows(ordered[start:start + chunk_size])
+
+    def iter_items(self, order: str = ORDER_DESC, chunk_size: int = 10000) -> Iterator[Tuple[str, float]]:
+        for rows in self.iter_chunks(order=order, chunk_size=chunk_size):
+            yield from rows
+
+    def sorted_scores(self, order: str = ORDER_DESC) -> np.ndarray:
+        """排序后的分数数组（去掉 NaN）。"""
+        s = self.scores[self._ordered(order)]
+        return s[~np.isnan(s)]
+
+    def to_dict(self, order: str = ORDER_DESC) -> Dict[str, float]:
+        return dict(self.iter_items(order=order))
+
+
+# ---------------- 下载流 ----------------
+
+def _json_score(v: float) -> Optional[float]:
+    return None if math.isnan(v) or math.isinf(v) else v
+
+
+def iter_ndjson(view: ResultView, order: str = ORDER_DESC, chunk_size: int = 10000) -> Iterator[bytes]:
+    """NDJSON：每行 {"rank", "node_id", "score"}，rank 从 1 开始（按 order 的位置）。"""
+    rank = 0
+    for rows in view.iter_chunks(order=order, chunk_size=chunk_size):
+        lines = []
+        for node_id, score in rows:
+            rank += 1
+            lines.append(json.dumps({'rank': rank, 'node_id': node_id, 'score': _json_score(score)}, ensure_ascii=False))
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_csv(view: ResultView, order: str = ORDER_DESC, chunk_size: int = 10000) -> Iterator[bytes]:
+    """CSV：表头 rank,node_id,score（utf-8-sig，与审计日志导出一致，Excel 可直接打开）。"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(['rank', 'node_id', 'score'])
+    yield buf.getvalue().encode('utf-8-sig')
+    rank = 0
+    for rows in view.iter_chunks(order=order, chunk_size=chunk_size):
+        buf.seek(0)
+        buf.truncate()
+        for node_id, score in rows:
+            rank += 1
+            writer.writerow([rank, node_id, repr(score)])
+        yield buf.getvalue().encode('utf-8')
@@ -0,0 +1,208 @@
+"""识别任务执行器：有界并发 + 用户间加权公平排队 + 优先级。
+
+原来每个任务一个 daemon 线程，没有上限；这里改为固定数量的工作线程从调度队列取任务：
+- 全局并发上限 max_workers（Config.TASK_MAX_WORKERS）；
+- 单用户并发上限 per_user_limit（Config.TASK_PER_USER_LIMIT），超出的任务留在队列里，
+  不占用工作线程，其他用户的任务可以越过它先执行；
+- 优先级：interactive 先于 batch；batch 等待超过 batch_max_wait 秒后按 interactive 参与调度，避免饿死；
+- 同一优先级内按用户做加权公平排队（WFQ）：每个任务入队时得到虚拟完成时间
+  tag = max(V, 该用户上一个 tag) + 1/weight，按 tag 从小到大派发（V 为最近派发任务的 tag），
+  所以一次性提交很多任务的用户不会挤占其他用户。
+
+queue_info 给出排队位置与预计开始时间：按算法的历史耗时（指数滑动平均）估算排在前面的任务
+与正在运行任务的剩余时间，再除以并发数，只用于展示。
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+# 没有历史耗时时的默认估计（秒）
+DEFAULT_ESTIMATE_SECONDS = 30.0
+_EMA_ALPHA = 0.3
+
+
+@dataclass
+class _Entry:
+    task_id: str
+    user_id: int
+    fn: Callable[[], Any]
+    priority: str
+    kind: str
+    tag: float
+    seq: int
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+
+
+class TaskExecutor:
+    def __init__(
+        self,
+        max_workers: int = 2,
+        per_user_limit: int = 1,
+        batch_max_wait: float = 300.0,
+    ):
+        self.max_workers = max(1, int(max_workers))
+        self.per_user_limit = max(1, int(per_user_limit))
+        self.batch_max_wait = float(batch_max_wait)
+
+        self._cond = threading.Condition()
+        self._queue: List[_Entry] = []
+        self._running: Dict[str, _Entry] = {}
+        self._user_running: Dict[int, int] = {}
+        self._user_tag: Dict[int, float] = {}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._durations: Dict[str, float] = {}
+        self._threads: List[threading.Thread] = []
+
+    # ---------- 提交/取消 ----------
+
+    def submit(
+        self,
+        task_id: str,
+        user_id: int,
+        fn: Callable[[], Any],
+        priority: str = PRIORITY_INTERACTIVE,
+        kind: str = '',
+        weight: float = 1.0,
+    ) -> None:
+        """排队执行 fn()；kind 用于耗时统计（一般为 algorithm_key），weight 为用户权重。"""
+        if priority not in PRIORITIES:
+            priority = PRIORITY_INTERACTIVE
+        with self._cond:
+            self._ensure_threads()
+            start = max(self._vtime, self._user_tag.get(user_id, 0.0))
+            tag = start + 1.0 / max(float(weight or 1.0), 1e-6)
+            self._user_tag[user_id] = tag
+            self._queue.append(_Entry(task_id, user_id, fn, priority, kind, tag, next(self._seq)))
+            self._cond.notify_all()
+
+    def cancel(self, task_id: str) -> bool:
+        """把仍在排队的任务移出队列；已开始的任务返回 False（由任务自身检查取消标记）。"""
+        with self._cond:
+            for i, e in enumerate(self._queue):
+                if e.task_id == task_id:
+                    del self._queue[i]
+                    return True
+        return False
+
+    # ---------- 调度 ----------
+
+    def _sort_key(self, e: _Entry, now: float):
+        aged = e.priority == PRIORITY_BATCH and now - e.enqueued_at >= self.batch_max_wait
+        cls = 0 if (e.priority == PRIORITY_INTERACTIVE or aged) else 1
+        return cls, e.tag, e.seq
+
+    def _ordered(self, now: float) -> List[_Entry]:
+        return sorted(self._queue, key=lambda e: self._sort_key(e, now))
+
+    def _pick(self) -> Optional[_Entry]:
+        """取下一个可执行任务（调用方持有锁）：跳过已达并发上限的用户。"""
+        if len(self._running) >= self.max_workers:
+            return None
+        for e in self._ordered(time.time()):
+            if self._user_running.get(e.user_id, 0) < self.per_user_limit:
+                self._queue.remove(e)
+                return e
+        return None
+
+    def _ensure_threads(self) -> None:
+        while len(self._threads) < self.max_workers:
+            th = threading.Thread(target=self._worker, name=f'task-executor-{len(self._threads)}', daemon=True)
+            self._threads.append(th)
+            th.start()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                e = self._pick()
+                while e is None:
+                    self._cond.wait(timeout=5.0)
+                    e = self._pick()
+                e.started_at = time.time()
+                self._vtime = max(self._vtime, e.tag)
+                self._running[e.task_id] = e
+                self._user_running[e.user_id] = self._user_running.get(e.user_id, 0) + 1
+            try:
+                e.fn()
+            except Exception:
+                # 任务自身负责记录失败状态，这里只保证工作线程不退出
+                pass
+            finally:
+                with self._cond:
+                    self._running.pop(e.task_id, None)
+                    left = self._user_running.get(e.user_id, 1) - 1
+                    if left > 0:
+                        self._user_running[e.user_id] = left
+                    else:
+                        self._user_running.pop(e.user_id, None)
+                    self._record_duration(e.kind, time.time() - e.started_at)
+                    self._cond.notify_all()
+
+    # ---------- 统计 ----------
+
+    def _record_duration(self, kind: str, seconds: float) -> None:
+        prev = self._durations.get(kind)
+        self._durations[kind] = seconds if prev is None else (1 - _EMA_ALPHA) * prev + _EMA_ALPHA * seconds
+
+    def _estimate(self, kind: str) -> float:
+        return self._durations.get(kind, DEFAULT_ESTIMATE_SECONDS)
+
+    def queue_info(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """排队中任务的 {queue_position(从 1 开始), eta_seconds(预计开始等待秒数)}；不在队列中返回 None。"""
+        with self._cond:
+            now = time.time()
+            ordered = self._ordered(now)
+            for pos, e in enumerate(ordered):
+                if e.task_id != task_id:
+                    continue
+                busy = sum(max(0.0, self._estimate(r.kind) - (now - r.started_at)) for r in self._running.values())
+                ahead = sum(self._estimate(a.kind) for a in ordered[:pos])
+                return {
+                    'queue_position': pos + 1,
+                    'eta_seconds': round((busy + ahead) / self.max_workers, 1),
+                }
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'max_workers': self.max_workers,
+                'per_user_limit': self.per_user_limit,
+                'running': len(self._running),
+                'queued': len(self._queue),
+                'queued_by_priority': {p: sum(1 for e in self._queue if e.priority == p) for p in PRIORITIES},
+            }
+
+
+_executor: Optional[TaskExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(config: Optional[Dict[str, Any]] = None) -> TaskExecutor:
+    """进程内单例；首次调用时按 config（缺省为 current_app.config）的 TASK_* 配置创建。"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if config is None:
+                    try:
+                        from flask import current_app
+                        config = current_app.config
+                    except RuntimeError:
+                        config = {}
+                _executor = TaskExecutor(
+                    max_workers=int(config.get('TASK_MAX_WORKERS') or 2),
+                    per_user_limit=int(config.get('TASK_PER_USER_LIMIT') or 1),
+                    batch_max_wait=float(config.get('TASK_BATCH_MAX_WAIT') or 300),
+                )
+    return _executor
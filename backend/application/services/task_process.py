@@ -0,0 +1,210 @@
+"""在独立子进程中执行算法 runner（TASK_ISOLATION=process）。
+
+线程内执行时取消只是置位标记，不检查标记的内核（如 nx.betweenness_centrality）会一直跑完；
+内存失控的任务还可能让整个 Web 进程被 OOM kill。这里每个任务一个子进程：
+- 子进程启动后自成进程组，并设置 RLIMIT_AS（内存）/ RLIMIT_CPU（CPU 秒）；rlimit 按进程生效，
+  设置了限制时 runner 固定 workers=1（不再起算法进程池），限制即整个任务的上限；
+- 进度经 Pipe 回传，结果编码为列式 npz 写入临时文件，父进程读回 ResultView；
+- 取消时父进程直接 SIGKILL 整个进程组（包括 runner 内部的进程池）；
+- 子进程崩溃/超限只让该任务失败，Web 进程不受影响；Web 进程退出时子进程随之结束。
+
+子进程用 spawn 启动（Web 进程是多线程的，fork 可能继承被其他线程持有的锁），
+不需要 Flask app context（算法包本身不依赖 Flask）。
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from application.services.result_store import ResultView
+
+# 父进程轮询 Pipe / 取消标记的间隔（秒）
+POLL_INTERVAL = 0.2
+
+
+class TaskProcessError(Exception):
+    """子进程执行失败；code 与任务 error.code 口径一致。"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def _apply_limits(memory_mb: int, cpu_seconds: int) -> None:
+    try:
+        import resource
+    except ImportError:
+        return
+    if memory_mb and memory_mb > 0:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds and cpu_seconds > 0:
+        # 软限制到期收到 SIGXCPU，硬限制再留 5 秒余量后 SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 5))
+
+
+def _watch_parent(parent_pid: int) -> None:
+    """父进程（Web 进程）退出后结束本进程组，避免留下无人回收的计算进程。"""
+    while True:
+        time.sleep(1.0)
+        if os.getppid() != parent_pid:
+            try:
+                os.killpg(os.getpgrp(), signal.SIGKILL)
+            except (AttributeError, OSError):
+                os._exit(1)
+
+
+def _child_main(conn, algo_key: str, abs_path: str, params: Dict[str, Any], result_path: str,
+                memory_mb: int, cpu_seconds: int, parent_pid: int) -> None:
+    """子进程入口（模块级，spawn 需要可 pickle）。"""
+    try:
+        os.setpgrp()
+    except (AttributeError, OSError):
+        pass
+    threading.Thread(target=_watch_parent, args=(parent_pid,), daemon=True).start()
+
+    def send(*msg):
+        try:
+            conn.send(msg)
+        except Exception:
+            pass
+
+    try:
+        _apply_limits(memory_mb, cpu_seconds)
+
+        from application.algorithms.registry import registry
+
+        spec = registry.get_by_key(algo_key)
+        if spec is None:
+            send('error', 'ALGO_IMPL_NOT_FOUND', f'算法实现未注册: algo_key={algo_key}')
+            return
+        try:
+            runner = spec.load()
+        except ImportError as e:
+            send('error', 'ALGO_IMPL_IMPORT_FAILED', str(e))
+            return
+
+        def progress_cb(p: int, stage: str = 'computing', msg: str = ''):
+            send('progress', p, stage, msg)
+
+        if (memory_mb and memory_mb > 0) or (cpu_seconds and cpu_seconds > 0):
+            # 进程池的子进程各自拿到一份完整限制，会让任务总用量超出限制
+            params = {**(params or {}), 'workers': 1}
+
+        # 取消由父进程直接结束进程组，子进程内永远视为未取消
+        result = runner(abs_path, params, progress_cb, lambda: False)
+
+        view = ResultView.from_dict({str(k): v for k, v in (result or {}).items()})
+        meta = getattr(result, 'meta', None) or None
+        del result
+        with open(result_path, 'wb') as f:
+            f.write(view.to_bytes())
+        send('done', meta)
+    except MemoryError:
+        send('error', 'MEMORY_LIMIT_EXCEEDED', f'内存超过限制 ({memory_mb} MB)')
+    except Exception as e:
+        send('error', 'INTERNAL_ERROR', str(e))
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _kill(proc) -> None:
+    """结束子进程及其进程组（runner 内部的进程池一并结束）。"""
+    try:
+        # 只在子进程确实自成进程组时按组结束，避免误杀 Web 进程所在的组
+        if os.getpgid(proc.pid) == proc.pid:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        pass
+    try:
+        proc.kill()
+    except Exception:
+        pass
+    proc.join(timeout=5)
+
+
+def run_in_process(
+    algo_key: str,
+    abs_path: str,
+    params: Dict[str, Any],
+    progress_cb: Callable[[int, str, str], None],
+    is_cancelled: Callable[[], bool],
+    memory_mb: int = 0,
+    cpu_seconds: int = 0,
+    start_method: str = 'spawn',
+) -> Optional[Tuple[ResultView, Optional[Dict[str, Any]]]]:
+    """在子进程中执行 algo_key 对应的 runner。
+
+    返回 (ResultView, result_meta)；取消时结束子进程并返回 None；失败时抛 TaskProcessError。
+    """
+    ctx = multiprocessing.get_context(start_method or 'spawn')
+    fd, result_path = tempfile.mkstemp(prefix='task-result-', suffix='.npz')
+    os.close(fd)
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_child_main,
+        args=(child_conn, algo_key, abs_path, params or {}, result_path, int(memory_mb or 0), int(cpu_seconds or 0),
+              os.getpid()),
+        name=f'task-{algo_key}',
+    )
+    outcome = None
+    try:
+        proc.start()
+        child_conn.close()
+
+        while outcome is None:
+            if is_cancelled():
+                _kill(proc)
+                return None
+            try:
+                if not parent_conn.poll(POLL_INTERVAL):
+                    if not proc.is_alive():
+                        break
+                    continue
+                msg = parent_conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == 'progress':
+                progress_cb(*msg[1:])
+            else:
+                outcome = msg
+
+        proc.join(timeout=30)
+        if proc.is_alive():
+            _kill(proc)
+
+        if outcome is None:
+            code = proc.exitcode
+            if code is not None and code < 0:
+                sig = -code
+                if sig == getattr(signal, 'SIGXCPU', None):
+                    raise TaskProcessError('CPU_LIMIT_EXCEEDED', f'CPU 时间超过限制 ({cpu_seconds} 秒)')
+                if sig == signal.SIGKILL:
+                    raise TaskProcessError('WORKER_KILLED', '计算进程被系统结束（可能超出 CPU/内存限制）')
+                raise TaskProcessError('WORKER_CRASHED', f'计算进程异常退出 (signal {sig})')
+            raise TaskProcessError('WORKER_CRASHED', f'计算进程异常退出 (exit code {code})')
+        if outcome[0] == 'error':
+            raise TaskProcessError(outcome[1], outcome[2])
+
+        with open(result_path, 'rb') as f:
+            return ResultView.from_bytes(f.read()), outcome[1]
+    finally:
+        if proc.is_alive():
+            _kill(proc)
+        try:
+            parent_conn.close()
+        except Exception:
+            pass
+        try:
+            os.remove(result_path)
+        except OSError:
+            pass
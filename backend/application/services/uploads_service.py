@@ -1,6 +1,10 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, Any
 
 from application.common.auth import is_admin
+from application.algorithms import graph_sidecar
 from application.repositories.uploads_repo import (
     create_upload as repo_create_upload,
     count_uploads as repo_count_uploads,
@@ -8,6 +12,7 @@ from application.repositories.uploads_repo import (
     get_upload_by_id as repo_get_upload_by_id,
     delete_upload as repo_delete_upload,
     update_upload_original_name as repo_update_upload_original_name,
+    update_upload_content_hash as repo_update_upload_content_hash,
 )
 from application.services.audit_logs_service import write_log
 from application.services.audit_context import sanitize_detail
@@ -75,6 +80,81 @@ def create_upload_record(
         raise
 
 
+def build_graph_sidecar(abs_path: str) -> Optional[Dict[str, Any]]:
+    """把边表转换为二进制 sidecar，供后续所有图加载方内存映射读取。
+
+    失败或格式不支持时返回 None，不影响上传本身（消费方会回退到文本解析）。
+    """
+    try:
+        return graph_sidecar.build_sidecar(abs_path)
+    except Exception:
+        return None
+
+
+# 上传后生成 sidecar 的后台线程：与识别任务执行器分开，不占用户并发名额、全局 worker 与排队估算
+_sidecar_lock = threading.Lock()
+_sidecar_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_sidecar_executor() -> ThreadPoolExecutor:
+    global _sidecar_executor
+    with _sidecar_lock:
+        if _sidecar_executor is None:
+            _sidecar_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='graph-sidecar')
+        return _sidecar_executor
+
+
+def schedule_graph_sidecar(upload_id: int, abs_path: str) -> None:
+    """上传后在后台线程生成 sidecar 并回填内容哈希，不阻塞上传响应。
+
+    排队期间或提交失败时不影响使用：算法加载器会按需生成 sidecar（ensure_sidecar），
+    建任务时也会现算内容哈希（ensure_content_hash）。
+    """
+    def build():
+        if not os.path.exists(abs_path):
+            return
+        sha = upload_content_hash(abs_path, build_graph_sidecar(abs_path))
+        if sha:
+            try:
+                repo_update_upload_content_hash(int(upload_id), sha)
+            except Exception:
+                pass
+
+    try:
+        _get_sidecar_executor().submit(build)
+    except Exception:
+        pass
+
+
+def upload_content_hash(abs_path: str, sidecar_meta: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """文件内容的 sha256：优先取 sidecar 构建时已算好的值，避免重复读文件；失败返回 None。"""
+    sha = ((sidecar_meta or {}).get('source') or {}).get('sha256')
+    if sha:
+        return sha
+    try:
+        return graph_sidecar.content_hash(abs_path)
+    except Exception:
+        return None
+
+
+def ensure_content_hash(upload_row: Dict[str, Any], abs_path: str) -> Optional[str]:
+    """读取上传记录的内容哈希；迁移前上传的文件没有记录时现算并回填。"""
+    sha = upload_row.get('content_hash')
+    if sha:
+        return sha
+    sha = upload_content_hash(abs_path)
+    if sha and upload_row.get('id') is not None:
+        try:
+            repo_update_upload_content_hash(int(upload_row['id']), sha)
+        except Exception:
+            pass
+    return sha
+
+
+def remove_graph_sidecar(abs_path: str) -> None:
+    graph_sidecar.remove_sidecar(abs_path)
+
+
 def list_uploads_paginated(page: int, page_size: int, current_user_id: int) -> Dict:
     """普通用户：public + 自己的 private；管理员：全量。"""
     page = max(int(page or 1), 1)
@@ -0,0 +1,154 @@
+"""独立的识别任务 worker（TASK_QUEUE=db）。
+
+    python -m application.worker [--concurrency N] [--poll-interval 秒]
+
+identification_tasks 表即持久化队列：Web 节点只负责建任务（status=queued），
+worker 以 SELECT ... FOR UPDATE SKIP LOCKED 领取任务并持有租约（lease_expires_at），
+执行期间每 lease/3 秒心跳续租；worker 崩溃或重启后，租约过期的 running 任务由任意 worker
+重新排队（超过 TASK_MAX_ATTEMPTS 次则置为失败）。启动时先做一次回收。
+回收只针对 worker 领取过（有 worker_id 与租约）的任务，Web 进程内执行的任务不受影响。
+
+等待复用相同任务结果的任务（reused_from 非空）不会被领取：源任务结束时由执行它的 worker 处理，
+遗漏的（如结束时崩溃）在回收时补偿。
+
+Web 端取消任务只写 DB 状态，心跳发现任务已不是 running（或租约已被接手）时在本进程内中止。
+计算节点与 Web 节点可以分别扩容；worker 的并发数默认 TASK_MAX_WORKERS，单用户并发上限
+TASK_PER_USER_LIMIT 在领取时跨所有 worker 生效。
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from typing import List, Optional
+
+from config import Config
+from application.factory import create_app
+from application.repositories import identification_repo
+from application.services import identification_service
+
+logger = logging.getLogger('application.worker')
+
+
+class TaskWorker:
+    def __init__(self, app, concurrency: int, lease_seconds: int = 60, poll_interval: float = 2.0,
+                 max_attempts: int = 3, per_user_limit: int = 0):
+        self.app = app
+        self.concurrency = max(1, int(concurrency))
+        self.lease_seconds = max(10, int(lease_seconds))
+        self.poll_interval = max(0.1, float(poll_interval))
+        self.max_attempts = max(1, int(max_attempts))
+        self.per_user_limit = max(0, int(per_user_limit))
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self._stop = threading.Event()
+
+    def stop(self, *_args) -> None:
+        """停止领取新任务；正在执行的任务会继续跑完。"""
+        if not self._stop.is_set():
+            logger.info('worker %s 正在停止，等待运行中的任务结束', self.worker_id)
+        self._stop.set()
+
+    def requeue_orphans(self) -> None:
+        try:
+            requeued, failed = identification_repo.requeue_expired_tasks(self.max_attempts)
+            if requeued or failed:
+                logger.info('回收中断任务：重新排队 %s 个，置为失败 %s 个', requeued, failed)
+        except Exception as e:
+            logger.warning('回收中断任务失败: %s', e)
+        try:
+            settled = identification_repo.reconcile_followers()
+            if settled:
+                logger.info('处理等待复用结果的任务 %s 个', settled)
+        except Exception as e:
+            logger.warning('处理等待复用结果的任务失败: %s', e)
+
+    def run_forever(self) -> None:
+        logger.info('worker %s 启动：并发=%s，租约=%ss', self.worker_id, self.concurrency, self.lease_seconds)
+        self.requeue_orphans()
+        threads: List[threading.Thread] = []
+        for i in range(self.concurrency):
+            th = threading.Thread(target=self._loop, name=f'worker-{i}', daemon=True)
+            threads.append(th)
+            th.start()
+        # 主线程定期回收其他 worker 留下的过期租约
+        while not self._stop.wait(self.lease_seconds):
+            self.requeue_orphans()
+        for th in threads:
+            th.join()
+        logger.info('worker %s 已退出', self.worker_id)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                row = identification_repo.claim_next_task(self.worker_id, self.lease_seconds, self.per_user_limit)
+            except Exception as e:
+                logger.warning('领取任务失败: %s', e)
+                self._stop.wait(self.poll_interval)
+                continue
+            if not row:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._execute(row)
+
+    def _heartbeat(self, task_id: str, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3.0):
+            try:
+                status = identification_repo.renew_task_lease(task_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # DB 暂时不可用：保留任务继续执行，租约过期前恢复即可
+                logger.warning('任务 %s 续租失败: %s', task_id, e)
+                continue
+            if status == identification_service.TASK_STATUS_RUNNING:
+                continue
+            if status is None:
+                identification_service.abort_local_task(task_id, '租约已失效，任务由其他 worker 接手')
+            else:
+                identification_service.abort_local_task(task_id)
+            return
+
+    def _execute(self, row) -> None:
+        task_id = row.get('task_id')
+        logger.info('领取任务 %s（%s，第 %s 次）', task_id, row.get('algorithm_key'), row.get('attempts'))
+        identification_service.register_claimed_task(row)
+        done = threading.Event()
+        hb = threading.Thread(target=self._heartbeat, args=(task_id, done), daemon=True)
+        hb.start()
+        try:
+            identification_service._run_task(self.app, task_id)
+        finally:
+            done.set()
+            hb.join(timeout=5)
+            identification_service.release_task(task_id)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='识别任务 worker（TASK_QUEUE=db）')
+    parser.add_argument('--concurrency', type=int, default=Config.TASK_MAX_WORKERS,
+                        help='同时执行的任务数（默认 TASK_MAX_WORKERS）')
+    parser.add_argument('--poll-interval', type=float, default=Config.TASK_POLL_INTERVAL,
+                        help='队列为空时的轮询间隔（秒）')
+    args = parser.parse_args(argv)
+
+    # app 提供 UPLOAD_FOLDER 等配置与 _run_task 需要的 application context
+    app = create_app()
+    config = app.config
+    worker = TaskWorker(
+        app,
+        concurrency=args.concurrency,
+        lease_seconds=int(config.get('TASK_LEASE_SECONDS') or 60),
+        poll_interval=args.poll_interval,
+        max_attempts=int(config.get('TASK_MAX_ATTEMPTS') or 3),
+        per_user_limit=int(config.get('TASK_PER_USER_LIMIT') or 0),
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run_forever()
+
+
+if __name__ == '__main__':
+    main()
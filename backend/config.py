@@ -15,3 +15,25 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
 
+    # 识别任务执行器：全局并发数、单用户并发数、batch 任务最长等待（秒，超过后按 interactive 调度）
+    TASK_MAX_WORKERS = int(os.getenv('TASK_MAX_WORKERS', '2'))
+    TASK_PER_USER_LIMIT = int(os.getenv('TASK_PER_USER_LIMIT', '1'))
+    TASK_BATCH_MAX_WAIT = float(os.getenv('TASK_BATCH_MAX_WAIT', '300'))
+
+    # 任务执行方式：thread（Web 进程内线程）/ process（独立子进程，可强制取消、限制资源）
+    # process 模式下单个任务的内存上限（MB，RLIMIT_AS）与 CPU 时间上限（秒，RLIMIT_CPU），0 表示不限制；
+    # 设置了任一限制时 runner 固定单进程执行（workers=1），限制即整个任务的上限
+    TASK_ISOLATION = os.getenv('TASK_ISOLATION', 'thread').strip().lower()
+    TASK_MEMORY_LIMIT_MB = int(os.getenv('TASK_MEMORY_LIMIT_MB', '0'))
+    TASK_CPU_LIMIT_SECONDS = int(os.getenv('TASK_CPU_LIMIT_SECONDS', '0'))
+
+    # 任务队列：memory（Web 进程内排队执行）/ db（identification_tasks 持久化队列，由 python -m application.worker 执行）
+    # db 模式下 worker 的租约时长（秒，心跳间隔为其 1/3）、中断后最多执行次数、空队列轮询间隔（秒）
+    TASK_QUEUE = os.getenv('TASK_QUEUE', 'memory').strip().lower()
+    TASK_LEASE_SECONDS = int(os.getenv('TASK_LEASE_SECONDS', '60'))
+    TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', '3'))
+    TASK_POLL_INTERVAL = float(os.getenv('TASK_POLL_INTERVAL', '2'))
+
+    # 任务进度批量落库的间隔（秒）；状态变化总是立即落库
+    TASK_PROGRESS_FLUSH_INTERVAL = float(os.getenv('TASK_PROGRESS_FLUSH_INTERVAL', '1'))
+
@@ -68,8 +68,10 @@ def create_tables():
             mime_type VARCHAR(100),
             size_bytes BIGINT,
             storage_path VARCHAR(255),
+            content_hash CHAR(64) NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             INDEX idx_user_id (user_id),
+            INDEX idx_content_hash (content_hash),
             INDEX idx_visibility (visibility),
             INDEX idx_visibility_user_id (visibility, user_id),
             CONSTRAINT fk_uploads_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
@@ -116,9 +118,19 @@ def create_tables():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             started_at TIMESTAMP NULL,
             ended_at TIMESTAMP NULL,
+            priority VARCHAR(20) NOT NULL DEFAULT 'interactive',
+            worker_id VARCHAR(128) NULL,
+            lease_expires_at TIMESTAMP NULL,
+            heartbeat_at TIMESTAMP NULL,
+            attempts INT NOT NULL DEFAULT 0,
+            reuse_key CHAR(64) NULL,
+            reused_from VARCHAR(64) NULL,
             INDEX idx_user_created_at (user_id, created_at),
             INDEX idx_file_id (file_id),
             INDEX idx_status (status),
+            INDEX idx_status_priority_created (status, priority, created_at),
+            INDEX idx_reuse_key (reuse_key, status),
+            INDEX idx_reused_from (reused_from),
             CONSTRAINT fk_ident_tasks_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
             CONSTRAINT fk_ident_tasks_file FOREIGN KEY (file_id) REFERENCES uploads(id) ON DELETE CASCADE
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -152,6 +164,8 @@ def create_tables():
         CREATE TABLE IF NOT EXISTS identification_task_results (
             task_id VARCHAR(64) PRIMARY KEY,
             result JSON NOT NULL,
+            meta JSON NULL,
+            result_blob LONGBLOB NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             CONSTRAINT fk_ident_results_task FOREIGN KEY (task_id) REFERENCES identification_tasks(task_id) ON DELETE CASCADE
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -66,6 +66,72 @@ try:
     else:
         print('✓ uploads.idx_visibility_user_id 已存在，跳过')
 
+    # identification_task_results.meta（近似算法误差界等结果元数据）
+    if not column_exists(cur, 'identification_task_results', 'meta'):
+        cur.execute("ALTER TABLE identification_task_results ADD COLUMN meta JSON NULL AFTER result")
+        conn.commit()
+        print('✓ identification_task_results.meta 已添加')
+    else:
+        print('✓ identification_task_results.meta 已存在，跳过')
+
+    # identification_task_results.result_blob（列式压缩结果：节点 id / 分数 / 降序排名）
+    if not column_exists(cur, 'identification_task_results', 'result_blob'):
+        cur.execute("ALTER TABLE identification_task_results ADD COLUMN result_blob LONGBLOB NULL AFTER meta")
+        conn.commit()
+        print('✓ identification_task_results.result_blob 已添加')
+    else:
+        print('✓ identification_task_results.result_blob 已存在，跳过')
+
+    # identification_tasks 持久化队列字段：优先级 / 租约 / 心跳 / 重试次数（TASK_QUEUE=db）
+    for col, ddl in (
+        ('priority', "ALTER TABLE identification_tasks ADD COLUMN priority VARCHAR(20) NOT NULL DEFAULT 'interactive'"),
+        ('worker_id', "ALTER TABLE identification_tasks ADD COLUMN worker_id VARCHAR(128) NULL"),
+        ('lease_expires_at', "ALTER TABLE identification_tasks ADD COLUMN lease_expires_at TIMESTAMP NULL"),
+        ('heartbeat_at', "ALTER TABLE identification_tasks ADD COLUMN heartbeat_at TIMESTAMP NULL"),
+        ('attempts', "ALTER TABLE identification_tasks ADD COLUMN attempts INT NOT NULL DEFAULT 0"),
+    ):
+        if not column_exists(cur, 'identification_tasks', col):
+            cur.execute(ddl)
+            conn.commit()
+            print(f'✓ identification_tasks.{col} 已添加')
+        else:
+            print(f'✓ identification_tasks.{col} 已存在，跳过')
+
+    # identification_tasks.idx_status_priority_created（worker 领取任务）
+    cur.execute("SHOW INDEX FROM identification_tasks WHERE Key_name='idx_status_priority_created'")
+    if cur.fetchone() is None:
+        cur.execute("CREATE INDEX idx_status_priority_created ON identification_tasks(status, priority, created_at)")
+        conn.commit()
+        print('✓ identification_tasks.idx_status_priority_created 已创建')
+    else:
+        print('✓ identification_tasks.idx_status_priority_created 已存在，跳过')
+
+    # 结果复用：uploads.content_hash（文件内容 sha256）与 identification_tasks.reuse_key / reused_from
+    for table, col, ddl in (
+        ('uploads', 'content_hash', "ALTER TABLE uploads ADD COLUMN content_hash CHAR(64) NULL"),
+        ('identification_tasks', 'reuse_key', "ALTER TABLE identification_tasks ADD COLUMN reuse_key CHAR(64) NULL"),
+        ('identification_tasks', 'reused_from', "ALTER TABLE identification_tasks ADD COLUMN reused_from VARCHAR(64) NULL"),
+    ):
+        if not column_exists(cur, table, col):
+            cur.execute(ddl)
+            conn.commit()
+            print(f'✓ {table}.{col} 已添加')
+        else:
+            print(f'✓ {table}.{col} 已存在，跳过')
+
+    for table, index, ddl in (
+        ('uploads', 'idx_content_hash', "CREATE INDEX idx_content_hash ON uploads(content_hash)"),
+        ('identification_tasks', 'idx_reuse_key', "CREATE INDEX idx_reuse_key ON identification_tasks(reuse_key, status)"),
+        ('identification_tasks', 'idx_reused_from', "CREATE INDEX idx_reused_from ON identification_tasks(reused_from)"),
+    ):
+        cur.execute(f"SHOW INDEX FROM {table} WHERE Key_name=%s", (index,))
+        if cur.fetchone() is None:
+            cur.execute(ddl)
+            conn.commit()
+            print(f'✓ {table}.{index} 已创建')
+        else:
+            print(f'✓ {table}.{index} 已存在，跳过')
+
     cur.close()
     conn.close()
     print("=== 迁移完成 ===")